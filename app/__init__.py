@@ -2,7 +2,9 @@ from flask import Flask
 from flask_login import LoginManager
 from flask_sqlalchemy import SQLAlchemy
 from flask_migrate import Migrate
+from sqlalchemy import event
 from .config import config
+from .search import create_search_index, include_name
 import os
 
 db = SQLAlchemy()
@@ -14,9 +16,27 @@ def create_app():
     app = Flask(__name__)
     env = os.getenv('FLASK_ENV', 'development')
     app.config.from_object(config[env])
+    from app import logs
+    logs.init_app(app)
 
     db.init_app(app)
-    migrate.init_app(app, db)
+    migrate.init_app(app, db, include_name=include_name)
+
+    from app import engine_profile, instrumentation
+    engine_profile.init_app(app, db)
+    instrumentation.init_app(app, db)
+    from app.datamanager import routing
+    routing.init_app(app, db)
+
+    from app.cache import dashboard_cache, user_cache
+    user_cache.configure(maxsize=app.config['USER_CACHE_SIZE'], ttl=app.config['USER_CACHE_TTL'])
+    dashboard_cache.configure(maxsize=app.config['ADMIN_DASHBOARD_CACHE_SIZE'],
+                              ttl=app.config['ADMIN_DASHBOARD_CACHE_TTL'])
+    from app import fragments, genre_index, passwords, startup
+    fragments.init_app(app)
+    genre_index.init_app(app)
+    passwords.init_app(app)
+    startup.init_app(app)
 
     login_manager.init_app(app)
     login_manager.login_view = 'auth.login'
@@ -25,6 +45,16 @@ def create_app():
     from app.models.movie import Movie
     from app.models.user import User
     from app.models.user_movie import UserMovie
+    from app.models.movie_stats import MovieStats
+    from app.models.recommendation import MovieRecommendation
+    from app.models.genre_index_change import GenreIndexChange
+
+    # Build the full-text search index and the genre change log triggers
+    # whenever the tables are created with db.create_all()
+    if not event.contains(db.metadata, 'after_create', _create_search_index):
+        event.listen(db.metadata, 'after_create', _create_search_index)
+    if not event.contains(db.metadata, 'after_create', _create_genre_index_triggers):
+        event.listen(db.metadata, 'after_create', _create_genre_index_triggers)
 
     from app.routes.main import main_routes
     app.register_blueprint(main_routes)
@@ -34,12 +64,40 @@ def create_app():
     app.register_blueprint(user_routes)
     from app.routes.auth import auth as auth_blueprint
     app.register_blueprint(auth_blueprint)
+    from app.routes.api import api_routes
+    app.register_blueprint(api_routes)
+
+    if app.config['ASYNC_DATA_MANAGER']:
+        from app.datamanager.async_sqlite_data_manager import AsyncSQLiteDataManager
+        async_data_manager = AsyncSQLiteDataManager(app.config['SQLALCHEMY_DATABASE_URI'])
+        engine_profile.configure_engine(async_data_manager.engine.sync_engine, app.config['SQLITE_PRAGMAS'])
+        app.extensions['async_data_manager'] = async_data_manager
+        from app.routes.async_users import async_user_routes
+        app.register_blueprint(async_user_routes)
+
+    if app.config['RECOMMENDATION_AUTO_REFRESH']:
+        from app import recommendation_refresh
+        recommendation_refresh.init_app(app, db)
+
+    from app.cli import register_commands
+    register_commands(app)
 
     # User loader for Flask-Login
     @login_manager.user_loader
     def load_user(user_id):
         from app.datamanager.sqlite_data_manager import SQLiteDataManager
         data_manager = SQLiteDataManager(db)
-        return data_manager.get_user_by_id(user_id)
+        user = data_manager.get_cached_user_by_id(user_id)
+        # Accounts queued for deletion are logged out immediately
+        return user if user is not None and user.is_active else None
 
     return app
+
+
+def _create_search_index(target, connection, **kw):
+    create_search_index(connection)
+
+
+def _create_genre_index_triggers(target, connection, **kw):
+    from app.models.genre_index_change import create_genre_index_triggers
+    create_genre_index_triggers(connection)
@@ -0,0 +1,194 @@
+import sys
+import threading
+import time
+from collections import OrderedDict
+
+
+class TTLCache:
+    """Thread-safe, size-bounded in-process cache whose entries expire.
+
+    Entries are evicted least-recently-used first once ``maxsize`` is reached
+    and are treated as missing once they are older than ``ttl`` seconds.
+    Hit, miss and eviction counters are kept for monitoring.
+    """
+
+    def __init__(self, maxsize=1024, ttl=60.0):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def configure(self, maxsize=None, ttl=None):
+        """Change the bounds of the cache and drop its current contents."""
+        with self._lock:
+            if maxsize is not None:
+                self.maxsize = maxsize
+            if ttl is not None:
+                self.ttl = ttl
+            self._data.clear()
+
+    def get(self, key, default=None):
+        """Return the live value stored for ``key``, or ``default``."""
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is not None and entry[0] > time.monotonic():
+                self._data.move_to_end(key)
+                self.hits += 1
+                return entry[1]
+            if entry is not None:
+                del self._data[key]
+            self.misses += 1
+            return default
+
+    def set(self, key, value):
+        """Store ``value`` under ``key`` for ``ttl`` seconds."""
+        if self.maxsize <= 0:
+            return
+        with self._lock:
+            self._data[key] = (time.monotonic() + self.ttl, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def invalidate(self, key):
+        """Drop the entry stored for ``key``, if any."""
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def stats(self):
+        """Return the cache counters as a dict."""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'size': len(self._data),
+                'maxsize': self.maxsize,
+                'ttl': self.ttl,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'hit_ratio': self.hits / lookups if lookups else 0.0,
+            }
+
+
+class FragmentCache:
+    """Thread-safe LRU of rendered template fragments, bounded by memory.
+
+    Keys are tuples that start with a ``(kind, id)`` group, e.g.
+    ``('movie', 42, ...)``. Entries are evicted least-recently-used first once
+    their accounted size exceeds ``max_bytes``, and whole groups can be
+    dropped with ``invalidate``. Entries do not expire; callers put a version
+    in the key so that changed objects simply miss.
+    """
+
+    # Rough per-entry cost of the key tuple and the bookkeeping structures
+    ENTRY_OVERHEAD = 256
+
+    def __init__(self, max_bytes=32 * 1024 * 1024):
+        self.max_bytes = max_bytes
+        self.bytes = 0
+        self._data = OrderedDict()
+        self._groups = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def configure(self, max_bytes=None):
+        """Change the memory bound of the cache and drop its current contents."""
+        with self._lock:
+            if max_bytes is not None:
+                self.max_bytes = max_bytes
+            self._clear()
+
+    def get(self, key):
+        """Return the fragment stored for ``key``, or None."""
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self._data.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def set(self, key, value):
+        """Store the fragment ``value`` under ``key``, evicting old entries as needed."""
+        size = sys.getsizeof(value) + self.ENTRY_OVERHEAD
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            self._remove(key)
+            self._data[key] = (value, size)
+            self._groups.setdefault(key[:2], set()).add(key)
+            self.bytes += size
+            while self.bytes > self.max_bytes:
+                self._remove(next(iter(self._data)))
+                self.evictions += 1
+
+    def invalidate(self, kind, ids):
+        """Drop every fragment of the ``kind`` objects with the given IDs."""
+        with self._lock:
+            for ident in ids:
+                for key in self._groups.pop((kind, ident), ()):
+                    self._remove(key, keep_group=True)
+
+    def clear(self):
+        with self._lock:
+            self._clear()
+
+    def stats(self):
+        """Return the cache counters as a dict."""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'size': len(self._data),
+                'maxsize': None,
+                'ttl': None,
+                'bytes': self.bytes,
+                'max_bytes': self.max_bytes,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'hit_ratio': self.hits / lookups if lookups else 0.0,
+            }
+
+    def _remove(self, key, keep_group=False):
+        entry = self._data.pop(key, None)
+        if entry is None:
+            return
+        self.bytes -= entry[1]
+        if not keep_group:
+            group = self._groups.get(key[:2])
+            if group is not None:
+                group.discard(key)
+                if not group:
+                    del self._groups[key[:2]]
+
+    def _clear(self):
+        self._data.clear()
+        self._groups.clear()
+        self.bytes = 0
+
+
+# Column values of recently loaded users, keyed by user ID. Used by the
+# Flask-Login user loader so authenticated requests skip the users query.
+user_cache = TTLCache()
+
+# Users pages and genre lists of the admin dashboard, keyed by page cursor.
+# A short TTL lets repeated refreshes skip the count queries.
+dashboard_cache = TTLCache(maxsize=64, ttl=5)
+
+# Bitsets of the movies in users' libraries for the genre facets
+# (app/genre_index.py), keyed by (user ID, user version).
+library_bitset_cache = TTLCache(maxsize=256, ttl=300)
+
+# Rendered row fragments of the ``{% cache %}`` template tag (app/fragments.py)
+fragment_cache = FragmentCache()
@@ -0,0 +1,354 @@
+import csv
+import json
+import os
+import time
+from itertools import islice
+
+import click
+from flask import current_app
+from sqlalchemy import insert, select
+
+from app import db
+from app.datamanager.sqlite_data_manager import SQLiteDataManager
+from app.datamanager.versions import touch_users
+from app.export import EXPORT_KINDS, MIMETYPES, iter_export
+from app.genre_index import genre_index
+from app.models.genre import Genre
+from app.models.genre_index_change import create_genre_index_triggers
+from app.models.import_checkpoint import ImportCheckpoint
+from app.models.movie import Movie
+from app.models.movie_genre import MovieGenre
+from app.models.movie_stats import rebuild_movie_stats, stale_movie_stats
+from app.models.user import User
+from app.models.user_movie import UserMovie
+from app.search import create_search_index, rebuild_search_index
+
+
+def register_commands(app):
+    """Register the application's CLI commands on ``app``."""
+    app.cli.add_command(import_command)
+    app.cli.add_command(export_command)
+    app.cli.add_command(search_index_command)
+    app.cli.add_command(genre_index_command)
+    app.cli.add_command(movie_stats_command)
+    app.cli.add_command(recommendations_command)
+    app.cli.add_command(purge_users_command)
+    app.cli.add_command(index_advisor_command)
+    app.cli.add_command(create_indexes_command)
+
+
+def read_records(path, file_format):
+    """Yield one dict per record of a CSV or JSON Lines file, lazily.
+
+    In CSV files the ``genres`` column holds genre names separated by ``|``;
+    in JSON Lines files it may also be a list.
+    """
+    with open(path, newline='', encoding='utf-8') as source:
+        if file_format == 'csv':
+            for record in csv.DictReader(source):
+                genres = record.get('genres') or ''
+                record['genres'] = [name for name in genres.split('|') if name.strip()]
+                yield record
+        else:
+            for line in source:
+                if line.strip():
+                    record = json.loads(line)
+                    genres = record.get('genres') or []
+                    if isinstance(genres, str):
+                        genres = genres.split('|')
+                    record['genres'] = genres
+                    yield record
+
+
+def _movie_row(record, number):
+    """Build an INSERT parameter set for the ``movies`` table from a record."""
+    try:
+        rating = record.get('rating')
+        return {
+            'name': (record.get('name') or record['title']).strip(),
+            'director': record['director'].strip(),
+            'year': int(record['year']),
+            'rating': float(rating) if rating not in (None, '') else None,
+        }
+    except (KeyError, TypeError, ValueError) as e:
+        raise click.ClickException(f'Invalid record #{number}: {e!r}')
+
+
+def _check_owners(chunk, first_number):
+    """Fail on the first record of ``chunk`` whose own ``user_id`` does not exist."""
+    owners = {}
+    for number, record in enumerate(chunk, first_number):
+        if record.get('user_id'):
+            try:
+                owners.setdefault(int(record['user_id']), number)
+            except (TypeError, ValueError) as e:
+                raise click.ClickException(f'Invalid record #{number}: {e!r}')
+    if not owners:
+        return
+    existing = set(db.session.scalars(select(User.id).where(User.id.in_(owners))))
+    unknown = sorted((number, owner_id) for owner_id, number in owners.items() if owner_id not in existing)
+    if unknown:
+        number, owner_id = unknown[0]
+        raise click.ClickException(f'Invalid record #{number}: no user with ID {owner_id}')
+
+
+def _resolve_genres(names, genre_ids, create):
+    """Map genre names to IDs, optionally creating the unknown ones.
+
+    ``genre_ids`` is the name -> ID cache shared across chunks. Returns the
+    resolved IDs and the number of names that could not be resolved.
+    """
+    resolved, missing = [], 0
+    for name in names:
+        name = name.strip()
+        genre_id = genre_ids.get(name)
+        if genre_id is None and create:
+            genre_id = db.session.execute(
+                insert(Genre).returning(Genre.id), {'name': name, 'description': ''}
+            ).scalar_one()
+            genre_ids[name] = genre_id
+        if genre_id is None:
+            missing += 1
+        elif genre_id not in resolved:
+            resolved.append(genre_id)
+    return resolved, missing
+
+
+@click.command('import')
+@click.argument('path', type=click.Path(exists=True, dir_okay=False))
+@click.option('--format', 'file_format', type=click.Choice(['csv', 'jsonl']),
+              help='Input format. Defaults to the file extension.')
+@click.option('--chunk-size', default=1000, show_default=True, type=click.IntRange(min=1),
+              help='Records inserted and committed per transaction.')
+@click.option('--user-id', type=int,
+              help='Add every movie to this user\'s library unless a record sets its own user_id.')
+@click.option('--create-genres', is_flag=True,
+              help='Create genres that do not exist yet instead of skipping them.')
+@click.option('--restart', is_flag=True,
+              help='Ignore any saved progress and import the file from the start.')
+def import_command(path, file_format, chunk_size, user_id, create_genres, restart):
+    """Bulk import movies, their genres and library entries from PATH.
+
+    Records are streamed from disk and written with one executemany per table
+    and chunk. Progress is committed together with each chunk, so an
+    interrupted import resumes where it stopped when run again.
+    """
+    if user_id is not None and db.session.get(User, user_id) is None:
+        raise click.BadParameter(f'no user with ID {user_id}.', param_hint="'--user-id'")
+    path = os.path.abspath(path)
+    if file_format is None:
+        file_format = 'csv' if path.lower().endswith('.csv') else 'jsonl'
+
+    checkpoint = db.session.get(ImportCheckpoint, path)
+    if checkpoint is None:
+        checkpoint = ImportCheckpoint(source=path, rows=0)
+        db.session.add(checkpoint)
+    elif restart:
+        checkpoint.rows = 0
+    db.session.commit()
+    if checkpoint.rows:
+        click.echo(f'Resuming after {checkpoint.rows} already imported records.')
+
+    genre_ids = dict(db.session.query(Genre.name, Genre.id))
+    records = islice(read_records(path, file_format), checkpoint.rows, None)
+    imported = skipped_genres = 0
+    started = time.perf_counter()
+
+    while True:
+        chunk = list(islice(records, chunk_size))
+        if not chunk:
+            break
+
+        first_number = checkpoint.rows + 1
+        movie_rows = [_movie_row(record, number) for number, record in enumerate(chunk, first_number)]
+        _check_owners(chunk, first_number)
+        movie_ids = db.session.execute(
+            insert(Movie).returning(Movie.id, sort_by_parameter_order=True), movie_rows
+        ).scalars().all()
+
+        movie_genre_rows, user_movie_rows = [], []
+        for movie_id, record in zip(movie_ids, chunk):
+            resolved, missing = _resolve_genres(record['genres'], genre_ids, create_genres)
+            skipped_genres += missing
+            movie_genre_rows.extend({'movie_id': movie_id, 'genre_id': genre_id} for genre_id in resolved)
+            owner_id = record.get('user_id') or user_id
+            if owner_id:
+                user_movie_rows.append({'user_id': int(owner_id), 'movie_id': movie_id})
+
+        if movie_genre_rows:
+            db.session.execute(insert(MovieGenre.__table__), movie_genre_rows)
+        if user_movie_rows:
+            db.session.execute(insert(UserMovie.__table__), user_movie_rows)
+            db.session.execute(touch_users({row['user_id'] for row in user_movie_rows}))
+        checkpoint.rows += len(chunk)
+        db.session.commit()
+
+        imported += len(chunk)
+        elapsed = time.perf_counter() - started
+        click.echo(f'{checkpoint.rows} records imported ({imported / elapsed:,.0f} rows/s)')
+
+    elapsed = time.perf_counter() - started
+    rate = imported / elapsed if elapsed else 0
+    click.echo(f'Done: {imported} records in {elapsed:.1f}s ({rate:,.0f} rows/s).')
+    if skipped_genres:
+        click.echo(f'Skipped {skipped_genres} unknown genre names; use --create-genres to add them.')
+
+
+@click.command('export')
+@click.argument('user_id', type=int)
+@click.option('--kind', type=click.Choice(sorted(EXPORT_KINDS)), default='library', show_default=True,
+              help='What to export.')
+@click.option('--format', 'export_format', type=click.Choice(sorted(MIMETYPES)), default='csv',
+              show_default=True, help='Output format.')
+@click.option('--chunk-size', default=1000, show_default=True, type=click.IntRange(min=1),
+              help='Rows fetched from the database at a time.')
+@click.option('--output', '-o', type=click.File('w', encoding='utf-8'), default='-',
+              help='Destination file. Defaults to standard output.')
+def export_command(user_id, kind, export_format, chunk_size, output):
+    """Stream a user's library or reviews to a CSV or NDJSON file."""
+    data_manager = SQLiteDataManager(db)
+    for text in iter_export(data_manager, user_id, kind, export_format, chunk_size=chunk_size):
+        output.write(text)
+
+
+@click.command('search-index')
+@click.option('--rebuild', is_flag=True, help='Re-index all libraries and reviews from scratch.')
+def search_index_command(rebuild):
+    """Create the full-text search index, or rebuild it with --rebuild."""
+    with db.engine.begin() as connection:
+        if rebuild:
+            rebuild_search_index(connection)
+        else:
+            create_search_index(connection)
+    click.echo('Search index rebuilt.' if rebuild else 'Search index is ready.')
+
+
+@click.command('genre-index')
+@click.option('--rebuild', is_flag=True, help='Rebuild the genre bitmaps from movie_genres.')
+@click.option('--prune', is_flag=True, help='Delete all but the last GENRE_INDEX_LOG_KEEP logged genre changes.')
+def genre_index_command(rebuild, prune):
+    """Create the genre change log triggers and save an up-to-date genre index."""
+    with db.engine.begin() as connection:
+        create_genre_index_triggers(connection)
+    data_manager = SQLiteDataManager(db)
+    started = time.perf_counter()
+    if rebuild:
+        genre_index.rebuild(data_manager)
+    else:
+        genre_index.sync(data_manager)
+    genre_index.save()
+    stats = genre_index.stats()
+    click.echo(f"{stats['pairs']} movie genres in {stats['genres']} bitmaps ({stats['bytes'] / 1024:,.1f} KiB) "
+               f"at change {stats['position']}, in {time.perf_counter() - started:.2f}s.")
+    if prune:
+        deleted = data_manager.prune_genre_index_changes(current_app.config['GENRE_INDEX_LOG_KEEP'])
+        click.echo(f'Pruned {deleted} logged genre changes.')
+
+
+@click.command('movie-stats')
+@click.option('--rebuild', is_flag=True, help='Recompute all review aggregates from scratch.')
+def movie_stats_command(rebuild):
+    """Check the review aggregates against a full recompute, or rebuild them.
+
+    Exits with status 1 when a check finds stale aggregates.
+    """
+    with db.engine.begin() as connection:
+        if rebuild:
+            rebuild_movie_stats(connection)
+        stale = stale_movie_stats(connection)
+    for movie_id, stored, expected in stale[:20]:
+        click.echo(f'movie {movie_id}: stored {stored}, expected {expected}', err=True)
+    if stale:
+        click.echo(f'{len(stale)} movies have stale review aggregates; run with --rebuild.', err=True)
+        raise SystemExit(1)
+    click.echo('Review aggregates rebuilt.' if rebuild else 'Review aggregates are up to date.')
+
+
+@click.command('recommendations')
+@click.option('--rebuild', is_flag=True, help='Recompute all recommendations from every library entry.')
+@click.option('--batch-size', type=click.IntRange(min=1), help='Movies per sparse matrix product.')
+def recommendations_command(rebuild, batch_size):
+    """Fold queued library additions into the recommendations, or rebuild them."""
+    from app.recommendations import rebuild_recommendations, refresh_recommendations
+
+    k = current_app.config['RECOMMENDATIONS_PER_MOVIE']
+    batch_size = batch_size or current_app.config['RECOMMENDATION_BATCH_SIZE']
+    started = time.perf_counter()
+    if rebuild:
+        with db.engine.begin() as connection:
+            rows = rebuild_recommendations(connection, k=k, batch_size=batch_size)
+        click.echo(f'Stored {rows} recommendations in {time.perf_counter() - started:.1f}s.')
+        return
+    processed = 0
+    while True:
+        with db.engine.begin() as connection:
+            count = refresh_recommendations(connection, k=k, batch_size=batch_size)
+        if not count:
+            break
+        processed += count
+    click.echo(f'Processed {processed} queued library additions in {time.perf_counter() - started:.1f}s.')
+
+
+@click.command('purge-users')
+@click.option('--chunk-size', default=500, show_default=True, type=click.IntRange(min=1),
+              help='Rows deleted per transaction.')
+def purge_users_command(chunk_size):
+    """Finish purging users whose deletion was requested but did not complete."""
+    data_manager = SQLiteDataManager(db)
+    user_ids = data_manager.get_pending_deletion_ids()
+    for user_id in user_ids:
+        data_manager.purge_user(user_id, chunk_size=chunk_size)
+        click.echo(f'Purged user {user_id}.')
+    click.echo(f'{len(user_ids)} pending deletions processed.')
+
+
+@click.command('index-advisor')
+@click.option('--verbose', '-v', is_flag=True, help='Print the query plan of every statement.')
+def index_advisor_command(verbose):
+    """Explain the SQL of every data manager method and flag full table scans.
+
+    Runs against the configured database inside a transaction that is rolled
+    back. Exits with status 1 when a method scans a table unexpectedly, so
+    it can gate CI.
+    """
+    from app.datamanager.index_advisor import analyze, unexpected_scans
+
+    reports = analyze(db)
+    width = max(len(report.method) for report in reports)
+    for report in reports:
+        scanned = sorted({table for plan in report.statements for table in plan.scans})
+        status = 'SCAN ' + ', '.join(scanned) if scanned else 'ok'
+        if report.note:
+            status += f' ({report.note})'
+        click.echo(f'{report.method:<{width}} {len(report.statements):>2} statements  {status}')
+        if verbose:
+            for plan in report.statements:
+                click.echo(f'    {" ".join(plan.statement.split())}')
+                for line in plan.plan:
+                    click.echo(f'        {line}')
+
+    problems = unexpected_scans(reports)
+    if problems:
+        for method, table in sorted(set(problems), key=str):
+            reason = f'scans {table}' if table else 'has no sample call in SAMPLE_CALLS'
+            click.echo(f'{method} {reason}', err=True)
+        raise SystemExit(1)
+    click.echo('No unexpected full table scans.')
+
+
+@click.command('create-indexes')
+def create_indexes_command():
+    """Add the indexes declared on the models to an existing database.
+
+    Issues ``CREATE INDEX IF NOT EXISTS`` for every missing index, so it is
+    safe to run on every deploy.
+    """
+    from app.datamanager.index_advisor import create_missing_indexes
+
+    with db.engine.begin() as connection:
+        created, skipped = create_missing_indexes(connection, db.metadata)
+    for name in created:
+        click.echo(f'Created index {name}.')
+    for table in skipped:
+        click.echo(f'Skipped the indexes of {table}: the table does not exist; run flask db upgrade.', err=True)
+    click.echo(f'{len(created)} indexes created.' if created else 'No indexes were missing.')
@@ -1,2 +1,3 @@
-from .data_manager_interface import DataManagerInterface
+from .data_manager_interface import AsyncDataManagerInterface, DataManagerInterface
 from .sqlite_data_manager import SQLiteDataManager
+from .async_sqlite_data_manager import AsyncSQLiteDataManager
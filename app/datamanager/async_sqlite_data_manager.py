@@ -0,0 +1,225 @@
+from sqlalchemy import select
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlalchemy.orm import joinedload, selectinload
+
+from app.cache import fragment_cache, user_cache
+from app.datamanager.data_manager_interface import AsyncDataManagerInterface
+from app.datamanager.pagination import keyset_page_async
+from app.datamanager.versions import reviewed_movie_ids, touch_movies, touch_users
+from app.models.user import User
+from app.models.movie import Movie
+from app.models.user_movie import UserMovie
+from app.models.genre import Genre
+from app.models.review import Review
+from app.models.movie_genre import MovieGenre
+from app.models.recommendation import MovieRecommendation
+
+
+def async_database_uri(uri: str):
+    """Return ``uri`` with its SQLite driver switched to aiosqlite."""
+    url = make_url(uri)
+    if url.get_backend_name() == 'sqlite':
+        url = url.set(drivername='sqlite+aiosqlite')
+    return url.render_as_string(hide_password=False)
+
+
+class AsyncSQLiteDataManager(AsyncDataManagerInterface):
+    """Asynchronous data manager built on SQLAlchemy's asyncio extension.
+
+    Mirrors the methods of ``SQLiteDataManager`` as coroutines. Every call uses
+    its own ``AsyncSession`` and returns detached objects with
+    ``expire_on_commit`` disabled. Lazy loading is not possible outside the
+    session, so the movie methods load genres eagerly by default and review
+    aggregates always.
+    """
+
+    def __init__(self, database_uri: str, **engine_options):
+        """Initialize AsyncSQLiteDataManager with an async engine for ``database_uri``."""
+        self.engine = create_async_engine(async_database_uri(database_uri), **engine_options)
+        self.session_factory = async_sessionmaker(self.engine, expire_on_commit=False)
+
+    async def dispose(self):
+        """Close all pooled connections of the async engine."""
+        await self.engine.dispose()
+
+    async def _first(self, statement):
+        async with self.session_factory() as session:
+            return (await session.scalars(statement)).first()
+
+    async def _all(self, statement):
+        async with self.session_factory() as session:
+            return (await session.scalars(statement)).all()
+
+    async def _add(self, instance, touches=()):
+        async with self.session_factory() as session:
+            session.add(instance)
+            for statement in touches:
+                await session.execute(statement)
+            await session.commit()
+        return instance
+
+    async def _delete(self, model, primary_key, touches=None):
+        """Delete one row; ``touches`` maps it to version bump statements."""
+        async with self.session_factory() as session:
+            instance = await session.get(model, primary_key)
+            if instance:
+                for statement in (touches(instance) if touches else ()):
+                    await session.execute(statement)
+                await session.delete(instance)
+                await session.commit()
+
+    async def get_all_users(self):
+        """Retrieve all users from the database."""
+        return await self._all(select(User))
+
+    async def get_users_page(self, after: int = None, before: int = None, per_page: int = 50):
+        """Retrieve one page of users ordered by ID, using keyset pagination."""
+        statement = select(User).where(User.deletion_requested_at.is_(None))
+        async with self.session_factory() as session:
+            return await keyset_page_async(session, statement, User.id,
+                                           after=after, before=before, per_page=per_page)
+
+    async def get_user_movies(self, user_id: int, with_genres: bool = True):
+        """Retrieve all movies associated with a specific user."""
+        statement = (select(Movie).join(UserMovie).where(UserMovie.user_id == user_id)
+                     .options(joinedload(Movie.stats)))
+        if with_genres:
+            statement = statement.options(selectinload(Movie.genres))
+        return await self._all(statement)
+
+    async def get_user_movies_page(self, user_id: int, after: int = None, before: int = None,
+                                   per_page: int = 50, with_genres: bool = True):
+        """Retrieve one page of a user's movies ordered by movie ID."""
+        statement = (select(Movie).join(UserMovie).where(UserMovie.user_id == user_id)
+                     .options(joinedload(Movie.stats)))
+        if with_genres:
+            statement = statement.options(selectinload(Movie.genres))
+        async with self.session_factory() as session:
+            return await keyset_page_async(session, statement, UserMovie.movie_id,
+                                           after=after, before=before, per_page=per_page)
+
+    async def add_user(self, name: str, email: str, password: str):
+        """Add a new user to the database with the provided name, email, and password."""
+        return await self._add(User(name=name, email=email, password=password))
+
+    async def get_user_by_email(self, email: str):
+        """Retrieve a user by their email address."""
+        return await self._first(select(User).where(User.email == email))
+
+    async def get_user_by_id(self, user_id: int):
+        """Retrieve a user by their unique ID."""
+        return await self._first(select(User).where(User.id == user_id))
+
+    async def delete_user(self, user_id: int):
+        """Delete a user and associated data by their unique ID."""
+        await self._delete(User, user_id, lambda user: touch_movies(reviewed_movie_ids(user.id)))
+        user_cache.invalidate(int(user_id))
+        fragment_cache.invalidate('user', [int(user_id)])
+
+    async def add_movie(self, name: str, director: str, year: int, rating: float):
+        """Add a new movie to the database with specified details."""
+        return await self._add(Movie(name=name, director=director, year=year, rating=rating))
+
+    async def update_movie(self, movie_id: int, title: str, director: str, year: int, rating: float):
+        """Update details of an existing movie by its ID."""
+        async with self.session_factory() as session:
+            movie = await session.get(Movie, movie_id)
+            if movie:
+                movie.name = title
+                movie.director = director
+                movie.year = year
+                movie.rating = rating
+                for statement in touch_movies([movie_id]):
+                    await session.execute(statement)
+                await session.commit()
+        fragment_cache.invalidate('movie', [movie_id])
+
+    async def delete_movie(self, movie_id: int):
+        """Delete a movie from the database by its ID."""
+        await self._delete(Movie, movie_id, lambda movie: touch_movies([movie.id]))
+        fragment_cache.invalidate('movie', [movie_id])
+
+    async def get_all_genre(self):
+        """Retrieve all genres from the database."""
+        return await self._all(select(Genre))
+
+    async def get_genres_by_ids(self, ids: list):
+        """Retrieve multiple genres by a list of IDs."""
+        return await self._all(select(Genre).where(Genre.id.in_(ids)))
+
+    async def add_user_movie(self, user_id: int, movie_id: int):
+        """Associate a movie with a user."""
+        await self._add(UserMovie(user_id=user_id, movie_id=movie_id), [touch_users([user_id])])
+
+    async def add_user_review(self, movie_id: int, user_id: int, text: str, rating: float):
+        """Add a review by a user for a specific movie."""
+        await self._add(Review(movie_id=movie_id, user_id=user_id, text=text, rating=rating),
+                        touch_movies([movie_id]) + [touch_users([user_id])])
+        fragment_cache.invalidate('movie', [movie_id])
+
+    async def delete_genre(self, genre_id: int):
+        """Delete a genre by its ID."""
+        await self._delete(Genre, genre_id, lambda genre: touch_movies(
+            select(MovieGenre.movie_id).where(MovieGenre.genre_id == genre.id)))
+        fragment_cache.invalidate('genre', [genre_id])
+
+    async def add_genre(self, name: str, description: str):
+        """Add a new genre to the database."""
+        await self._add(Genre(name=name, description=description))
+
+    async def get_genres_by_name(self, name: str):
+        """Retrieve a genre by its name."""
+        return await self._first(select(Genre).where(Genre.name == name))
+
+    async def get_user_reviews_for_movie(self, movie_id: int, user_id: int):
+        """Retrieve all reviews a user has made for a specific movie."""
+        return await self._all(select(Review).where(Review.movie_id == movie_id, Review.user_id == user_id))
+
+    async def get_movie_by_id(self, movie_id: int, user_id: int, with_genres: bool = True):
+        """Retrieve a movie by ID associated with a specific user."""
+        statement = (select(Movie).join(UserMovie).where(Movie.id == movie_id, UserMovie.user_id == user_id)
+                     .options(joinedload(Movie.stats)))
+        if with_genres:
+            statement = statement.options(selectinload(Movie.genres))
+        return await self._first(statement)
+
+    async def get_versions(self, user_id: int, movie_id: int = None):
+        """Retrieve the current version of a user and, optionally, of one of their movies."""
+        movie_version = None
+        if movie_id is not None:
+            movie_version = (select(Movie.version)
+                             .join(UserMovie, UserMovie.movie_id == Movie.id)
+                             .where(Movie.id == movie_id, UserMovie.user_id == user_id)
+                             .scalar_subquery())
+        async with self.session_factory() as session:
+            return (await session.execute(select(User.version, movie_version).where(User.id == user_id))).first()
+
+    async def get_movie_recommendations(self, movie_id: int, user_id: int, limit: int = 10):
+        """Retrieve the movies most often saved together with a movie."""
+        return await self._all(
+            select(Movie)
+            .join(MovieRecommendation, MovieRecommendation.recommended_id == Movie.id)
+            .where(MovieRecommendation.movie_id == movie_id, ~Movie.user_movies.any(UserMovie.user_id == user_id))
+            .order_by(MovieRecommendation.rank)
+            .limit(limit)
+        )
+
+    async def delete_review(self, review_id: int):
+        """Delete a review by its ID."""
+        await self._delete(Review, review_id, lambda review: touch_movies([review.movie_id])
+                           + [touch_users([review.user_id])])
+        fragment_cache.invalidate('review', [review_id])
+
+    async def delete_movie_genre(self, movie_id: int, genre_id: int):
+        """Remove association between a movie and a genre by their IDs."""
+        await self._delete(MovieGenre, (genre_id, movie_id), lambda movie_genre: touch_movies([movie_id]))
+        fragment_cache.invalidate('movie', [movie_id])
+
+    async def get_review_by_id(self, review_id: int):
+        """Retrieve a review by its unique ID."""
+        return await self._first(select(Review).where(Review.id == review_id))
+
+    async def get_genre_by_id(self, genre_id: int):
+        """Retrieve a genre by its unique ID."""
+        return await self._first(select(Genre).where(Genre.id == genre_id))
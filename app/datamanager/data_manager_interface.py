@@ -26,3 +26,30 @@ class DataManagerInterface(ABC):
     @abstractmethod
     def delete_movie(self, movie_id):
         pass
+
+
+class AsyncDataManagerInterface(ABC):
+
+    @abstractmethod
+    async def get_all_users(self):
+        pass
+
+    @abstractmethod
+    async def get_user_movies(self, user_id):
+        pass
+
+    @abstractmethod
+    async def add_user(self, name, email, password):
+        pass
+
+    @abstractmethod
+    async def add_movie(self, title, director, year, rating):
+        pass
+
+    @abstractmethod
+    async def update_movie(self, movie_id, title, director, year, rating):
+        pass
+
+    @abstractmethod
+    async def delete_movie(self, movie_id):
+        pass
@@ -0,0 +1,246 @@
+import inspect
+import re
+from collections import namedtuple
+
+from sqlalchemy import event, inspect as inspect_database
+from sqlalchemy.orm import Session
+from sqlalchemy.schema import CreateIndex
+
+from app.cache import user_cache
+from app.datamanager.projections import GENRE_COLUMNS, MOVIE_COLUMNS, REVIEW_COLUMNS
+from app.datamanager.sqlite_data_manager import SQLiteDataManager
+from app.models.genre import Genre
+from app.models.movie import Movie
+from app.models.review import Review
+from app.models.user import User
+from app.models.user_movie import UserMovie
+
+# Methods that read a whole table on purpose, with the reason.
+EXPECTED_SCANS = {
+    'get_all_users': 'lists every user',
+    'get_users_page': 'first page walks the users primary key in order',
+    'get_all_genre': 'lists every genre',
+    'get_genre_rows': 'lists every genre',
+    'get_genre_summaries': 'lists every genre',
+    'get_user_summaries_page': 'first page walks the users primary key in order',
+    'get_pending_deletion_ids': 'walks the partial index of users pending deletion',
+    'iter_movie_genre_words': 'reads every movie genre to build the genre index',
+    'get_last_genre_index_change': 'reads the last row of the genre change log primary key',
+}
+
+# Methods that are not analyzed, with the reason.
+SKIPPED_METHODS = {
+    'get_cached_user_by_id': 'same query as get_user_by_id; would populate the user cache',
+    'unit_of_work': 'transaction context; issues no SQL of its own',
+}
+
+# Keyword arguments for every analyzed method, built from the seeded rows.
+SAMPLE_CALLS = {
+    'get_all_users': lambda s: {},
+    'get_users_page': lambda s: {'after': s['user_id']},
+    'get_user_summaries_page': lambda s: {'after': s['user_id'] - 1},
+    'get_genre_summaries': lambda s: {},
+    'get_user_movies': lambda s: {'user_id': s['user_id']},
+    'get_user_movies_page': lambda s: {'user_id': s['user_id'], 'after': s['movie_id']},
+    'get_user_movies_readonly': lambda s: {'user_id': s['user_id']},
+    'get_user_movies_page_readonly': lambda s: {'user_id': s['user_id'], 'after': s['movie_id'] - 1},
+    'search_user_movies': lambda s: {'user_id': s['user_id'], 'terms': 'advisor'},
+    'search_user_movies_readonly': lambda s: {'user_id': s['user_id'], 'terms': 'advisor'},
+    'iter_user_library': lambda s: {'user_id': s['user_id']},
+    'iter_user_reviews': lambda s: {'user_id': s['user_id']},
+    'iter_user_movie_rows': lambda s: {'user_id': s['user_id'], 'fields': list(MOVIE_COLUMNS),
+                                       'after': s['movie_id'] - 1, 'limit': 10},
+    'get_user_movie_row': lambda s: {'user_id': s['user_id'], 'movie_id': s['movie_id'],
+                                     'fields': list(MOVIE_COLUMNS)},
+    'iter_user_review_rows': lambda s: {'user_id': s['user_id'], 'fields': list(REVIEW_COLUMNS),
+                                        'movie_id': s['movie_id']},
+    'get_genre_rows': lambda s: {'fields': list(GENRE_COLUMNS)},
+    'get_user_movie_words': lambda s: {'user_id': s['user_id']},
+    'get_movies_readonly': lambda s: {'movie_ids': [s['movie_id']]},
+    'iter_movie_genre_words': lambda s: {},
+    'get_genre_index_changes': lambda s: {'after': 0},
+    'get_last_genre_index_change': lambda s: {},
+    'prune_genre_index_changes': lambda s: {'keep': 10},
+    'add_user': lambda s: {'name': 'advisor', 'email': 'advisor-new@example.com', 'password': 'x'},
+    'get_user_by_email': lambda s: {'email': s['email']},
+    'get_user_by_id': lambda s: {'user_id': s['user_id']},
+    'get_versions': lambda s: {'user_id': s['user_id'], 'movie_id': s['movie_id']},
+    'delete_user': lambda s: {'user_id': s['user_id']},
+    'update_password': lambda s: {'user_id': s['user_id'], 'password_hash': 'x'},
+    'count_user_rows': lambda s: {'user_id': s['user_id'], 'limit': 10},
+    'request_user_deletion': lambda s: {'user_id': s['user_id']},
+    'get_pending_deletion_ids': lambda s: {},
+    'purge_user': lambda s: {'user_id': s['user_id']},
+    'add_movie': lambda s: {'name': 'advisor', 'director': 'advisor', 'year': 2000, 'rating': 5.0},
+    'update_movie': lambda s: {'movie_id': s['movie_id'], 'title': 'advisor', 'director': 'advisor',
+                               'year': 2000, 'rating': 5.0},
+    'delete_movie': lambda s: {'movie_id': s['movie_id']},
+    'get_all_genre': lambda s: {},
+    'get_genres_by_ids': lambda s: {'ids': [s['genre_id']]},
+    'add_user_movie': lambda s: {'user_id': s['other_user_id'], 'movie_id': s['movie_id']},
+    'add_user_review': lambda s: {'movie_id': s['movie_id'], 'user_id': s['user_id'], 'text': 'advisor',
+                                  'rating': 5.0},
+    'sync_movie_genres': lambda s: {'movie_id': s['movie_id'], 'genre_ids': [s['genre_id']]},
+    'delete_genre': lambda s: {'genre_id': s['genre_id']},
+    'add_genre': lambda s: {'name': 'advisor-new', 'description': 'advisor'},
+    'get_genres_by_name': lambda s: {'name': 'advisor'},
+    'get_user_reviews_for_movie': lambda s: {'movie_id': s['movie_id'], 'user_id': s['user_id']},
+    'get_user_reviews_for_movie_readonly': lambda s: {'movie_id': s['movie_id'], 'user_id': s['user_id']},
+    'get_movie_by_id': lambda s: {'movie_id': s['movie_id'], 'user_id': s['user_id'], 'with_genres': True},
+    'get_movie_recommendations': lambda s: {'movie_id': s['movie_id'], 'user_id': s['user_id']},
+    'get_movie_recommendations_readonly': lambda s: {'movie_id': s['movie_id'], 'user_id': s['user_id']},
+    'get_movie_by_id_readonly': lambda s: {'movie_id': s['movie_id'], 'user_id': s['user_id']},
+    'delete_review': lambda s: {'review_id': s['review_id']},
+    'delete_movie_genre': lambda s: {'movie_id': s['movie_id'], 'genre_id': s['genre_id']},
+    'get_review_by_id': lambda s: {'review_id': s['review_id']},
+    'get_genre_by_id': lambda s: {'genre_id': s['genre_id']},
+}
+
+_SCAN = re.compile(r'^SCAN (\w+)(?!.*VIRTUAL TABLE)')
+_EXPLAINABLE = ('SELECT', 'WITH', 'UPDATE', 'DELETE')
+
+# The plan of one statement issued by a method, and the tables it scans.
+StatementPlan = namedtuple('StatementPlan', ['statement', 'plan', 'scans'])
+# The analysis of one data manager method.
+MethodReport = namedtuple('MethodReport', ['method', 'statements', 'expected', 'note'])
+
+
+def data_manager_methods():
+    """Return the names of the public SQLiteDataManager methods."""
+    return sorted(name for name, member in inspect.getmembers(SQLiteDataManager, inspect.isfunction)
+                  if not name.startswith('_'))
+
+
+def _seed(session):
+    """Insert a minimal data set so every method has rows to work on."""
+    user = User(name='advisor', email='advisor@example.com', password='x')
+    other_user = User(name='advisor2', email='advisor2@example.com', password='x')
+    genre = Genre(name='advisor', description='advisor')
+    movie = Movie(name='advisor', director='advisor', year=2000, rating=5.0, genres=[genre])
+    session.add_all([user, other_user, genre, movie])
+    session.flush()
+    review = Review(movie_id=movie.id, user_id=user.id, text='advisor', rating=5.0)
+    session.add_all([UserMovie(user_id=user.id, movie_id=movie.id), review])
+    session.flush()
+    return {
+        'user_id': user.id,
+        'other_user_id': other_user.id,
+        'email': user.email,
+        'movie_id': movie.id,
+        'genre_id': genre.id,
+        'review_id': review.id,
+    }
+
+
+def _explain(connection, statement, parameters, tables):
+    plan = [row[3] for row in connection.exec_driver_sql(f'EXPLAIN QUERY PLAN {statement}', parameters)]
+    scans = sorted({match.group(1) for match in map(_SCAN.match, plan) if match and match.group(1) in tables})
+    return StatementPlan(statement, plan, scans)
+
+
+def analyze(db):
+    """Run every SQLiteDataManager method and explain the SQL it issues.
+
+    Everything happens inside a transaction that is rolled back at the end,
+    and each method runs in its own savepoint, so the database is left
+    untouched. Must be called inside an application context.
+
+    Returns:
+        list[MethodReport]: One report per public data manager method.
+    """
+    tables = set(db.metadata.tables)
+    reports = []
+    connection = db.engine.connect()
+    # pysqlite only emits BEGIN lazily before DML, which would turn the
+    # savepoints below into real commits. Take over transaction control on
+    # this connection and open the outer transaction explicitly.
+    driver_connection = connection.connection.driver_connection
+    isolation_level = driver_connection.isolation_level
+    driver_connection.isolation_level = None
+    outer = connection.begin()
+    connection.exec_driver_sql('BEGIN')
+    captured = []
+
+    def capture(conn, cursor, statement, parameters, context, executemany):
+        if not executemany and statement.lstrip().upper().startswith(_EXPLAINABLE):
+            captured.append((statement, parameters))
+
+    try:
+        session = Session(bind=connection, join_transaction_mode='create_savepoint')
+        samples = _seed(session)
+        session.commit()
+        session.close()
+
+        for method in data_manager_methods():
+            if method in SKIPPED_METHODS:
+                reports.append(MethodReport(method, [], False, SKIPPED_METHODS[method]))
+                continue
+            if method not in SAMPLE_CALLS:
+                reports.append(MethodReport(method, [], False, 'no sample call registered'))
+                continue
+
+            savepoint = connection.begin_nested()
+            session = Session(bind=connection, join_transaction_mode='create_savepoint')
+            db.session.registry.set(session)
+            captured.clear()
+            event.listen(connection, 'before_cursor_execute', capture)
+            try:
+                result = getattr(SQLiteDataManager(db), method)(**SAMPLE_CALLS[method](samples))
+                if inspect.isgenerator(result):
+                    list(result)
+            finally:
+                event.remove(connection, 'before_cursor_execute', capture)
+            statements = [_explain(connection, statement, parameters, tables)
+                          for statement, parameters in captured]
+            session.close()
+            savepoint.rollback()
+            reports.append(MethodReport(method, statements, method in EXPECTED_SCANS,
+                                        EXPECTED_SCANS.get(method)))
+    finally:
+        db.session.registry.clear()
+        outer.rollback()
+        driver_connection.isolation_level = isolation_level
+        connection.close()
+        user_cache.clear()
+    return reports
+
+
+def unexpected_scans(reports):
+    """Return ``(method, table)`` pairs for full scans that are not expected.
+
+    Methods without a registered sample call are reported with table None.
+    """
+    problems = []
+    for report in reports:
+        if report.note == 'no sample call registered':
+            problems.append((report.method, None))
+        elif not report.expected:
+            problems.extend((report.method, table) for plan in report.statements for table in plan.scans)
+    return problems
+
+
+def create_missing_indexes(connection, metadata):
+    """Create the indexes declared on the models that an existing database lacks.
+
+    Each one is issued as ``CREATE INDEX IF NOT EXISTS``, so running this
+    again, or against a database created by ``db.create_all()``, changes
+    nothing. Tables that do not exist yet are left to ``flask db upgrade``.
+
+    Returns:
+        tuple[list[str], list[str]]: The indexes created, and the tables skipped.
+    """
+    database = inspect_database(connection)
+    existing_tables = set(database.get_table_names())
+    created, skipped = [], []
+    for table in metadata.sorted_tables:
+        if not table.indexes:
+            continue
+        if table.name not in existing_tables:
+            skipped.append(table.name)
+            continue
+        existing = {index['name'] for index in database.get_indexes(table.name)}
+        for index in sorted(table.indexes, key=lambda index: index.name):
+            if index.name not in existing:
+                connection.execute(CreateIndex(index, if_not_exists=True))
+                created.append(index.name)
+    return created, skipped
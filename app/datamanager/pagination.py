@@ -0,0 +1,89 @@
+from collections import namedtuple
+
+# A single page of a keyset-paginated listing. ``next_cursor``/``prev_cursor``
+# are the sort-key values to pass back as ``after``/``before``, or None when
+# there is no page in that direction.
+Page = namedtuple('Page', ['items', 'next_cursor', 'prev_cursor'])
+
+
+def _bounded(query, key, after, before, per_page):
+    """Apply the keyset bound, ordering and limit to a Query or Select."""
+    if before is not None:
+        return query.filter(key < before).order_by(key.desc()).limit(per_page + 1)
+    if after is not None:
+        query = query.filter(key > after)
+    return query.order_by(key.asc()).limit(per_page + 1)
+
+
+def _to_page(items, after, before, per_page, has_previous=True):
+    """Build the Page for rows fetched by a query from ``_bounded``.
+
+    ``has_previous`` tells whether any row precedes the first item of an
+    ``after`` page; without one there is no previous page to link to.
+    """
+    has_more = len(items) > per_page
+    items = items[:per_page]
+    if before is not None:
+        items = items[::-1]
+        prev_cursor = items[0].id if has_more else None
+        next_cursor = items[-1].id if items else None
+        return Page(items, next_cursor, prev_cursor)
+
+    next_cursor = items[-1].id if has_more else None
+    prev_cursor = items[0].id if after is not None and items and has_previous else None
+    return Page(items, next_cursor, prev_cursor)
+
+
+def _needs_previous_probe(items, after, before):
+    """Whether an ``after`` page must check for a row before its first item.
+
+    A cursor taken from a real page always has rows before it, but ``after``
+    can also be 0 or any value below the smallest key, which is the first page.
+    """
+    return after is not None and before is None and bool(items)
+
+
+def keyset_page(query, key, after=None, before=None, per_page=50):
+    """Return a page of ``query`` ordered by the unique column ``key``.
+
+    Instead of OFFSET, the page boundary is expressed as ``key > after`` or
+    ``key < before``, so every page is an index range scan of ``per_page + 1``
+    rows no matter how deep it is. An ``after`` page also probes for one row
+    before its first item, so ``after=0`` has no previous page. Items are
+    expected to expose the key value as their ``id`` attribute.
+
+    Args:
+        query: The base query, without ordering or limits.
+        key: The column to sort and paginate on.
+        after: Return the rows following this key value.
+        before: Return the rows preceding this key value.
+        per_page: Maximum number of items on the page.
+
+    Returns:
+        Page: The items in ascending key order and the neighbouring cursors.
+    """
+    items = _bounded(query, key, after, before, per_page).all()
+    has_previous = True
+    if _needs_previous_probe(items, after, before):
+        has_previous = query.with_entities(key).filter(key < items[0].id).limit(1).first() is not None
+    return _to_page(items, after, before, per_page, has_previous)
+
+
+async def keyset_page_async(session, statement, key, after=None, before=None, per_page=50):
+    """Asynchronous counterpart of ``keyset_page`` for an ``AsyncSession`` and a Select."""
+    items = (await session.scalars(_bounded(statement, key, after, before, per_page))).all()
+    has_previous = True
+    if _needs_previous_probe(items, after, before):
+        probe = statement.with_only_columns(key).where(key < items[0].id).limit(1)
+        has_previous = (await session.execute(probe)).first() is not None
+    return _to_page(items, after, before, per_page, has_previous)
+
+
+def page_from_items(items, after=None, before=None, per_page=50, has_previous=True):
+    """Build the Page for up to ``per_page + 1`` items selected by other means than a query.
+
+    ``items`` must be in the order a ``keyset_page`` query would return them:
+    ascending, or descending when ``before`` is given. ``has_previous`` tells
+    whether anything precedes the first item of an ``after`` page.
+    """
+    return _to_page(items, after, before, per_page, has_previous)
@@ -0,0 +1,55 @@
+"""Named columns the data manager can select instead of loading ORM objects.
+
+Each mapping goes from a public field name to a SQL expression. Callers pick
+the fields they need; only those columns are selected, and the rows come
+back as plain tuples in the requested order. Movie fields are relative to a
+``user_movies`` row, so ``watched_date`` is the user's own. ``genres`` holds
+the movie's genre names joined with ``|``, as in the library export.
+"""
+from sqlalchemy import func, select
+
+from app.models.genre import Genre
+from app.models.movie import Movie
+from app.models.movie_genre import MovieGenre
+from app.models.movie_stats import MovieStats
+from app.models.review import Review
+from app.models.user_movie import UserMovie
+
+MOVIE_COLUMNS = {
+    'id': UserMovie.movie_id,
+    'name': Movie.name,
+    'director': Movie.director,
+    'year': Movie.year,
+    'rating': Movie.rating,
+    'version': Movie.version,
+    'watched_date': UserMovie.watched_date,
+    'review_count': func.coalesce(MovieStats.review_count, 0),
+    'average_rating': MovieStats.rating_sum / func.nullif(MovieStats.rating_count, 0),
+    # Only evaluated for the movies on the page, through the movie_genres index
+    'genres': (select(func.group_concat(Genre.name, '|'))
+               .join(MovieGenre, MovieGenre.genre_id == Genre.id)
+               .where(MovieGenre.movie_id == UserMovie.movie_id)
+               .scalar_subquery()),
+}
+
+# Movie fields that need the outer join to movie_stats
+MOVIE_STATS_FIELDS = frozenset({'review_count', 'average_rating'})
+
+REVIEW_COLUMNS = {
+    'id': Review.id,
+    'movie_id': Review.movie_id,
+    'text': Review.text,
+    'rating': Review.rating,
+    'created_at': Review.created_at,
+}
+
+GENRE_COLUMNS = {
+    'id': Genre.id,
+    'name': Genre.name,
+    'description': Genre.description,
+}
+
+
+def columns(mapping, fields):
+    """Return the labelled expressions of ``fields`` from ``mapping``, in order."""
+    return [mapping[field].label(field) for field in fields]
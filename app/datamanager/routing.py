@@ -0,0 +1,101 @@
+"""Route the data manager's read-only queries to a separate read engine.
+
+During a request, the read methods of ``SQLiteDataManager`` use a session
+bound to a read engine: a replica file (``SQLALCHEMY_READ_DATABASE_URI``) or,
+by default, a second connection pool on the primary SQLite file with
+``PRAGMA query_only``. Readers then never queue behind the pool of the
+writing session, and with WAL they never wait for the writer either.
+
+Writes keep going through ``db.session``. Once a request has written, its
+remaining reads go to the primary too, and so do the reads of the same
+browser session for ``READ_YOUR_WRITES_SECONDS``, so a replica that lags
+behind never hides a user's own change after the usual POST/redirect/GET.
+Outside requests (CLI commands, background tasks) everything uses
+``db.session``.
+"""
+import time
+
+from flask import current_app, g, has_request_context, session
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import make_url
+from sqlalchemy.orm import Session, scoped_session, sessionmaker
+
+from app.engine_profile import configure_engine
+from app.instrumentation import instrument_engine
+
+# Flask session key holding the time until which reads stick to the primary
+STICKY_UNTIL_KEY = '_read_primary_until'
+
+
+def read_session(db):
+    """Return the session the current read should use."""
+    sessions = current_app.extensions.get('read_session') if has_request_context() else None
+    if sessions is None or g.get('read_primary') or db.session.info.get('unit_of_work'):
+        return db.session
+    return sessions()
+
+
+def _mark_write():
+    if has_request_context():
+        g.read_primary = g.wrote = True
+
+
+def _after_flush(write_session, flush_context):
+    if write_session.new or write_session.dirty or write_session.deleted:
+        _mark_write()
+
+
+def _do_orm_execute(orm_execute_state):
+    if orm_execute_state.is_insert or orm_execute_state.is_update or orm_execute_state.is_delete:
+        _mark_write()
+
+
+def _before_request():
+    if session.get(STICKY_UNTIL_KEY, 0) > time.time():
+        g.read_primary = True
+
+
+def _after_request(response):
+    if g.get('wrote'):
+        seconds = current_app.config['READ_YOUR_WRITES_SECONDS']
+        if seconds:
+            session[STICKY_UNTIL_KEY] = time.time() + seconds
+    return response
+
+
+def init_app(app, db):
+    """Create the read engine and its request-scoped session for ``app``.
+
+    Does nothing when ``READ_ROUTING`` is off, or when the database is an
+    in-memory SQLite database and no replica is configured (a second engine
+    would open a different, empty database).
+    """
+    if not app.config['READ_ROUTING']:
+        return
+    uri = app.config.get('SQLALCHEMY_READ_DATABASE_URI')
+    if not uri:
+        uri = app.config['SQLALCHEMY_DATABASE_URI']
+        url = make_url(uri)
+        if url.get_backend_name() == 'sqlite' and url.database in (None, '', ':memory:'):
+            return
+
+    engine = create_engine(uri, **app.config['READ_ENGINE_OPTIONS'])
+    pragmas = app.config.get('SQLITE_PRAGMAS') or {}
+    configure_engine(engine, dict(pragmas, query_only=1))
+    if app.config.get('SQL_INSTRUMENTATION', True):
+        instrument_engine(engine)
+
+    # Same scoping as db.session: one session per application context
+    sessions = scoped_session(sessionmaker(bind=engine), scopefunc=db.session.registry.scopefunc)
+    app.extensions['read_session'] = sessions
+    app.extensions['read_engine'] = engine
+
+    @app.teardown_appcontext
+    def remove_read_session(exception=None):
+        sessions.remove()
+
+    if not event.contains(Session, 'after_flush', _after_flush):
+        event.listen(Session, 'after_flush', _after_flush)
+        event.listen(Session, 'do_orm_execute', _do_orm_execute)
+    app.before_request(_before_request)
+    app.after_request(_after_request)
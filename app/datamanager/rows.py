@@ -0,0 +1,33 @@
+"""Read-only rows for the listing and detail pages.
+
+The ``*_readonly`` methods of ``SQLiteDataManager`` return these named tuples
+instead of ORM instances. They are built straight from result tuples, so
+there is no identity map entry, instance state, change tracking or
+relationship collection per row, and they are safe to share between threads
+and requests. They expose the same attribute names as the models
+(``movie.stats.review_count``, ``genre.name`` in ``movie.genres``...), so the
+templates render either.
+"""
+from collections import namedtuple
+
+from app.models.movie import Movie
+from app.models.movie_stats import MovieStats
+
+MovieRow = namedtuple('MovieRow', ['id', 'name', 'director', 'year', 'rating', 'version', 'stats', 'genres'])
+# None in place of a MovieStatsRow when the movie has no reviews, like Movie.stats
+MovieStatsRow = namedtuple('MovieStatsRow', ['review_count', 'average_rating'])
+GenreRow = namedtuple('GenreRow', ['id', 'name'])
+ReviewRow = namedtuple('ReviewRow', ['id', 'movie_id', 'user_id', 'text', 'rating', 'created_at', 'version'])
+
+# Columns selected for a MovieRow; movie_stats is outer joined on the movie ID
+MOVIE_ROW_COLUMNS = (Movie.id, Movie.name, Movie.director, Movie.year, Movie.rating, Movie.version,
+                     MovieStats.review_count, MovieStats.rating_count, MovieStats.rating_sum)
+
+
+def movie_row(row, genres=()):
+    """Build a MovieRow from a result row of ``MOVIE_ROW_COLUMNS`` and its GenreRows."""
+    movie_id, name, director, year, rating, version, review_count, rating_count, rating_sum = row
+    stats = None
+    if review_count is not None:
+        stats = MovieStatsRow(review_count, rating_sum / rating_count if rating_count else None)
+    return MovieRow(movie_id, name, director, year, rating, version, stats, genres)
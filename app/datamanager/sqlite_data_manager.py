@@ -1,12 +1,50 @@
+import logging
+from collections import defaultdict
+from contextlib import contextmanager
+from datetime import datetime
 from flask_sqlalchemy import SQLAlchemy
 from abc import ABC
+from sqlalchemy import and_, case, delete, func, inspect, literal, or_, select
+from sqlalchemy.orm import joinedload, make_transient_to_detached, selectinload
+from sqlalchemy.orm.util import identity_key
 from app.datamanager.data_manager_interface import DataManagerInterface
+from app.cache import fragment_cache, user_cache
+from app.datamanager.pagination import keyset_page
+from app.datamanager.projections import (GENRE_COLUMNS, MOVIE_COLUMNS, MOVIE_STATS_FIELDS, REVIEW_COLUMNS,
+                                         columns)
+from app.datamanager.routing import read_session
+from app.datamanager.rows import MOVIE_ROW_COLUMNS, GenreRow, ReviewRow, movie_row
+from app.datamanager.versions import reviewed_movie_ids, touch_movies, touch_users
+from app.search import SEARCH_QUERY, SearchResults, build_match_query, search_index_ready, search_words
 from app.models.user import User
 from app.models.movie import Movie
 from app.models.user_movie import UserMovie
 from app.models.genre import Genre
 from app.models.review import Review
 from app.models.movie_genre import MovieGenre
+from app.models.movie_stats import MovieStats, refresh_movie_stats
+from app.models.recommendation import MovieRecommendation
+from app.models.genre_index_change import GenreIndexChange
+from app.models.upsert import upsert
+
+
+# Movie IDs per SELECT ... IN query when loading the genres of read-only rows
+GENRE_LOAD_CHUNK_SIZE = 500
+# Movie IDs per word of the bitmaps returned by the ``*_words`` methods
+BITMAP_WORD_BITS = 32
+
+
+def _bitmap_words(column):
+    """Return the ``word`` and ``bits`` expressions that pack the IDs of ``column`` into bitmap words.
+
+    Grouped by ``word``, the ``n``-th bit of ``bits`` is set when ID
+    ``word * BITMAP_WORD_BITS + n`` is in the group, so SQLite hands back one
+    row per word instead of one per ID. ``sum`` stands in for a bitwise OR
+    because the IDs of a group are unique; 32-bit words cannot overflow it.
+    """
+    word = column.op('>>')(BITMAP_WORD_BITS.bit_length() - 1)
+    bits = func.sum(literal(1).op('<<')(column.op('&')(BITMAP_WORD_BITS - 1)))
+    return word.label('word'), bits.label('bits')
 
 
 class SQLiteDataManager(DataManagerInterface, ABC):
@@ -16,119 +54,663 @@ class SQLiteDataManager(DataManagerInterface, ABC):
         """Initialize SQLiteDataManager with a SQLAlchemy database session."""
         self.db = db
 
+    @contextmanager
+    def unit_of_work(self):
+        """Group several write methods into a single transaction.
+
+        Inside the block, methods that would commit only flush, so generated
+        IDs are still available; the block commits once when it exits and
+        rolls everything back if it raises. Blocks may be nested, in which
+        case only the outermost one commits. The nesting depth lives in
+        ``session.info``, i.e. per request.
+        """
+        session = self.db.session
+        depth = session.info.get('unit_of_work', 0)
+        session.info['unit_of_work'] = depth + 1
+        try:
+            yield self
+            if not depth:
+                session.commit()
+        except BaseException:
+            if not depth:
+                session.rollback()
+            raise
+        finally:
+            session.info['unit_of_work'] = depth
+
+    @property
+    def reader(self):
+        """The session for read-only queries; see ``app.datamanager.routing``."""
+        return read_session(self.db)
+
+    def _touch(self, *statements):
+        """Execute version bump statements from ``app.datamanager.versions``."""
+        for statement in statements:
+            self.db.session.execute(statement)
+
+    def _commit(self):
+        """Commit, or only flush inside a ``unit_of_work`` block."""
+        if self.db.session.info.get('unit_of_work'):
+            self.db.session.flush()
+        else:
+            self.db.session.commit()
+
     def get_all_users(self):
         """Retrieve all users from the database."""
-        return self.db.session.query(User).all()
+        return self.reader.query(User).all()
+
+    def get_users_page(self, after: int = None, before: int = None, per_page: int = 50):
+        """Retrieve one page of users ordered by ID, using keyset pagination."""
+        query = self.reader.query(User).filter(User.deletion_requested_at.is_(None))
+        return keyset_page(query, User.id, after=after, before=before, per_page=per_page)
+
+    def get_user_summaries_page(self, after: int = None, before: int = None, per_page: int = 50):
+        """Retrieve one page of user rows with their library and review counts, ordered by ID.
+
+        A single statement: only the ``id``, ``name``, ``email`` and ``version``
+        columns are selected, and ``movie_count`` and ``review_count`` are
+        correlated counts over the ``user_movies`` primary key and the
+        ``reviews.user_id`` index, evaluated for the users on the page only.
+        """
+        movie_count = (select(func.count()).where(UserMovie.user_id == User.id)
+                       .correlate(User).scalar_subquery())
+        review_count = (select(func.count()).where(Review.user_id == User.id)
+                        .correlate(User).scalar_subquery())
+        query = (self.reader.query(User.id, User.name, User.email, User.version,
+                                   movie_count.label('movie_count'), review_count.label('review_count'))
+                 .filter(User.deletion_requested_at.is_(None)))
+        return keyset_page(query, User.id, after=after, before=before, per_page=per_page)
+
+    def get_genre_summaries(self):
+        """Retrieve every genre as a row of its columns and ``movie_count``, ordered by ID."""
+        movie_count = (select(func.count()).where(MovieGenre.genre_id == Genre.id)
+                       .correlate(Genre).scalar_subquery())
+        return (self.reader.query(Genre.id, Genre.name, Genre.description, movie_count.label('movie_count'))
+                .order_by(Genre.id)
+                .all())
+
+    def get_user_movies(self, user_id: int, with_genres: bool = True):
+        """Retrieve all movies associated with a specific user.
+
+        When ``with_genres`` is set, the genres of every movie are loaded with a
+        single extra SELECT ... IN query instead of one lazy load per movie.
+        Review aggregates are joined from ``movie_stats``.
+        """
+        query = (self.reader.query(Movie)
+                 .join(UserMovie)
+                 .filter(UserMovie.user_id == user_id)
+                 .options(joinedload(Movie.stats)))
+        if with_genres:
+            query = query.options(selectinload(Movie.genres))
+        return query.all()
+
+    def get_user_movies_page(self, user_id: int, after: int = None, before: int = None,
+                             per_page: int = 50, with_genres: bool = True):
+        """Retrieve one page of a user's movies ordered by movie ID.
+
+        The page is bounded on ``user_movies.movie_id`` so SQLite walks the
+        (user_id, movie_id) primary key instead of sorting the whole library.
+        """
+        query = (self.reader.query(Movie)
+                 .join(UserMovie)
+                 .filter(UserMovie.user_id == user_id)
+                 .options(joinedload(Movie.stats)))
+        if with_genres:
+            query = query.options(selectinload(Movie.genres))
+        return keyset_page(query, UserMovie.movie_id, after=after, before=before, per_page=per_page)
+
+    def _movie_rows_query(self):
+        """Select ``MOVIE_ROW_COLUMNS`` with the stats outer joined, for the read-only methods."""
+        return (self.reader.query(*MOVIE_ROW_COLUMNS)
+                .outerjoin(MovieStats, MovieStats.movie_id == Movie.id))
+
+    def _to_movie_rows(self, rows):
+        """Build MovieRows from ``_movie_rows_query`` results, loading the genres of all of them.
 
-    def get_user_movies(self, user_id: int):
-        """Retrieve all movies associated with a specific user."""
-        return (self.db.session.query(Movie)
-                .join(UserMovie)
+        Genres are fetched with one SELECT ... IN query per
+        ``GENRE_LOAD_CHUNK_SIZE`` movies, and each genre is a single GenreRow
+        shared by all of its movies.
+        """
+        genres, genre_rows = defaultdict(list), {}
+        movie_ids = [row.id for row in rows]
+        for start in range(0, len(movie_ids), GENRE_LOAD_CHUNK_SIZE):
+            query = (select(MovieGenre.movie_id, Genre.id, Genre.name)
+                     .join(Genre, Genre.id == MovieGenre.genre_id)
+                     .where(MovieGenre.movie_id.in_(movie_ids[start:start + GENRE_LOAD_CHUNK_SIZE])))
+            for movie_id, genre_id, name in self.reader.execute(query):
+                genre = genre_rows.get(genre_id)
+                if genre is None:
+                    genre = genre_rows[genre_id] = GenreRow(genre_id, name)
+                genres[movie_id].append(genre)
+        return [movie_row(row, tuple(genres.get(row.id, ()))) for row in rows]
+
+    def get_user_movies_readonly(self, user_id: int):
+        """Read-only variant of ``get_user_movies``, returning MovieRows with stats and genres."""
+        rows = (self._movie_rows_query()
+                .join(UserMovie, UserMovie.movie_id == Movie.id)
                 .filter(UserMovie.user_id == user_id)
                 .all())
+        return self._to_movie_rows(rows)
+
+    def get_user_movies_page_readonly(self, user_id: int, after: int = None, before: int = None,
+                                      per_page: int = 50):
+        """Read-only variant of ``get_user_movies_page``, returning a Page of MovieRows."""
+        query = (self._movie_rows_query()
+                 .join(UserMovie, UserMovie.movie_id == Movie.id)
+                 .filter(UserMovie.user_id == user_id))
+        page = keyset_page(query, UserMovie.movie_id, after=after, before=before, per_page=per_page)
+        return page._replace(items=self._to_movie_rows(page.items))
+
+    def _search_movie_ids(self, user_id: int, terms: str, page: int, per_page: int):
+        """Return the ranked movie IDs on ``page`` of a library search and whether more follow.
+
+        Falls back to a LIKE match on titles and directors, with a warning,
+        when the database has no search index.
+        """
+        words = search_words(terms)
+        if not words:
+            return [], False
+        if search_index_ready(self.reader.connection()):
+            rows = self.reader.execute(SEARCH_QUERY, {
+                'query': build_match_query(terms),
+                'user_id': user_id,
+                'limit': per_page + 1,
+                'offset': (page - 1) * per_page,
+            }).all()
+        else:
+            logging.warning("No search index, searching with LIKE; run 'flask search-index' to create it")
+            in_title = and_(*(Movie.name.ilike(f'%{word}%') for word in words))
+            anywhere = and_(*(or_(Movie.name.ilike(f'%{word}%'), Movie.director.ilike(f'%{word}%'))
+                              for word in words))
+            tier = case((in_title, 0), else_=1)
+            rows = self.reader.execute(
+                select(Movie.id.label('movie_id'))
+                .join(UserMovie, UserMovie.movie_id == Movie.id)
+                .where(UserMovie.user_id == user_id, anywhere)
+                .order_by(tier, Movie.id)
+                .limit(per_page + 1)
+                .offset((page - 1) * per_page)
+            ).all()
+        return [row.movie_id for row in rows[:per_page]], len(rows) > per_page
+
+    def search_user_movies(self, user_id: int, terms: str, page: int = 1, per_page: int = 20):
+        """Full-text search a user's library by title, director and their own reviews.
+
+        Matching and ranking run inside the user's part of the FTS5 index:
+        title matches first, then director matches, then review matches. Only
+        the movies on the requested page are then loaded, with their genres.
+
+        Returns:
+            SearchResults: The ranked movies on ``page`` and whether more follow.
+        """
+        movie_ids, has_next = self._search_movie_ids(user_id, terms, page, per_page)
+        if not movie_ids:
+            return SearchResults([], page, has_next)
+        movies = {movie.id: movie for movie in (self.reader.query(Movie)
+                                                .options(selectinload(Movie.genres), joinedload(Movie.stats))
+                                                .filter(Movie.id.in_(movie_ids)))}
+        items = [movies[movie_id] for movie_id in movie_ids if movie_id in movies]
+        return SearchResults(items, page, has_next)
+
+    def search_user_movies_readonly(self, user_id: int, terms: str, page: int = 1, per_page: int = 20):
+        """Read-only variant of ``search_user_movies``, with MovieRows as the items."""
+        movie_ids, has_next = self._search_movie_ids(user_id, terms, page, per_page)
+        if not movie_ids:
+            return SearchResults([], page, has_next)
+        movies = {row.id: row for row in self._to_movie_rows(
+            self._movie_rows_query().filter(Movie.id.in_(movie_ids)).all())}
+        return SearchResults([movies[movie_id] for movie_id in movie_ids if movie_id in movies], page, has_next)
+
+    def iter_user_library(self, user_id: int, chunk_size: int = 1000):
+        """Stream a user's library as rows, fetching ``chunk_size`` rows at a time.
+
+        Each row carries the movie columns, the library ``watched_date`` and the
+        movie's genre names joined with ``|``. No ORM objects are built, so
+        memory stays flat however large the library is.
+        """
+        query = (self.reader.query(Movie.id, Movie.name, Movie.director, Movie.year, Movie.rating,
+                                       UserMovie.watched_date,
+                                       func.group_concat(Genre.name, '|').label('genres'))
+                 .select_from(UserMovie)
+                 .join(Movie, Movie.id == UserMovie.movie_id)
+                 .outerjoin(MovieGenre, MovieGenre.movie_id == Movie.id)
+                 .outerjoin(Genre, Genre.id == MovieGenre.genre_id)
+                 .filter(UserMovie.user_id == user_id)
+                 .group_by(UserMovie.movie_id)
+                 .order_by(UserMovie.movie_id)
+                 .execution_options(yield_per=chunk_size))
+        yield from query
+
+    def iter_user_reviews(self, user_id: int, chunk_size: int = 1000):
+        """Stream all reviews written by a user, fetching ``chunk_size`` rows at a time."""
+        query = (self.reader.query(Review.id, Review.movie_id, Movie.name.label('movie_name'),
+                                       Review.text, Review.rating, Review.created_at)
+                 .join(Movie, Movie.id == Review.movie_id)
+                 .filter(Review.user_id == user_id)
+                 .order_by(Review.id)
+                 .execution_options(yield_per=chunk_size))
+        yield from query
+
+    def _user_movie_rows(self, user_id: int, fields):
+        """Build the SELECT of ``fields`` over a user's library for the row methods below."""
+        query = (select(*columns(MOVIE_COLUMNS, fields))
+                 .select_from(UserMovie)
+                 .join(Movie, Movie.id == UserMovie.movie_id)
+                 .where(UserMovie.user_id == user_id))
+        if MOVIE_STATS_FIELDS.intersection(fields):
+            query = query.outerjoin(MovieStats, MovieStats.movie_id == UserMovie.movie_id)
+        return query
+
+    def iter_user_movie_rows(self, user_id: int, fields, after: int = None, limit: int = None,
+                             chunk_size: int = 1000):
+        """Stream the given ``fields`` of a user's movies, ordered by movie ID.
+
+        Only the columns named in ``fields`` (keys of ``MOVIE_COLUMNS``) are
+        selected, and rows are fetched ``chunk_size`` at a time as tuples, so
+        no ORM objects are built. ``after`` and ``limit`` bound the rows on the
+        (user_id, movie_id) primary key.
+        """
+        query = self._user_movie_rows(user_id, fields)
+        if after is not None:
+            query = query.where(UserMovie.movie_id > after)
+        query = query.order_by(UserMovie.movie_id).limit(limit).execution_options(yield_per=chunk_size)
+        yield from self.reader.execute(query)
+
+    def get_user_movie_row(self, user_id: int, movie_id: int, fields):
+        """Return the given ``fields`` of one movie in a user's library as a row, or None."""
+        query = self._user_movie_rows(user_id, fields).where(UserMovie.movie_id == movie_id)
+        return self.reader.execute(query).first()
+
+    def iter_user_review_rows(self, user_id: int, fields, movie_id: int = None, after: int = None,
+                              limit: int = None, chunk_size: int = 1000):
+        """Stream the given ``fields`` of a user's reviews, ordered by review ID.
+
+        Like ``iter_user_movie_rows``, for the keys of ``REVIEW_COLUMNS``.
+        Pass ``movie_id`` to only return the reviews of that movie.
+        """
+        query = select(*columns(REVIEW_COLUMNS, fields)).where(Review.user_id == user_id)
+        if movie_id is not None:
+            query = query.where(Review.movie_id == movie_id)
+        if after is not None:
+            query = query.where(Review.id > after)
+        query = query.order_by(Review.id).limit(limit).execution_options(yield_per=chunk_size)
+        yield from self.reader.execute(query)
+
+    def get_genre_rows(self, fields):
+        """Return the given ``fields`` (keys of ``GENRE_COLUMNS``) of every genre, ordered by ID."""
+        return self.reader.execute(select(*columns(GENRE_COLUMNS, fields)).order_by(Genre.id)).all()
+
+    def get_user_movie_words(self, user_id: int):
+        """Return the movie IDs of a user's library as bitmap words, in ascending word order.
+
+        See ``_bitmap_words``; a 1M movie library comes back in 31K rows
+        instead of 1M.
+        """
+        word, bits = _bitmap_words(UserMovie.movie_id)
+        query = select(word, bits).where(UserMovie.user_id == user_id).group_by(word).order_by(word)
+        return self.reader.execute(query).all()
+
+    def get_movies_readonly(self, movie_ids: list):
+        """Return MovieRows with stats and genres for ``movie_ids``, in the order given.
+
+        IDs of movies that do not exist are skipped.
+        """
+        if not movie_ids:
+            return []
+        movies = {row.id: row for row in self._to_movie_rows(
+            self._movie_rows_query().filter(Movie.id.in_(movie_ids)).all())}
+        return [movies[movie_id] for movie_id in movie_ids if movie_id in movies]
+
+    def iter_movie_genre_words(self, chunk_size: int = 10000):
+        """Stream the movies of every genre as ``(genre_id, word, bits)`` bitmap words.
+
+        Rows come ordered by genre and word, ``chunk_size`` at a time. See
+        ``_bitmap_words``.
+        """
+        word, bits = _bitmap_words(MovieGenre.movie_id)
+        query = (select(MovieGenre.genre_id, word, bits)
+                 .group_by(MovieGenre.genre_id, word)
+                 .order_by(MovieGenre.genre_id, word)
+                 .execution_options(yield_per=chunk_size))
+        yield from self.reader.execute(query)
+
+    def get_genre_index_changes(self, after: int = 0, limit: int = None):
+        """Return the logged ``movie_genres`` changes with an ID above ``after``, oldest first."""
+        query = (select(GenreIndexChange.id, GenreIndexChange.movie_id, GenreIndexChange.genre_id,
+                        GenreIndexChange.added, GenreIndexChange.changed_at)
+                 .where(GenreIndexChange.id > after)
+                 .order_by(GenreIndexChange.id)
+                 .limit(limit))
+        return self.reader.execute(query).all()
+
+    def get_last_genre_index_change(self):
+        """Return the most recent logged ``movie_genres`` change, or None when the log is empty."""
+        query = (select(GenreIndexChange.id, GenreIndexChange.movie_id, GenreIndexChange.genre_id,
+                        GenreIndexChange.added, GenreIndexChange.changed_at)
+                 .order_by(GenreIndexChange.id.desc())
+                 .limit(1))
+        return self.reader.execute(query).first()
+
+    def prune_genre_index_changes(self, keep: int):
+        """Delete all but the ``keep`` most recent logged ``movie_genres`` changes.
+
+        Processes whose genre index is older than the oldest kept change
+        rebuild it from ``movie_genres`` on their next sync.
+
+        Returns:
+            int: The number of changes deleted.
+        """
+        last = self.db.session.execute(select(func.max(GenreIndexChange.id))).scalar()
+        if last is None:
+            return 0
+        result = self.db.session.execute(delete(GenreIndexChange).where(GenreIndexChange.id <= last - keep))
+        self._commit()
+        return result.rowcount
 
     def add_user(self, name: str, email: str, password: str):
         """Add a new user to the database with the provided name, email, and password."""
         user = User(name=name, email=email, password=password)
         self.db.session.add(user)
-        self.db.session.commit()
+        self._commit()
         return user
 
     def get_user_by_email(self, email: str):
         """Retrieve a user by their email address."""
-        return self.db.session.query(User).filter(User.email == email).first()
+        return self.reader.query(User).filter(User.email == email).first()
 
     def get_user_by_id(self, user_id: int):
         """Retrieve a user by their unique ID."""
-        return self.db.session.query(User).filter(User.id == user_id).first()
+        return self.reader.query(User).filter(User.id == user_id).first()
+
+    def get_versions(self, user_id: int, movie_id: int = None):
+        """Retrieve the current version of a user and, optionally, of one of their movies.
+
+        Always read from the database, never from the user cache, in a single
+        primary key lookup. The movie version is None when ``movie_id`` is not
+        given or the movie is not in the user's library.
+
+        Returns:
+            tuple: ``(user_version, movie_version)``, or None if the user does not exist.
+        """
+        movie_version = None
+        if movie_id is not None:
+            movie_version = (select(Movie.version)
+                             .join(UserMovie, UserMovie.movie_id == Movie.id)
+                             .where(Movie.id == movie_id, UserMovie.user_id == user_id)
+                             .scalar_subquery())
+        return self.reader.execute(select(User.version, movie_version).where(User.id == user_id)).first()
+
+    def get_cached_user_by_id(self, user_id: int):
+        """Retrieve a user by ID, answering from the in-process user cache when possible.
+
+        The cache holds plain column values. On a hit the user is rebuilt and
+        attached to the current session without emitting any SQL. Cached
+        entries are dropped whenever a user row is updated or deleted.
+        """
+        user_id = int(user_id)
+        values = user_cache.get(user_id)
+        if values is None:
+            user = self.get_user_by_id(user_id)
+            if user is not None:
+                user_cache.set(user_id, {attr.key: getattr(user, attr.key)
+                                         for attr in inspect(User).column_attrs})
+            return user
+
+        user = User(**values)
+        make_transient_to_detached(user)
+        return self.reader.merge(user, load=False)
 
     def delete_user(self, user_id: int):
         """Delete a user and associated data by their unique ID."""
-        user = self.get_user_by_id(user_id)
+        user = self.db.session.get(User, user_id)
         if user:
+            # Their reviews disappear from other owners' pages
+            self._touch(*touch_movies(reviewed_movie_ids(user_id)))
             self.db.session.delete(user)
-            self.db.session.commit()
+            self._commit()
+        user_cache.invalidate(int(user_id))
+        fragment_cache.invalidate('user', [int(user_id)])
+
+    def update_password(self, user_id: int, password_hash: str):
+        """Replace a user's stored password hash."""
+        user = self.db.session.get(User, user_id)
+        if user:
+            user.password = password_hash
+            self._commit()
+        return user
+
+    def count_user_rows(self, user_id: int, limit: int):
+        """Count the user's library entries and reviews, stopping at ``limit`` of each.
+
+        Bounding the count keeps the check cheap for very large accounts, where
+        only "more than ``limit``" matters.
+        """
+        total = 0
+        for model in (UserMovie, Review):
+            rows = select(model.user_id).where(model.user_id == user_id).limit(limit + 1).subquery()
+            total += self.reader.execute(select(func.count()).select_from(rows)).scalar()
+        return total
+
+    def request_user_deletion(self, user_id: int):
+        """Flag a user for a background purge so they can no longer log in."""
+        user = self.db.session.get(User, user_id)
+        if user and user.deletion_requested_at is None:
+            user.deletion_requested_at = datetime.utcnow()
+            self._commit()
+        return user
+
+    def get_pending_deletion_ids(self):
+        """Retrieve the IDs of users whose purge has not finished yet."""
+        return self.db.session.scalars(
+            select(User.id).where(User.deletion_requested_at.isnot(None)).order_by(User.id)
+        ).all()
+
+    def purge_user(self, user_id: int, chunk_size: int = 500):
+        """Delete a user and all of their data in many short transactions.
+
+        Reviews and library entries are removed ``chunk_size`` rows per commit,
+        together with any movies left without an owner, so the SQLite write
+        lock is only ever held briefly. Each chunk is independent: if the purge
+        is interrupted, calling it again continues where it stopped.
+        """
+        session = self.db.session
+        while True:
+            reviews = session.execute(
+                select(Review.id, Review.movie_id).where(Review.user_id == user_id).limit(chunk_size)
+            ).all()
+            if not reviews:
+                break
+            session.execute(delete(Review).where(Review.id.in_([review.id for review in reviews])))
+            reviewed_ids = {review.movie_id for review in reviews if review.movie_id is not None}
+            refresh_movie_stats(session, reviewed_ids)
+            self._touch(*touch_movies(reviewed_ids))
+            session.commit()
+            fragment_cache.invalidate('review', [review.id for review in reviews])
+            fragment_cache.invalidate('movie', reviewed_ids)
+
+        while True:
+            movie_ids = session.scalars(
+                select(UserMovie.movie_id).where(UserMovie.user_id == user_id).limit(chunk_size)
+            ).all()
+            if not movie_ids:
+                break
+            session.execute(delete(UserMovie).where(UserMovie.user_id == user_id,
+                                                    UserMovie.movie_id.in_(movie_ids)))
+            orphan_ids = session.scalars(
+                select(Movie.id).where(Movie.id.in_(movie_ids), ~Movie.user_movies.any())
+            ).all()
+            if orphan_ids:
+                session.execute(delete(Review).where(Review.movie_id.in_(orphan_ids)))
+                session.execute(delete(MovieGenre).where(MovieGenre.movie_id.in_(orphan_ids)))
+                session.execute(delete(MovieStats).where(MovieStats.movie_id.in_(orphan_ids)))
+                session.execute(delete(Movie).where(Movie.id.in_(orphan_ids)))
+            session.commit()
+            fragment_cache.invalidate('movie', orphan_ids)
+
+        self.delete_user(user_id)
 
     def add_movie(self, name: str, director: str, year: int, rating: float):
         """Add a new movie to the database with specified details."""
         movie = Movie(name=name, director=director, year=year, rating=rating)
         self.db.session.add(movie)
-        self.db.session.commit()
+        self._commit()
         return movie
 
     def update_movie(self, movie_id: int, title: str, director: str, year: int, rating: float):
         """Update details of an existing movie by its ID."""
-        movie = Movie.query.get(movie_id)
+        movie = self.db.session.get(Movie, movie_id)
         if movie:
-            movie.title = title
+            movie.name = title
             movie.director = director
             movie.year = year
             movie.rating = rating
-            self.db.session.commit()
+            self._touch(*touch_movies([movie_id]))
+            fragment_cache.invalidate('movie', [movie.id])
+            self._commit()
 
     def delete_movie(self, movie_id: int):
         """Delete a movie from the database by its ID."""
-        movie = Movie.query.get(movie_id)
+        movie = self.db.session.get(Movie, movie_id)
         if movie:
+            self._touch(*touch_movies([movie_id]))
+            fragment_cache.invalidate('movie', [movie.id])
             self.db.session.delete(movie)
-            self.db.session.commit()
+            self._commit()
 
     def get_all_genre(self):
         """Retrieve all genres from the database."""
-        return self.db.session.query(Genre).all()
+        return self.reader.query(Genre).all()
 
     def get_genres_by_ids(self, ids: list):
         """Retrieve multiple genres by a list of IDs."""
-        return self.db.session.query(Genre).filter(Genre.id.in_(ids)).all()
+        return self.reader.query(Genre).filter(Genre.id.in_(ids)).all()
 
     def add_user_movie(self, user_id: int, movie_id: int):
         """Associate a movie with a user."""
         user_movie = UserMovie(user_id=user_id, movie_id=movie_id)
         self.db.session.add(user_movie)
-        self.db.session.commit()
+        self._touch(touch_users([user_id]))
+        self._commit()
 
     def add_user_review(self, movie_id: int, user_id: int, text: str, rating: float):
         """Add a review by a user for a specific movie."""
         review = Review(movie_id=movie_id, user_id=user_id, text=text, rating=rating)
         self.db.session.add(review)
-        self.db.session.commit()
+        self._touch(*touch_movies([movie_id]), touch_users([user_id]))
+        fragment_cache.invalidate('movie', [int(movie_id)])
+        self._commit()
+
+    def sync_movie_genres(self, movie_id: int, genre_ids: list):
+        """Make ``genre_ids`` the exact set of genres of a movie.
+
+        Takes two statements however many genres change: one DELETE of the
+        genres not in the set and one INSERT ... SELECT of those missing,
+        which also skips IDs that are not genres.
+        """
+        genre_ids = sorted({int(genre_id) for genre_id in genre_ids})
+        session = self.db.session
+        session.flush()
+        session.execute(delete(MovieGenre).where(MovieGenre.movie_id == movie_id,
+                                                 MovieGenre.genre_id.notin_(genre_ids)))
+        if genre_ids:
+            session.execute(upsert(session.get_bind(MovieGenre).dialect, MovieGenre)
+                            .from_select(['genre_id', 'movie_id'],
+                                         select(Genre.id, literal(movie_id)).where(Genre.id.in_(genre_ids)))
+                            .on_conflict_do_nothing())
+        movie = session.identity_map.get(identity_key(Movie, movie_id))
+        if movie is not None:
+            session.expire(movie, ['genres'])
+        self._touch(*touch_movies([movie_id]))
+        fragment_cache.invalidate('movie', [int(movie_id)])
+        self._commit()
 
     def delete_genre(self, genre_id: int):
         """Delete a genre by its ID."""
-        genre = Genre.query.get(genre_id)
+        genre = self.db.session.get(Genre, genre_id)
         if genre:
+            self._touch(*touch_movies(select(MovieGenre.movie_id).where(MovieGenre.genre_id == genre_id)))
+            fragment_cache.invalidate('genre', [genre.id])
             self.db.session.delete(genre)
-            self.db.session.commit()
+            self._commit()
 
     def add_genre(self, name: str, description: str):
         """Add a new genre to the database."""
         genre = Genre(name=name, description=description)
         self.db.session.add(genre)
-        self.db.session.commit()
+        self._commit()
 
     def get_genres_by_name(self, name: str):
         """Retrieve a genre by its name."""
-        return self.db.session.query(Genre).filter(Genre.name == name).first()
+        return self.reader.query(Genre).filter(Genre.name == name).first()
 
     def get_user_reviews_for_movie(self, movie_id: int, user_id: int):
         """Retrieve all reviews a user has made for a specific movie."""
-        return (self.db.session.query(Review)
+        return (self.reader.query(Review)
                 .filter(Review.movie_id == movie_id, Review.user_id == user_id)
                 .all())
 
-    def get_movie_by_id(self, movie_id: int, user_id: int):
-        """Retrieve a movie by ID associated with a specific user."""
-        return (self.db.session.query(Movie)
-                .join(UserMovie)
-                .filter(Movie.id == movie_id, UserMovie.user_id == user_id)
-                .first())
+    def get_user_reviews_for_movie_readonly(self, movie_id: int, user_id: int):
+        """Read-only variant of ``get_user_reviews_for_movie``, returning ReviewRows."""
+        query = (select(Review.id, Review.movie_id, Review.user_id, Review.text, Review.rating, Review.created_at,
+                        Review.version)
+                 .where(Review.movie_id == movie_id, Review.user_id == user_id))
+        return [ReviewRow(*row) for row in self.reader.execute(query)]
+
+    def get_movie_by_id(self, movie_id: int, user_id: int, with_genres: bool = False):
+        """Retrieve a movie by ID associated with a specific user.
+
+        Pass ``with_genres=True`` when the caller renders the movie's genres.
+        """
+        query = (self.reader.query(Movie)
+                 .join(UserMovie)
+                 .filter(Movie.id == movie_id, UserMovie.user_id == user_id)
+                 .options(joinedload(Movie.stats)))
+        if with_genres:
+            query = query.options(selectinload(Movie.genres))
+        return query.first()
+
+    def get_movie_by_id_readonly(self, movie_id: int, user_id: int):
+        """Read-only variant of ``get_movie_by_id``: a MovieRow with stats and genres, or None."""
+        row = (self._movie_rows_query()
+               .join(UserMovie, UserMovie.movie_id == Movie.id)
+               .filter(Movie.id == movie_id, UserMovie.user_id == user_id)
+               .first())
+        return self._to_movie_rows([row])[0] if row is not None else None
+
+    def get_movie_recommendations(self, movie_id: int, user_id: int, limit: int = 10):
+        """Retrieve the movies most often saved together with a movie.
+
+        A single query over the precomputed ``movie_recommendations`` primary
+        key, skipping movies already in the user's library.
+        """
+        return (self.reader.query(Movie)
+                .join(MovieRecommendation, MovieRecommendation.recommended_id == Movie.id)
+                .filter(MovieRecommendation.movie_id == movie_id,
+                        ~Movie.user_movies.any(UserMovie.user_id == user_id))
+                .order_by(MovieRecommendation.rank)
+                .limit(limit)
+                .all())
+
+    def get_movie_recommendations_readonly(self, movie_id: int, user_id: int, limit: int = 10):
+        """Read-only variant of ``get_movie_recommendations``, returning MovieRows without genres."""
+        rows = (self._movie_rows_query()
+                .join(MovieRecommendation, MovieRecommendation.recommended_id == Movie.id)
+                .filter(MovieRecommendation.movie_id == movie_id,
+                        ~Movie.user_movies.any(UserMovie.user_id == user_id))
+                .order_by(MovieRecommendation.rank)
+                .limit(limit)
+                .all())
+        return [movie_row(row) for row in rows]
 
     def delete_review(self, review_id: int):
         """Delete a review by its ID."""
-        review = Review.query.get(review_id)
+        review = self.db.session.get(Review, review_id)
         if review:
+            self._touch(*touch_movies([review.movie_id]), touch_users([review.user_id]))
+            fragment_cache.invalidate('review', [review.id])
+            fragment_cache.invalidate('movie', [review.movie_id])
             self.db.session.delete(review)
-            self.db.session.commit()
+            self._commit()
 
     def delete_movie_genre(self, movie_id: int, genre_id: int):
         """Remove association between a movie and a genre by their IDs."""
@@ -136,13 +718,15 @@ class SQLiteDataManager(DataManagerInterface, ABC):
                        .filter(MovieGenre.movie_id == movie_id, MovieGenre.genre_id == genre_id)
                        .first())
         if movie_genre:
+            self._touch(*touch_movies([movie_id]))
+            fragment_cache.invalidate('movie', [int(movie_id)])
             self.db.session.delete(movie_genre)
-            self.db.session.commit()
+            self._commit()
 
     def get_review_by_id(self, review_id: int):
         """Retrieve a review by its unique ID."""
-        return self.db.session.query(Review).filter(Review.id == review_id).first()
+        return self.reader.query(Review).filter(Review.id == review_id).first()
 
     def get_genre_by_id(self, genre_id: int):
         """Retrieve a genre by its unique ID."""
-        return self.db.session.query(Genre).filter(Genre.id == genre_id).first()
+        return self.reader.query(Genre).filter(Genre.id == genre_id).first()
@@ -0,0 +1,49 @@
+from sqlalchemy import Select, select, update
+
+from app.models.movie import Movie
+from app.models.review import Review
+from app.models.user import User
+from app.models.user_movie import UserMovie
+
+# Statements that bump the ``version`` counters read by the conditional GET
+# handling in ``user_routes``. A user's version covers their library page, so
+# a change to a movie also bumps every user who saved it. The statements are
+# plain UPDATEs, shared by the sync and async data managers.
+
+
+def touch_users(user_ids):
+    """Return the statement bumping the version of ``user_ids``."""
+    return (update(User)
+            .where(User.id.in_(list(user_ids)))
+            .values(version=User.version + 1)
+            .execution_options(synchronize_session=False))
+
+
+def touch_movies(movie_ids, owners=True):
+    """Return the statements bumping some movies and every user who saved one of them.
+
+    Args:
+        movie_ids: Movie IDs, or a SELECT of movie IDs.
+        owners: Whether to bump the users who saved the movies as well. Pass
+            False for changes that only show on the movie's own page.
+    """
+    if not isinstance(movie_ids, Select):
+        movie_ids = list(movie_ids)
+    statements = [
+        update(Movie)
+        .where(Movie.id.in_(movie_ids))
+        .values(version=Movie.version + 1)
+        .execution_options(synchronize_session=False),
+    ]
+    if owners:
+        statements.append(
+            update(User)
+            .where(User.id.in_(select(UserMovie.user_id).where(UserMovie.movie_id.in_(movie_ids))))
+            .values(version=User.version + 1)
+            .execution_options(synchronize_session=False))
+    return statements
+
+
+def reviewed_movie_ids(user_id):
+    """Return the SELECT of the movies a user has reviewed."""
+    return select(Review.movie_id).where(Review.user_id == user_id, Review.movie_id.isnot(None))
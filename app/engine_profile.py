@@ -0,0 +1,49 @@
+from sqlalchemy import event
+
+# PRAGMAs whose value is a keyword rather than a number
+_KEYWORD_VALUES = {'journal_mode', 'synchronous', 'temp_store', 'foreign_keys'}
+
+
+def pragma_statements(pragmas):
+    """Return the PRAGMA statements for a ``{name: value}`` mapping."""
+    statements = []
+    for name, value in pragmas.items():
+        if not name.isidentifier():
+            raise ValueError(f'Invalid SQLite pragma name: {name!r}')
+        if name in _KEYWORD_VALUES:
+            value = str(value)
+            if not value.isalnum():
+                raise ValueError(f'Invalid value for PRAGMA {name}: {value!r}')
+        else:
+            value = int(value)
+        statements.append(f'PRAGMA {name}={value}')
+    return statements
+
+
+def configure_engine(engine, pragmas):
+    """Apply ``pragmas`` to every new DBAPI connection of a SQLite ``engine``.
+
+    Other backends are left untouched. The settings are per connection, so
+    they are issued from a ``connect`` listener rather than once at startup.
+    """
+    if engine.dialect.name != 'sqlite' or not pragmas:
+        return
+    statements = pragma_statements(pragmas)
+
+    def set_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        try:
+            for statement in statements:
+                cursor.execute(statement)
+        finally:
+            cursor.close()
+
+    event.listen(engine, 'connect', set_pragmas)
+
+
+def init_app(app, db):
+    """Apply the ``SQLITE_PRAGMAS`` profile to all engines of ``db``."""
+    pragmas = app.config.get('SQLITE_PRAGMAS') or {}
+    with app.app_context():
+        for engine in db.engines.values():
+            configure_engine(engine, pragmas)
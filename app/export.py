@@ -0,0 +1,71 @@
+import csv
+import io
+import json
+from datetime import datetime
+
+LIBRARY_FIELDS = ('id', 'name', 'director', 'year', 'rating', 'watched_date', 'genres')
+REVIEW_FIELDS = ('id', 'movie_id', 'movie_name', 'text', 'rating', 'created_at')
+
+EXPORT_KINDS = {
+    'library': LIBRARY_FIELDS,
+    'reviews': REVIEW_FIELDS,
+}
+
+MIMETYPES = {
+    'csv': 'text/csv',
+    'ndjson': 'application/x-ndjson',
+}
+
+
+def json_default(value):
+    """Serialize the values ``json`` cannot handle itself; datetimes as ISO 8601."""
+    if isinstance(value, datetime):
+        return value.isoformat()
+    raise TypeError(f'{type(value).__name__} is not JSON serializable')
+
+
+def iter_csv(rows, fields, batch_size=500):
+    """Yield CSV text for ``rows``, starting with a header line.
+
+    Rows are buffered ``batch_size`` at a time so the response is sent in
+    reasonably sized pieces rather than one tiny write per row.
+    """
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(fields)
+    for count, row in enumerate(rows, 1):
+        writer.writerow(row)
+        if count % batch_size == 0:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+    yield buffer.getvalue()
+
+
+def iter_ndjson(rows, fields, batch_size=500):
+    """Yield newline-delimited JSON for ``rows``, one object per row.
+
+    A ``genres`` field holding ``|``-joined names is emitted as a list.
+    """
+    lines = []
+    for row in rows:
+        record = dict(zip(fields, row))
+        if 'genres' in record:
+            record['genres'] = record['genres'].split('|') if record['genres'] else []
+        lines.append(json.dumps(record, default=json_default))
+        if len(lines) == batch_size:
+            yield '\n'.join(lines) + '\n'
+            lines = []
+    if lines:
+        yield '\n'.join(lines) + '\n'
+
+
+def iter_export(data_manager, user_id, kind, export_format, chunk_size=1000):
+    """Stream a user's ``library`` or ``reviews`` in ``csv`` or ``ndjson`` format."""
+    fields = EXPORT_KINDS[kind]
+    if kind == 'library':
+        rows = data_manager.iter_user_library(user_id, chunk_size=chunk_size)
+    else:
+        rows = data_manager.iter_user_reviews(user_id, chunk_size=chunk_size)
+    serializer = iter_csv if export_format == 'csv' else iter_ndjson
+    return serializer(rows, fields)
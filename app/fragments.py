@@ -0,0 +1,52 @@
+"""The ``{% cache %}`` template tag, which memoizes rendered fragments.
+
+    {% cache 'movie', movie.id, movie.version %}
+        ...
+    {% endcache %}
+
+The first two arguments name the object the fragment shows and group its
+entries for ``fragment_cache.invalidate``; the remaining ones, typically the
+object's version, complete the key. The template location and the request's
+script root are added automatically. Keys must cover everything the body
+reads: per-user or per-request values do not belong inside a cached block.
+"""
+from flask import has_request_context, request
+from jinja2 import nodes
+from jinja2.ext import Extension
+
+from app.cache import fragment_cache
+
+
+class FragmentCacheExtension(Extension):
+    tags = {'cache'}
+
+    def parse(self, parser):
+        lineno = next(parser.stream).lineno
+        args = [parser.parse_expression()]
+        while parser.stream.skip_if('comma'):
+            args.append(parser.parse_expression())
+        if len(args) < 2:
+            parser.fail('cache tag needs at least a kind and an id', lineno)
+        body = parser.parse_statements(('name:endcache',), drop_needle=True)
+        location = nodes.Const(f'{parser.name}:{lineno}')
+        return nodes.CallBlock(self.call_method('_render', [location, nodes.List(args)]),
+                               [], [], body).set_lineno(lineno)
+
+    def _render(self, location, args, caller):
+        if not self.environment.fragment_cache_enabled:
+            return caller()
+        script_root = request.script_root if has_request_context() else ''
+        key = (args[0], args[1], location, script_root, *args[2:])
+        fragment = fragment_cache.get(key)
+        if fragment is None:
+            fragment = caller()
+            fragment_cache.set(key, fragment)
+        return fragment
+
+
+def init_app(app):
+    """Register the ``{% cache %}`` tag and size the cache from the config."""
+    app.jinja_env.add_extension(FragmentCacheExtension)
+    max_bytes = app.config['FRAGMENT_CACHE_MAX_BYTES']
+    app.jinja_env.fragment_cache_enabled = max_bytes > 0
+    fragment_cache.configure(max_bytes=max_bytes)
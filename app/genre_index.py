@@ -0,0 +1,341 @@
+"""In-process bitmap index of movie genres, for faceted browsing of a library.
+
+Every genre maps to a bitset of the IDs of its movies, held in a Python int:
+bit ``n`` is set when movie ``n`` has the genre. A user's library is a bitset
+too, so filtering it by any combination of genres is a few ``&`` and a facet
+count is ``int.bit_count()``, both running in C over ``max(movie ID) / 8``
+bytes.
+
+The bitsets are built once from ``movie_genres`` and then follow the
+``genre_index_changes`` log, which triggers fill on every insert and delete
+(``app/models/genre_index_change.py``). ``sync`` replays the changes logged
+since the last one applied with a single primary key range query, so every
+worker sees the writes of the others, bulk imports and cascades included.
+
+The bitsets are saved to ``GENRE_INDEX_FILE`` when the process exits, with
+the last applied change as a fingerprint. The next process loads the file and
+only replays what changed since; if that change is no longer in the log
+(pruned, or another database), it rebuilds instead.
+"""
+import atexit
+import hashlib
+import json
+import logging
+import os
+import re
+import struct
+import tempfile
+import threading
+import time
+from collections import namedtuple
+from itertools import groupby, islice
+from operator import itemgetter
+
+from sqlalchemy.engine import make_url
+
+from app.cache import library_bitset_cache
+from app.datamanager.sqlite_data_manager import BITMAP_WORD_BITS
+
+logger = logging.getLogger(__name__)
+
+# Bumped whenever the layout of the saved file changes
+FILE_FORMAT = 2
+
+# One little-endian bitmap word of the data manager's ``*_words`` methods
+_WORD = struct.Struct({8: '<B', 16: '<H', 32: '<I', 64: '<Q'}[BITMAP_WORD_BITS])
+# Set bit positions of every byte value, lowest first
+_BYTE_BITS = tuple(tuple(bit for bit in range(8) if value >> bit & 1) for value in range(256))
+_NONZERO_BYTE = re.compile(b'[^\x00]')
+
+# ``matching``: bitset of the library movies having every selected genre.
+# ``counts``: genre ID -> how many of those movies also have that genre.
+Facets = namedtuple('Facets', ['matching', 'total', 'counts'])
+
+
+def bitset(ids):
+    """Return the bitset of the non-negative integers ``ids``."""
+    ids = list(ids)
+    if not ids:
+        return 0
+    buffer = bytearray(max(ids) // 8 + 1)
+    for value in ids:
+        buffer[value >> 3] |= 1 << (value & 7)
+    return int.from_bytes(buffer, 'little')
+
+
+def from_words(words):
+    """Return the bitset of ``(word, bits)`` rows of the data manager's ``*_words`` methods.
+
+    ``words`` must be in ascending word order.
+    """
+    words = list(words)
+    if not words:
+        return 0
+    buffer = bytearray((words[-1][0] + 1) * _WORD.size)
+    for word, bits in words:
+        _WORD.pack_into(buffer, word * _WORD.size, bits)
+    return int.from_bytes(buffer, 'little')
+
+
+def iter_ids(bits, descending=False):
+    """Yield the positions of the set bits of ``bits``, in ascending or descending order.
+
+    Runs of zero bytes are skipped by a regular expression scan, so sparse
+    bitsets cost little more than their set bits.
+    """
+    if bits <= 0:
+        return
+    data = bits.to_bytes((bits.bit_length() + 7) // 8, 'little')
+    if descending:
+        last = len(data) - 1
+        for match in _NONZERO_BYTE.finditer(data[::-1]):
+            index = last - match.start()
+            for bit in reversed(_BYTE_BITS[data[index]]):
+                yield index * 8 + bit
+    else:
+        for match in _NONZERO_BYTE.finditer(data):
+            index = match.start()
+            for bit in _BYTE_BITS[data[index]]:
+                yield index * 8 + bit
+
+
+def anchor(change):
+    """Return a logged change as a JSON-ready list, to recognize it in the saved file."""
+    return [change.id, change.movie_id, change.genre_id, bool(change.added), str(change.changed_at)]
+
+
+def page_ids(bits, after=None, before=None, per_page=50):
+    """Return up to ``per_page + 1`` IDs of ``bits`` bounded like a ``keyset_page`` query.
+
+    IDs above ``after`` come in ascending order, IDs below ``before`` in
+    descending order, ready for ``pagination.page_from_items``.
+    """
+    if before is not None:
+        bits &= (1 << max(before, 0)) - 1
+        return list(islice(iter_ids(bits, descending=True), per_page + 1))
+    if after is not None:
+        bits &= -(1 << max(after + 1, 0))
+    return list(islice(iter_ids(bits), per_page + 1))
+
+
+class GenreBitmapIndex:
+    """Genre ID -> bitset of movie IDs, kept in sync with the change log.
+
+    The mapping is replaced, never mutated, when changes are applied, so
+    readers use whatever snapshot they picked up without locking. ``sync``
+    takes a lock so only one thread replays the log at a time.
+    """
+
+    def __init__(self):
+        self._bits = {}
+        self._lock = threading.Lock()
+        self.path = None
+        self.database = None
+        # ID and values of the last applied change; None until loaded or built
+        self.position = None
+        self.anchor = None
+        self.dirty = False
+        self.rebuilds = 0
+        self.loads = 0
+        self.applied = 0
+        self.syncs = 0
+        self.sync_seconds = 0.0
+
+    def configure(self, path=None, database=None):
+        """Set the file the index is saved to and the database it belongs to, and drop the index."""
+        with self._lock:
+            self.path = path
+            self.database = database
+            self._bits, self.position, self.anchor, self.dirty = {}, None, None, False
+
+    def sync(self, data_manager):
+        """Bring the bitsets up to date with the change log.
+
+        The first call loads the saved file, or rebuilds the index from
+        ``movie_genres``. Later calls cost one query returning the changes
+        logged since the previous one.
+
+        Returns:
+            int: The number of changes applied.
+        """
+        started = time.perf_counter()
+        with self._lock:
+            if self.position is None and not self._load(data_manager):
+                self._rebuild(data_manager)
+            changes = data_manager.get_genre_index_changes(after=self.position)
+            if changes and changes[0].id != self.position + 1:
+                # Changes after ours were pruned; AUTOINCREMENT IDs have no other gaps
+                self._rebuild(data_manager)
+                changes = data_manager.get_genre_index_changes(after=self.position)
+            if changes:
+                self._apply(changes)
+            self.syncs += 1
+            self.sync_seconds += time.perf_counter() - started
+            return len(changes)
+
+    def rebuild(self, data_manager):
+        """Build the bitsets again from ``movie_genres`` and save them."""
+        with self._lock:
+            self._rebuild(data_manager)
+
+    def facets(self, library, genre_ids=()):
+        """Filter the bitset ``library`` by every one of ``genre_ids`` and count the other genres in it.
+
+        Returns:
+            Facets: The matching movies, their number and the count per genre.
+        """
+        bits = self._bits
+        matching = library
+        for genre_id in genre_ids:
+            matching &= bits.get(genre_id, 0)
+        counts = {genre_id: (matching & genre_bits).bit_count() for genre_id, genre_bits in bits.items()}
+        return Facets(matching, matching.bit_count(), counts)
+
+    def movies(self, genre_id):
+        """Return the bitset of the movies of a genre."""
+        return self._bits.get(genre_id, 0)
+
+    def save(self):
+        """Write the bitsets to ``path``, replacing the previous file atomically.
+
+        Returns:
+            bool: Whether the file was written.
+        """
+        with self._lock:
+            return self._save()
+
+    def stats(self):
+        """Return the index counters as a dict."""
+        bits = self._bits
+        return {
+            'genres': len(bits),
+            'pairs': sum(genre_bits.bit_count() for genre_bits in bits.values()),
+            'bytes': sum((genre_bits.bit_length() + 7) // 8 for genre_bits in bits.values()),
+            'position': self.position,
+            'rebuilds': self.rebuilds,
+            'loads': self.loads,
+            'applied': self.applied,
+            'syncs': self.syncs,
+            'avg_sync_ms': self.sync_seconds * 1000 / self.syncs if self.syncs else 0.0,
+            'path': self.path,
+        }
+
+    def _apply(self, changes):
+        bits = dict(self._bits)
+        for change in changes:
+            mask = 1 << change.movie_id
+            genre_bits = bits.get(change.genre_id, 0)
+            genre_bits = genre_bits | mask if change.added else genre_bits & ~mask
+            if genre_bits:
+                bits[change.genre_id] = genre_bits
+            else:
+                bits.pop(change.genre_id, None)
+        self._bits = bits
+        self.position, self.anchor = changes[-1].id, anchor(changes[-1])
+        self.applied += len(changes)
+        self.dirty = True
+
+    def _rebuild(self, data_manager):
+        # Read the log position first: changes committed while the pairs are
+        # read are replayed afterwards, and replaying a change is idempotent.
+        last = data_manager.get_last_genre_index_change()
+        self._bits = {genre_id: from_words((word, bits) for _, word, bits in rows)
+                      for genre_id, rows in groupby(data_manager.iter_movie_genre_words(), key=itemgetter(0))}
+        self.position, self.anchor = (last.id, anchor(last)) if last is not None else (0, None)
+        self.rebuilds += 1
+        self.dirty = True
+        self._save()
+
+    def _load(self, data_manager):
+        if not self.path or not os.path.exists(self.path):
+            return False
+        try:
+            with open(self.path, 'rb') as saved:
+                header = json.loads(saved.readline())
+                data = saved.read()
+        except (OSError, ValueError):
+            logger.warning("Unreadable genre index file %s, rebuilding", self.path, exc_info=True)
+            return False
+        position = header.get('position')
+        if header.get('format') != FILE_FORMAT or header.get('database') != self.database or not position:
+            return False
+        # The anchor change must still be in the log with the same values,
+        # otherwise the file belongs to another database or an older log
+        changes = data_manager.get_genre_index_changes(after=position - 1, limit=1)
+        if not changes or changes[0].id != position or anchor(changes[0]) != header.get('anchor'):
+            return False
+        bits, offset = {}, 0
+        for genre_id, size in header['genres']:
+            bits[genre_id] = int.from_bytes(data[offset:offset + size], 'little')
+            offset += size
+        self._bits, self.position, self.anchor = bits, position, header['anchor']
+        self.loads += 1
+        self.dirty = False
+        return True
+
+    def _save(self):
+        if not self.path or self.position is None:
+            return False
+        bits = self._bits
+        chunks = [genre_bits.to_bytes((genre_bits.bit_length() + 7) // 8, 'little') for genre_bits in bits.values()]
+        header = {
+            'format': FILE_FORMAT,
+            'database': self.database,
+            'position': self.position,
+            'anchor': self.anchor,
+            'genres': [[genre_id, len(chunk)] for genre_id, chunk in zip(bits, chunks)],
+        }
+        directory = os.path.dirname(os.path.abspath(self.path))
+        try:
+            handle, temporary = tempfile.mkstemp(dir=directory, prefix='.genre-index-')
+            with os.fdopen(handle, 'wb') as output:
+                output.write(json.dumps(header).encode() + b'\n')
+                output.writelines(chunks)
+            os.replace(temporary, self.path)
+        except OSError:
+            logger.warning("Could not save the genre index to %s", self.path, exc_info=True)
+            return False
+        self.dirty = False
+        return True
+
+    def _save_if_dirty(self):
+        with self._lock:
+            if self.dirty:
+                self._save()
+
+
+# The process-wide index, configured by init_app
+genre_index = GenreBitmapIndex()
+
+
+def default_path(database):
+    """Return a file in the temporary directory named after the database URL."""
+    digest = hashlib.sha256(database.encode()).hexdigest()[:16]
+    return os.path.join(tempfile.gettempdir(), f'movie-app-genre-index-{digest}.bin')
+
+
+def library_bits(data_manager, user_id, version):
+    """Return the bitset of the movies in a user's library at ``version``.
+
+    Cached in ``library_bitset_cache`` under the user's version, which every
+    library change bumps, so stale bitsets are never read.
+    """
+    key = (user_id, version)
+    bits = library_bitset_cache.get(key)
+    if bits is None:
+        bits = from_words(data_manager.get_user_movie_words(user_id))
+        library_bitset_cache.set(key, bits)
+    return bits
+
+
+def init_app(app):
+    """Point the index at the app's database and, with ``GENRE_INDEX_PERSIST``, at its file."""
+    database = make_url(app.config['SQLALCHEMY_DATABASE_URI']).render_as_string(hide_password=True)
+    path = None
+    if app.config['GENRE_INDEX_PERSIST']:
+        path = app.config['GENRE_INDEX_FILE'] or default_path(database)
+    genre_index.configure(path=path, database=database)
+    library_bitset_cache.configure(maxsize=app.config['LIBRARY_BITSET_CACHE_SIZE'])
+
+
+atexit.register(genre_index._save_if_dirty)
@@ -0,0 +1,170 @@
+import threading
+import time
+from bisect import bisect_left
+from collections import deque
+
+from flask import g, has_app_context, request
+from sqlalchemy import event
+
+# Upper bounds, in milliseconds, of the request latency histogram buckets.
+HISTOGRAM_BUCKETS_MS = (5, 10, 25, 50, 100, 250, 500, 1000, 2500)
+
+
+class RequestStats:
+    """SQL statistics collected while handling a single request."""
+
+    __slots__ = ('query_count', 'db_time', 'commit_count', 'slowest_time', 'slowest_statement')
+
+    def __init__(self):
+        self.query_count = 0
+        self.db_time = 0.0
+        self.commit_count = 0
+        self.slowest_time = 0.0
+        self.slowest_statement = None
+
+    def record_query(self, statement, elapsed):
+        self.query_count += 1
+        self.db_time += elapsed
+        if elapsed >= self.slowest_time:
+            self.slowest_time = elapsed
+            self.slowest_statement = statement
+
+
+class EndpointMetrics:
+    """Rolling window of request samples kept per endpoint.
+
+    Each endpoint keeps its last ``window`` samples, so the histogram and
+    percentiles reflect recent traffic rather than the lifetime of the process.
+    """
+
+    def __init__(self, window=1000):
+        self.window = window
+        self._samples = {}
+        self._slowest = {}
+        self._lock = threading.Lock()
+
+    def record(self, endpoint, duration, stats):
+        """Store one request sample for ``endpoint``. Durations are in seconds."""
+        sample = (duration * 1000, stats.query_count, stats.db_time * 1000, stats.commit_count)
+        with self._lock:
+            samples = self._samples.get(endpoint)
+            if samples is None:
+                samples = self._samples[endpoint] = deque(maxlen=self.window)
+            samples.append(sample)
+            slowest = self._slowest.get(endpoint)
+            if stats.slowest_statement and (slowest is None or stats.slowest_time * 1000 > slowest[0]):
+                self._slowest[endpoint] = (stats.slowest_time * 1000, stats.slowest_statement)
+
+    def snapshot(self):
+        """Return a summary per endpoint, sorted by endpoint name."""
+        with self._lock:
+            samples = {endpoint: list(values) for endpoint, values in self._samples.items()}
+            slowest = dict(self._slowest)
+
+        summary = []
+        for endpoint in sorted(samples):
+            values = samples[endpoint]
+            durations = sorted(value[0] for value in values)
+            count = len(values)
+            histogram = [0] * (len(HISTOGRAM_BUCKETS_MS) + 1)
+            for duration in durations:
+                histogram[bisect_left(HISTOGRAM_BUCKETS_MS, duration)] += 1
+            summary.append({
+                'endpoint': endpoint,
+                'count': count,
+                'p50': _percentile(durations, 50),
+                'p95': _percentile(durations, 95),
+                'p99': _percentile(durations, 99),
+                'max': durations[-1],
+                'avg_queries': sum(value[1] for value in values) / count,
+                'avg_db_ms': sum(value[2] for value in values) / count,
+                'avg_commits': sum(value[3] for value in values) / count,
+                'histogram': histogram,
+                'slowest_statement': slowest.get(endpoint),
+            })
+        return summary
+
+    def reset(self):
+        with self._lock:
+            self._samples.clear()
+            self._slowest.clear()
+
+
+def _percentile(sorted_values, percent):
+    index = max(0, int(round(percent / 100 * len(sorted_values))) - 1)
+    return sorted_values[index]
+
+
+metrics = EndpointMetrics()
+
+
+def _current_stats():
+    if has_app_context():
+        return g.get('sql_stats')
+    return None
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault('query_start_time', []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    elapsed = time.perf_counter() - conn.info['query_start_time'].pop()
+    stats = _current_stats()
+    if stats is not None:
+        stats.record_query(statement, elapsed)
+
+
+def _commit(conn):
+    stats = _current_stats()
+    if stats is not None:
+        stats.commit_count += 1
+
+
+def instrument_engine(engine):
+    """Attach the query timing hooks to ``engine`` (idempotent)."""
+    if not event.contains(engine, 'before_cursor_execute', _before_cursor_execute):
+        event.listen(engine, 'before_cursor_execute', _before_cursor_execute)
+        event.listen(engine, 'after_cursor_execute', _after_cursor_execute)
+        event.listen(engine, 'commit', _commit)
+
+
+def _start_request():
+    g.sql_stats = RequestStats()
+    g.request_start_time = time.perf_counter()
+
+
+def _finish_request(response):
+    stats = g.pop('sql_stats', None)
+    start = g.pop('request_start_time', None)
+    if stats is None or start is None:
+        return response
+
+    duration = time.perf_counter() - start
+    if request.endpoint and request.endpoint != 'static':
+        metrics.record(request.endpoint, duration, stats)
+    response.headers.add(
+        'Server-Timing',
+        f'db;dur={stats.db_time * 1000:.2f};desc="{stats.query_count} queries", '
+        f'db-slowest;dur={stats.slowest_time * 1000:.2f}, '
+        f'db-commits;desc="{stats.commit_count} commits", '
+        f'app;dur={duration * 1000:.2f}'
+    )
+    return response
+
+
+def init_app(app, db):
+    """Register the SQL instrumentation hooks on ``app`` and its engines.
+
+    Does nothing when ``SQL_INSTRUMENTATION`` is disabled in the configuration.
+    """
+    if not app.config.get('SQL_INSTRUMENTATION', True):
+        return
+
+    metrics.window = app.config.get('SQL_METRICS_WINDOW', metrics.window)
+    with app.app_context():
+        for engine in db.engines.values():
+            instrument_engine(engine)
+
+    app.before_request(_start_request)
+    app.after_request(_finish_request)
@@ -0,0 +1,128 @@
+"""Process-wide logging through a queue, written out on a background thread.
+
+``init_app`` installs a single ``QueueHandler`` on the root logger. Request
+threads only check the level, render the message and put the record on a
+bounded queue; a ``QueueListener`` thread formats it and does the I/O. The
+message itself is still rendered on the calling thread, as its arguments may
+be ORM objects that must not be touched from another thread, so log with
+``%s`` arguments rather than f-strings: below ``LOG_LEVEL`` nothing is
+rendered at all.
+
+``LOG_SAMPLE_RATES`` keeps only a fraction of the records of the given
+levels, e.g. ``{'INFO': 0.1}``. When the queue is full, records are dropped
+rather than blocking the request; both are counted in ``stats``.
+"""
+import atexit
+import logging
+import queue
+import random
+import threading
+from logging.handlers import QueueHandler, QueueListener
+
+
+class SamplingFilter(logging.Filter):
+    """Keep each record with the probability given for its level, 1 if absent."""
+
+    def __init__(self, rates):
+        super().__init__()
+        self.rates = {logging.getLevelName(level) if isinstance(level, str) else level: rate
+                      for level, rate in rates.items()}
+        self.sampled_out = 0
+
+    def filter(self, record):
+        rate = self.rates.get(record.levelno, 1.0)
+        if rate >= 1.0 or random.random() < rate:
+            return True
+        self.sampled_out += 1
+        return False
+
+
+class _DroppingQueueHandler(QueueHandler):
+    """A ``QueueHandler`` that drops records instead of waiting when the queue is full."""
+
+    def __init__(self, log_queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+_lock = threading.Lock()
+_handler = None
+_listener = None
+_sampler = None
+_output = None
+_queue_size = 0
+
+
+def init_app(app):
+    """Route every log record of the process through the queue, per the ``LOG_*`` settings.
+
+    Calling it again, e.g. for a second app, replaces the previous setup.
+    """
+    global _handler, _sampler, _output, _queue_size
+    output = logging.StreamHandler()
+    output.setFormatter(logging.Formatter(app.config['LOG_FORMAT']))
+    with _lock:
+        _stop()
+        root = logging.getLogger()
+        if _handler is not None:
+            root.removeHandler(_handler)
+        _queue_size = app.config['LOG_QUEUE_SIZE']
+        _handler = _DroppingQueueHandler(queue.Queue(_queue_size))
+        _sampler = SamplingFilter(app.config['LOG_SAMPLE_RATES'])
+        _handler.addFilter(_sampler)
+        _output = output
+        root.addHandler(_handler)
+        root.setLevel(app.config['LOG_LEVEL'])
+        _start()
+
+
+def reset():
+    """Start a new listener on a new queue, e.g. in a process forked from one that logged."""
+    with _lock:
+        if _handler is None:
+            return
+        _handler.queue = queue.Queue(_queue_size)
+        _start()
+
+
+def stats():
+    """Return the queue counters as a dict."""
+    with _lock:
+        if _handler is None:
+            return {'level': logging.getLevelName(logging.getLogger().level), 'queued': 0, 'queue_size': 0,
+                    'dropped': 0, 'sampled_out': 0}
+        return {
+            'level': logging.getLevelName(logging.getLogger().level),
+            'queued': _handler.queue.qsize(),
+            'queue_size': _queue_size,
+            'dropped': _handler.dropped,
+            'sampled_out': _sampler.sampled_out,
+        }
+
+
+def _start():
+    global _listener
+    _listener = QueueListener(_handler.queue, _output, respect_handler_level=True)
+    _listener.start()
+
+
+def _stop():
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+
+
+def _shutdown():
+    # Write out what is still queued before the interpreter exits
+    with _lock:
+        _stop()
+
+
+atexit.register(_shutdown)
@@ -7,7 +7,7 @@ class Genre(db.Model):
     __tablename__ = 'genres'
 
     id = db.Column(db.Integer, primary_key=True)
-    name = db.Column(db.String, nullable=False)
+    name = db.Column(db.String, nullable=False, index=True)
     description = db.Column(db.String, nullable=False)
 
     def __repr__(self):
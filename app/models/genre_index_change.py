@@ -0,0 +1,122 @@
+from sqlalchemy import DateTime
+from sqlalchemy.ext.compiler import compiles
+from sqlalchemy.sql.functions import FunctionElement
+
+from app import db
+
+# Log every row added to or removed from movie_genres, whichever path wrote
+# it: the data manager, bulk imports or the cascades of deleted movies and
+# genres. Rows skipped by INSERT OR IGNORE fire no trigger.
+CREATE_STATEMENTS = (
+    "CREATE TRIGGER IF NOT EXISTS movie_genres_index_ai AFTER INSERT ON movie_genres BEGIN "
+    "INSERT INTO genre_index_changes(movie_id, genre_id, added) VALUES (new.movie_id, new.genre_id, 1); "
+    "END",
+    "CREATE TRIGGER IF NOT EXISTS movie_genres_index_ad AFTER DELETE ON movie_genres BEGIN "
+    "INSERT INTO genre_index_changes(movie_id, genre_id, added) VALUES (old.movie_id, old.genre_id, 0); "
+    "END",
+)
+
+DROP_STATEMENTS = (
+    "DROP TRIGGER IF EXISTS movie_genres_index_ai",
+    "DROP TRIGGER IF EXISTS movie_genres_index_ad",
+)
+
+# The same on PostgreSQL. Sequence values are handed out before commit, so
+# concurrent writers could commit changes out of ID order and a sync would
+# skip the late one; the table lock makes them take their IDs in commit order.
+POSTGRESQL_CREATE_STATEMENTS = (
+    "CREATE OR REPLACE FUNCTION log_movie_genre_change() RETURNS trigger AS $$ BEGIN "
+    "LOCK TABLE genre_index_changes IN SHARE ROW EXCLUSIVE MODE; "
+    "IF TG_OP = 'INSERT' THEN "
+    "INSERT INTO genre_index_changes(movie_id, genre_id, added) VALUES (NEW.movie_id, NEW.genre_id, true); "
+    "ELSE "
+    "INSERT INTO genre_index_changes(movie_id, genre_id, added) VALUES (OLD.movie_id, OLD.genre_id, false); "
+    "END IF; RETURN NULL; END $$ LANGUAGE plpgsql",
+    "DROP TRIGGER IF EXISTS movie_genres_index_ai ON movie_genres",
+    "CREATE TRIGGER movie_genres_index_ai AFTER INSERT ON movie_genres "
+    "FOR EACH ROW EXECUTE FUNCTION log_movie_genre_change()",
+    "DROP TRIGGER IF EXISTS movie_genres_index_ad ON movie_genres",
+    "CREATE TRIGGER movie_genres_index_ad AFTER DELETE ON movie_genres "
+    "FOR EACH ROW EXECUTE FUNCTION log_movie_genre_change()",
+)
+
+POSTGRESQL_DROP_STATEMENTS = (
+    "DROP TRIGGER IF EXISTS movie_genres_index_ai ON movie_genres",
+    "DROP TRIGGER IF EXISTS movie_genres_index_ad ON movie_genres",
+    "DROP FUNCTION IF EXISTS log_movie_genre_change()",
+)
+
+_TRIGGERS = {
+    'sqlite': (CREATE_STATEMENTS, DROP_STATEMENTS),
+    'postgresql': (POSTGRESQL_CREATE_STATEMENTS, POSTGRESQL_DROP_STATEMENTS),
+}
+
+
+class change_timestamp(FunctionElement):
+    """The time a change is logged: CURRENT_TIMESTAMP, with milliseconds on SQLite."""
+
+    type = DateTime()
+    inherit_cache = True
+
+
+@compiles(change_timestamp)
+def _compile_change_timestamp(element, compiler, **kw):
+    return 'CURRENT_TIMESTAMP'
+
+
+@compiles(change_timestamp, 'sqlite')
+def _compile_change_timestamp_sqlite(element, compiler, **kw):
+    # SQLite's CURRENT_TIMESTAMP only has whole seconds
+    return "strftime('%Y-%m-%d %H:%M:%f', 'now')"
+
+
+class GenreIndexChange(db.Model):
+    """Model logging the changes to ``movie_genres`` for the in-process genre index.
+
+    Every process replays the changes after the last one it has applied
+    (``app/genre_index.py``), so its bitmaps follow writes made anywhere.
+    IDs are AUTOINCREMENT (a sequence on PostgreSQL), so they are never
+    reused after old changes are pruned.
+    """
+
+    __tablename__ = 'genre_index_changes'
+    __table_args__ = {'sqlite_autoincrement': True}
+
+    id = db.Column(db.Integer, primary_key=True)
+    movie_id = db.Column(db.Integer, nullable=False)
+    genre_id = db.Column(db.Integer, nullable=False)
+    added = db.Column(db.Boolean, nullable=False)
+    # Sub-second precision, so a change also identifies the database it was logged in
+    changed_at = db.Column(db.DateTime, nullable=False, server_default=change_timestamp())
+
+    def __repr__(self):
+        return f"<GenreIndexChange(id={self.id}, movie_id={self.movie_id}, genre_id={self.genre_id}, " \
+               f"added={self.added})>"
+
+
+def create_genre_index_triggers(bind):
+    """Create the triggers that fill ``genre_index_changes``.
+
+    Safe to call repeatedly. ``bind`` is an Engine or Connection, for example
+    ``op.get_bind()`` inside an Alembic migration.
+
+    Raises:
+        NotImplementedError: On a database without trigger statements here,
+            where the genre index would never see any change.
+    """
+    for statement in _trigger_statements(bind)[0]:
+        bind.exec_driver_sql(statement)
+
+
+def drop_genre_index_triggers(bind):
+    """Remove the triggers that fill ``genre_index_changes``."""
+    for statement in _trigger_statements(bind)[1]:
+        bind.exec_driver_sql(statement)
+
+
+def _trigger_statements(bind):
+    try:
+        return _TRIGGERS[bind.dialect.name]
+    except KeyError:
+        raise NotImplementedError(f'The genre index change log has no triggers for {bind.dialect.name}; '
+                                  f'genre filters would go stale') from None
@@ -0,0 +1,15 @@
+from app import db
+
+
+class ImportCheckpoint(db.Model):
+    """Model recording how far a bulk import of a source file has progressed."""
+
+    __tablename__ = 'import_checkpoints'
+
+    source = db.Column(db.String, primary_key=True)
+    rows = db.Column(db.Integer, nullable=False, default=0)
+    updated_at = db.Column(db.DateTime, default=db.func.current_timestamp(),
+                           onupdate=db.func.current_timestamp())
+
+    def __repr__(self):
+        return f"<ImportCheckpoint(source='{self.source}', rows={self.rows})>"
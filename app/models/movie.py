@@ -1,6 +1,19 @@
+import time
+
 from app import db
 
 
+def initial_version():
+    """Return the starting ``version`` of a new movie, user or review.
+
+    Seeded from the clock rather than 1, so a row that reuses the ID of a
+    deleted one never repeats an ``(id, version)`` pair; cached fragments
+    and ETags are keyed on those pairs in every worker. The value needs 51
+    bits, so ``version`` columns are ``BigInteger``.
+    """
+    return time.time_ns() // 1000
+
+
 class Movie(db.Model):
     """Model representing a movie."""
 
@@ -11,6 +24,8 @@ class Movie(db.Model):
     director = db.Column(db.String, nullable=False)
     year = db.Column(db.Integer, nullable=False)
     rating = db.Column(db.Float, nullable=True)
+    # Bumped by the data manager whenever the movie page would render differently
+    version = db.Column(db.BigInteger, nullable=False, default=initial_version, server_default='1')
 
     genres = db.relationship(
         'Genre',
@@ -8,7 +8,7 @@ class MovieGenre(db.Model):
 
     # Define the two foreign keys and set them as a composite primary key
     genre_id = db.Column(db.Integer, db.ForeignKey(Genre.id, ondelete="CASCADE"), primary_key=True)
-    movie_id = db.Column(db.Integer, db.ForeignKey(Movie.id, ondelete="CASCADE"), primary_key=True)
+    movie_id = db.Column(db.Integer, db.ForeignKey(Movie.id, ondelete="CASCADE"), primary_key=True, index=True)
 
     def __repr__(self):
         """
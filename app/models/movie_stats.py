@@ -0,0 +1,134 @@
+from sqlalchemy import delete, event, func, insert, select
+
+from app import db
+from app.models.movie import Movie
+from app.models.review import Review
+from app.models.upsert import upsert
+
+
+class MovieStats(db.Model):
+    """Model holding the review aggregates of a movie.
+
+    Maintained incrementally whenever a review is added or deleted, so pages
+    can show the review count and average rating without aggregating the
+    ``reviews`` table. Movies without reviews have no row.
+    """
+
+    __tablename__ = 'movie_stats'
+
+    movie_id = db.Column(db.Integer, db.ForeignKey(Movie.id, ondelete="CASCADE"), primary_key=True)
+    review_count = db.Column(db.Integer, nullable=False, default=0)
+    rating_count = db.Column(db.Integer, nullable=False, default=0)
+    rating_sum = db.Column(db.Float, nullable=False, default=0)
+
+    movie = db.relationship(
+        Movie,
+        backref=db.backref('stats', uselist=False, cascade="all, delete-orphan", lazy=True),
+    )
+
+    @property
+    def average_rating(self):
+        """Mean of the movie's review ratings, or None if no review is rated."""
+        return self.rating_sum / self.rating_count if self.rating_count else None
+
+    def __repr__(self):
+        return f"<MovieStats(movie_id={self.movie_id}, review_count={self.review_count})>"
+
+
+# Tolerance when comparing rating sums, which are added up in a different order
+# by the incremental updates and by a full recompute.
+RATING_SUM_TOLERANCE = 1e-6
+
+
+def _recompute(movie_ids=None):
+    """SELECT the aggregates of ``movie_ids`` (all movies if None) from ``reviews``."""
+    statement = (select(Review.movie_id,
+                        func.count().label('review_count'),
+                        func.count(Review.rating).label('rating_count'),
+                        func.coalesce(func.sum(Review.rating), 0.0).label('rating_sum'))
+                 .where(Review.movie_id.isnot(None))
+                 .group_by(Review.movie_id))
+    if movie_ids is not None:
+        statement = statement.where(Review.movie_id.in_(movie_ids))
+    return statement
+
+
+def refresh_movie_stats(connection, movie_ids):
+    """Recompute the aggregates of ``movie_ids`` from their reviews.
+
+    For bulk writes that bypass the ORM; ``connection`` may also be a
+    session. Each movie's reviews are read through the
+    ``ix_reviews_movie_id_user_id`` index.
+    """
+    movie_ids = list(movie_ids)
+    if not movie_ids:
+        return
+    columns = ['movie_id', 'review_count', 'rating_count', 'rating_sum']
+    connection.execute(delete(MovieStats).where(MovieStats.movie_id.in_(movie_ids)))
+    connection.execute(insert(MovieStats).from_select(columns, _recompute(movie_ids)))
+
+
+def rebuild_movie_stats(connection):
+    """Recompute the aggregates of every movie from scratch."""
+    columns = ['movie_id', 'review_count', 'rating_count', 'rating_sum']
+    connection.execute(delete(MovieStats))
+    connection.execute(insert(MovieStats).from_select(columns, _recompute()))
+
+
+def stale_movie_stats(connection):
+    """Compare the stored aggregates with a full recompute.
+
+    Returns:
+        list[tuple]: ``(movie_id, stored, expected)`` for every movie whose
+        stored ``(review_count, rating_count, rating_sum)`` is wrong; a missing
+        row is reported as stored None.
+    """
+    expected = {row.movie_id: (row.review_count, row.rating_count, row.rating_sum)
+                for row in connection.execute(_recompute())}
+    stale = []
+    for row in connection.execute(select(MovieStats.movie_id, MovieStats.review_count,
+                                         MovieStats.rating_count, MovieStats.rating_sum)):
+        stored = (row.review_count, row.rating_count, row.rating_sum)
+        # A row whose reviews were all deleted is kept with zero counts
+        wanted = expected.pop(row.movie_id, (0, 0, 0.0))
+        if stored[:2] != wanted[:2] or abs(stored[2] - wanted[2]) > RATING_SUM_TOLERANCE:
+            stale.append((row.movie_id, stored, wanted))
+    stale.extend((movie_id, None, wanted) for movie_id, wanted in expected.items())
+    return sorted(stale)
+
+
+@event.listens_for(Review, 'after_insert')
+def count_added_review(mapper, connection, target):
+    """Add a new review to its movie's aggregates in the same transaction."""
+    if target.movie_id is None:
+        return
+    rated = target.rating is not None
+    statement = upsert(connection.dialect, MovieStats).values(
+        movie_id=target.movie_id,
+        review_count=1,
+        rating_count=int(rated),
+        rating_sum=target.rating if rated else 0,
+    )
+    connection.execute(statement.on_conflict_do_update(
+        index_elements=[MovieStats.movie_id],
+        set_={
+            'review_count': MovieStats.review_count + statement.excluded.review_count,
+            'rating_count': MovieStats.rating_count + statement.excluded.rating_count,
+            'rating_sum': MovieStats.rating_sum + statement.excluded.rating_sum,
+        },
+    ))
+
+
+@event.listens_for(Review, 'after_delete')
+def count_deleted_review(mapper, connection, target):
+    """Remove a deleted review from its movie's aggregates in the same transaction."""
+    if target.movie_id is None:
+        return
+    rated = target.rating is not None
+    connection.execute(
+        MovieStats.__table__.update()
+        .where(MovieStats.movie_id == target.movie_id)
+        .values(review_count=MovieStats.review_count - 1,
+                rating_count=MovieStats.rating_count - int(rated),
+                rating_sum=MovieStats.rating_sum - (target.rating if rated else 0))
+    )
@@ -0,0 +1,55 @@
+from sqlalchemy import event
+
+from app import db
+from app.models.movie import Movie
+from app.models.upsert import upsert
+from app.models.user_movie import UserMovie
+
+
+class MovieRecommendation(db.Model):
+    """Model holding the precomputed "also saved" movies of a movie.
+
+    The primary key makes reading a movie's recommendations in rank order a
+    single index range scan.
+    """
+
+    __tablename__ = 'movie_recommendations'
+
+    movie_id = db.Column(db.Integer, db.ForeignKey(Movie.id, ondelete="CASCADE"), primary_key=True)
+    rank = db.Column(db.Integer, primary_key=True, autoincrement=False)
+    recommended_id = db.Column(db.Integer, db.ForeignKey(Movie.id, ondelete="CASCADE"), nullable=False,
+                               index=True)
+    score = db.Column(db.Float, nullable=False)
+
+    recommended = db.relationship(Movie, foreign_keys=[recommended_id], lazy=True)
+
+    def __repr__(self):
+        return f"<MovieRecommendation(movie_id={self.movie_id}, rank={self.rank}, " \
+               f"recommended_id={self.recommended_id})>"
+
+
+class RecommendationQueue(db.Model):
+    """Model listing library additions not yet reflected in the recommendations."""
+
+    __tablename__ = 'recommendation_queue'
+
+    user_id = db.Column(db.Integer, primary_key=True, autoincrement=False)
+    movie_id = db.Column(db.Integer, primary_key=True)
+    queued_at = db.Column(db.DateTime, default=db.func.current_timestamp())
+
+    def __repr__(self):
+        return f"<RecommendationQueue(user_id={self.user_id}, movie_id={self.movie_id})>"
+
+
+@event.listens_for(UserMovie, 'after_insert')
+def queue_recommendation_refresh(mapper, connection, target):
+    """Queue the new library entry in the same transaction that saves it.
+
+    Marks the session so the queue is drained once the transaction commits.
+    """
+    connection.execute(upsert(connection.dialect, RecommendationQueue)
+                       .values(user_id=target.user_id, movie_id=target.movie_id)
+                       .on_conflict_do_nothing())
+    session = db.session.object_session(target)
+    if session is not None:
+        session.info['recommendations_queued'] = True
@@ -1,5 +1,5 @@
 from app import db
-from app.models.movie import Movie
+from app.models.movie import Movie, initial_version
 from app.models.user import User
 
 
@@ -7,13 +7,19 @@ class Review(db.Model):
     """Model representing a movie review."""
 
     __tablename__ = 'reviews'
+    __table_args__ = (
+        # Reviews of a movie, optionally narrowed to one user
+        db.Index('ix_reviews_movie_id_user_id', 'movie_id', 'user_id'),
+    )
 
     id = db.Column(db.Integer, primary_key=True, autoincrement=True)
     text = db.Column(db.String, nullable=False)
-    user_id = db.Column(db.Integer, db.ForeignKey(User.id))
+    user_id = db.Column(db.Integer, db.ForeignKey(User.id), index=True)
     movie_id = db.Column(db.Integer, db.ForeignKey(Movie.id))
     rating = db.Column(db.Float, nullable=True)
     created_at = db.Column(db.DateTime, default=db.func.current_timestamp())
+    # Keys the review's cached fragment; bump it whenever the review changes
+    version = db.Column(db.BigInteger, nullable=False, default=initial_version, server_default='1')
 
     def __repr__(self):
         return f"<Review(id={self.id}, text='{self.text}')>"
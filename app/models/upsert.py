@@ -0,0 +1,25 @@
+"""``INSERT ... ON CONFLICT`` constructs for the dialects that support them."""
+from sqlalchemy.dialects import postgresql, sqlite
+
+# Dialect name -> insert() construct with on_conflict_do_nothing/_do_update
+_INSERTS = {
+    'sqlite': sqlite.insert,
+    'postgresql': postgresql.insert,
+}
+
+
+def upsert(dialect, table):
+    """Return an INSERT into ``table`` that supports ``on_conflict_*`` on ``dialect``.
+
+    Args:
+        dialect: The ``Dialect`` of the connection the statement runs on.
+        table: A model or table.
+
+    Raises:
+        NotImplementedError: When the dialect has no ``ON CONFLICT`` clause.
+    """
+    try:
+        insert = _INSERTS[dialect.name]
+    except KeyError:
+        raise NotImplementedError(f'INSERT ... ON CONFLICT is not supported on {dialect.name}') from None
+    return insert(table)
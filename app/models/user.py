@@ -1,20 +1,32 @@
-from werkzeug.security import check_password_hash, generate_password_hash
 from flask_login import UserMixin
 from sqlalchemy import event
-from app.models.movie import Movie
+from sqlalchemy.orm import Session
+from app.models.movie import Movie, initial_version
 
 from app import db
+from app.cache import user_cache
+from app.passwords import password_hasher
 
 
 class User(db.Model, UserMixin):
     """Model representing a user."""
 
     __tablename__ = 'users'
+    __table_args__ = (
+        # Only holds the few users waiting for a purge
+        db.Index('ix_users_pending_deletion', 'id', sqlite_where=db.text('deletion_requested_at IS NOT NULL')),
+    )
 
     id = db.Column(db.Integer, primary_key=True)
     name = db.Column(db.String, nullable=False)
     email = db.Column(db.String(120), unique=True, nullable=False)
-    password = db.Column(db.String(100))
+    # Long enough for werkzeug's scrypt hashes (~160 characters)
+    password = db.Column(db.String(255))
+    # Set when the account is queued for a background purge; the user can no
+    # longer log in and is hidden from listings until the purge finishes.
+    deletion_requested_at = db.Column(db.DateTime, nullable=True)
+    # Bumped by the data manager whenever the user's library page would render differently
+    version = db.Column(db.BigInteger, nullable=False, default=initial_version, server_default='1')
     user_movies = db.relationship(
         'UserMovie',
         backref='users',
@@ -29,10 +41,10 @@ class User(db.Model, UserMixin):
     )
 
     def set_password(self, password):
-        self.password = generate_password_hash(password)
+        self.password = password_hasher.hash(password)
 
     def check_password(self, password):
-        return check_password_hash(self.password, password)
+        return password_hasher.verify(self.password, password)
 
     @property
     def is_admin(self):
@@ -40,7 +52,7 @@ class User(db.Model, UserMixin):
 
     @property
     def is_active(self):
-        return True
+        return self.deletion_requested_at is None
 
     @property
     def is_authenticated(self):
@@ -53,15 +65,57 @@ class User(db.Model, UserMixin):
         return f"User: {self.name}"
 
 
+# Largest number of IDs bound into a single IN (...) clause
+ORPHAN_CHUNK_SIZE = 500
+
+
+@event.listens_for(Session, 'before_flush')
+def collect_deleted_user_movies(session, flush_context, instances):
+    """Remember the movies of users about to be deleted in this flush.
+
+    The user's library is loaded by the delete cascade anyway, so collecting
+    the IDs here costs no extra query.
+    """
+    for target in session.deleted:
+        if isinstance(target, User):
+            movie_ids = session.info.setdefault('orphan_candidate_ids', set())
+            movie_ids.update(user_movie.movie_id for user_movie in target.user_movies)
+
+
+@event.listens_for(Session, 'after_flush_postexec')
+def cleanup_movies(session, flush_context):
+    """Delete the movies of deleted users that no other user has saved.
+
+    Only the deleted users' own movies are checked, instead of scanning the
+    whole movies table. Deletions made here are flushed by the next pass of
+    the same flush.
+    """
+    movie_ids = sorted(session.info.pop('orphan_candidate_ids', ()))
+    for start in range(0, len(movie_ids), ORPHAN_CHUNK_SIZE):
+        chunk = movie_ids[start:start + ORPHAN_CHUNK_SIZE]
+        orphaned_movies = (session.query(Movie)
+                           .filter(Movie.id.in_(chunk), ~Movie.user_movies.any())
+                           .all())
+        for movie in orphaned_movies:
+            session.delete(movie)
+
+
+@event.listens_for(User, 'after_update')
 @event.listens_for(User, 'after_delete')
-def cleanup_movies(mapper, connection, target):
-    # Access the current session directly from the connection context
-    session = db.session.object_session(target)
+def invalidate_cached_user(mapper, connection, target):
+    """Drop the user from the user loader cache when the row changes.
 
-    # Delete movies that have no associated user_movies
-    orphaned_movies = session.query(Movie).filter(~Movie.user_movies.any()).all()
-    for movie in orphaned_movies:
-        session.delete(movie)
+    The entry is dropped at flush time and again once the transaction commits,
+    so a concurrent request cannot re-cache the old values in between.
+    """
+    user_cache.invalidate(target.id)
+    session = db.session.object_session(target)
+    if session is not None:
+        session.info.setdefault('changed_user_ids', set()).add(target.id)
 
 
+@event.listens_for(Session, 'after_commit')
+def invalidate_committed_users(session):
+    for user_id in session.info.pop('changed_user_ids', ()):
+        user_cache.invalidate(user_id)
 
@@ -9,7 +9,7 @@ class UserMovie(db.Model):
     __tablename__ = 'user_movies'
 
     user_id = db.Column(db.Integer, db.ForeignKey(User.id, ondelete="CASCADE"), primary_key=True)
-    movie_id = db.Column(db.Integer, db.ForeignKey(Movie.id, ondelete="CASCADE"), primary_key=True)
+    movie_id = db.Column(db.Integer, db.ForeignKey(Movie.id, ondelete="CASCADE"), primary_key=True, index=True)
     watched_date = db.Column(db.DateTime, nullable=True)
 
     def __repr__(self):
@@ -0,0 +1,137 @@
+"""Password hashing on a small, bounded pool of worker threads.
+
+Hashing is deliberately slow, tens of milliseconds of CPU per call at the
+default work factors. Running it on a fixed number of workers caps how many
+cores a burst of logins can take from every other request; hashlib releases
+the GIL while it works. The request thread waits for the result, but only
+while the queue is short: once ``queue_size`` hashes are pending, new ones
+are refused with ``HashingBusy`` so the caller can answer 503 at once.
+"""
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, TimeoutError
+
+from werkzeug.security import check_password_hash, generate_password_hash
+
+
+class HashingBusy(Exception):
+    """Raised when the password hashing queue is full or too slow."""
+
+
+class PasswordHasher:
+    """Hashes and verifies passwords with werkzeug on a bounded worker pool.
+
+    ``method`` is any werkzeug hashing method, e.g. ``'scrypt'`` or
+    ``'pbkdf2:sha256:600000'``. Hashes made with other parameters verify as
+    usual and are reported by ``needs_rehash``.
+    """
+
+    def __init__(self, method='scrypt', workers=2, queue_size=32, timeout=10.0):
+        self._lock = threading.Lock()
+        self._executor = None
+        self.configure(method, workers, queue_size, timeout)
+
+    def configure(self, method=None, workers=None, queue_size=None, timeout=None):
+        """Change the hashing parameters and bounds, and reset the counters and workers."""
+        with self._lock:
+            if method is not None:
+                self.method = method
+                self._prefix = None
+            if workers is not None:
+                self.workers = workers
+            if queue_size is not None:
+                self.queue_size = queue_size
+            if timeout is not None:
+                self.timeout = timeout
+            self._reset()
+
+    def reset(self):
+        """Replace the workers, e.g. in a process forked from one that used them."""
+        with self._lock:
+            self._reset()
+
+    def hash(self, password):
+        """Return a new hash of ``password`` with the configured method."""
+        return self._run(generate_password_hash, password, self.method)
+
+    def verify(self, password_hash, password):
+        """Return whether ``password`` matches ``password_hash``."""
+        if not password_hash:
+            return False
+        return self._run(check_password_hash, password_hash, password)
+
+    def needs_rehash(self, password_hash):
+        """Return whether ``password_hash`` was made with other parameters than the configured ones."""
+        if self._prefix is None:
+            # Let werkzeug fill in the parameters the method leaves out, e.g.
+            # 'scrypt' -> 'scrypt:32768:8:1'; costs one hash per process.
+            self._prefix = self.hash('').split('$', 1)[0]
+        return password_hash.split('$', 1)[0] != self._prefix
+
+    def stats(self):
+        """Return the pool counters as a dict. Times are in milliseconds."""
+        with self._lock:
+            completed = self.completed
+            return {
+                'method': self.method,
+                'workers': self.workers,
+                'queue_size': self.queue_size,
+                'pending': self.pending,
+                'peak_pending': self.peak_pending,
+                'completed': completed,
+                'rejected': self.rejected,
+                'timed_out': self.timed_out,
+                'avg_wait_ms': self.wait_time * 1000 / completed if completed else 0.0,
+                'avg_hash_ms': self.hash_time * 1000 / completed if completed else 0.0,
+            }
+
+    def _reset(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False)
+        self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='password-hash')
+        self.pending = self.peak_pending = 0
+        self.completed = self.rejected = self.timed_out = 0
+        self.wait_time = self.hash_time = 0.0
+
+    def _run(self, func, *args):
+        with self._lock:
+            if self.pending >= self.queue_size:
+                self.rejected += 1
+                raise HashingBusy(f'{self.pending} password hashes pending')
+            self.pending += 1
+            self.peak_pending = max(self.peak_pending, self.pending)
+            executor = self._executor
+        submitted = time.perf_counter()
+
+        def task():
+            started = time.perf_counter()
+            try:
+                return func(*args)
+            finally:
+                finished = time.perf_counter()
+                with self._lock:
+                    self.pending -= 1
+                    self.completed += 1
+                    self.wait_time += started - submitted
+                    self.hash_time += finished - started
+
+        future = executor.submit(task)
+        try:
+            return future.result(timeout=self.timeout)
+        except TimeoutError:
+            with self._lock:
+                self.timed_out += 1
+            raise HashingBusy(f'Password hash took longer than {self.timeout}s')
+
+
+password_hasher = PasswordHasher()
+
+
+def init_app(app):
+    """Configure ``password_hasher`` from the ``PASSWORD_HASH_*`` settings."""
+    password_hasher.configure(
+        method=app.config['PASSWORD_HASH_METHOD'],
+        workers=app.config['PASSWORD_HASH_WORKERS'],
+        queue_size=app.config['PASSWORD_HASH_QUEUE_SIZE'],
+        timeout=app.config['PASSWORD_HASH_TIMEOUT'],
+    )
@@ -0,0 +1,51 @@
+"""Refresh the recommendations on the background worker after library additions.
+
+Kept apart from ``app.recommendations`` so that registering the hook at
+startup does not import NumPy and SciPy; the worker imports them on its
+first refresh.
+"""
+import logging
+import threading
+
+from flask import current_app, has_app_context
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+from app.tasks import run_in_background
+
+_refresh_scheduled = threading.Event()
+
+
+def drain_queue(db):
+    """Refresh the recommendations until the queue is empty."""
+    from app.recommendations import refresh_recommendations
+
+    _refresh_scheduled.clear()
+    k = current_app.config['RECOMMENDATIONS_PER_MOVIE']
+    batch_size = current_app.config['RECOMMENDATION_BATCH_SIZE']
+    while True:
+        with db.engine.begin() as connection:
+            if not refresh_recommendations(connection, k=k, batch_size=batch_size):
+                return
+
+
+def init_app(app, db):
+    """Refresh the recommendations in the background after library additions commit."""
+    app.extensions['recommendations_db'] = db
+    if not event.contains(Session, 'after_commit', _schedule_refresh):
+        event.listen(Session, 'after_commit', _schedule_refresh)
+
+
+def _schedule_refresh(session):
+    if not session.info.pop('recommendations_queued', False) or not has_app_context():
+        return
+    db = current_app.extensions.get('recommendations_db')
+    if db is None or _refresh_scheduled.is_set():
+        return
+    _refresh_scheduled.set()
+    try:
+        run_in_background(drain_queue, db)
+    except RuntimeError:
+        # The executor is shutting down
+        _refresh_scheduled.clear()
+        logging.warning("Recommendation refresh could not be scheduled")
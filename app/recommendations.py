@@ -0,0 +1,186 @@
+"""Item-to-item "users who saved this also saved" recommendations.
+
+Similarity is the cosine of the movies' columns in the binary user x movie
+matrix: the number of users who saved both movies, divided by the geometric
+mean of their popularity. The top ``k`` movies per movie are precomputed into
+``movie_recommendations`` with sparse matrix products in batches.
+
+Library additions are queued in ``recommendation_queue`` by a mapper event
+and folded in incrementally by ``refresh_recommendations``, which only loads
+the libraries of the users who saved an affected movie. The refresh is
+scheduled by ``app.recommendation_refresh``, so that NumPy and SciPy are
+only imported once it actually runs.
+"""
+import numpy as np
+from scipy import sparse
+from sqlalchemy import bindparam, delete, func, insert, select, update
+
+from app.datamanager.versions import touch_movies
+from app.models.movie import Movie
+from app.models.recommendation import MovieRecommendation, RecommendationQueue
+from app.models.user_movie import UserMovie
+
+# Largest number of IDs bound into a single IN (...) clause
+ID_CHUNK_SIZE = 500
+# Rows fetched from the driver at a time while loading associations
+FETCH_SIZE = 100000
+
+
+def _chunks(values, size=ID_CHUNK_SIZE):
+    for start in range(0, len(values), size):
+        yield values[start:start + size]
+
+
+def _load_pairs(connection, statement):
+    """Return the ``(user_id, movie_id)`` rows of ``statement`` as two int64 arrays."""
+    user_ids, movie_ids = [], []
+    result = connection.execute(statement.execution_options(yield_per=FETCH_SIZE))
+    for rows in result.partitions():
+        users, movies = zip(*rows)
+        user_ids.append(np.fromiter(users, dtype=np.int64, count=len(users)))
+        movie_ids.append(np.fromiter(movies, dtype=np.int64, count=len(movies)))
+    if not user_ids:
+        return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64)
+    return np.concatenate(user_ids), np.concatenate(movie_ids)
+
+
+def movie_user_matrix(user_ids, movie_ids):
+    """Build the binary movie x user CSR matrix of ``(user_id, movie_id)`` pairs.
+
+    Returns:
+        tuple: ``(matrix, movie_index)`` where row ``i`` of ``matrix`` belongs to
+        the movie ``movie_index[i]``.
+    """
+    movie_index, rows = np.unique(movie_ids, return_inverse=True)
+    user_index, columns = np.unique(user_ids, return_inverse=True)
+    matrix = sparse.csr_matrix((np.ones(len(rows), dtype=np.float32), (rows, columns)),
+                               shape=(len(movie_index), len(user_index)))
+    matrix.sum_duplicates()
+    matrix.data[:] = 1
+    return matrix, movie_index
+
+
+def top_k_similar(matrix, popularity, rows, k, batch_size):
+    """Find the ``k`` most similar movies of every row in ``rows``.
+
+    Args:
+        matrix: Binary movie x user CSR matrix.
+        popularity: Number of users who saved each movie (row) of ``matrix``.
+        rows: Row indices to compute recommendations for.
+        k: Recommendations kept per movie.
+        batch_size: Rows multiplied against the whole matrix at a time.
+
+    Yields:
+        tuple: ``(sources, targets, scores, ranks)`` arrays for each batch, with
+        row indices of ``matrix`` as sources and targets.
+    """
+    transposed = matrix.T.tocsr()
+    norms = np.sqrt(np.asarray(popularity, dtype=np.float64))
+    for batch in _chunks(np.asarray(rows), batch_size):
+        product = matrix[batch] @ transposed
+        product.sort_indices()
+        co_counts = product.tocoo()
+        local_rows = co_counts.row
+        sources = batch[local_rows]
+        keep = co_counts.col != sources
+        local_rows, sources, targets = local_rows[keep], sources[keep], co_counts.col[keep]
+        scores = co_counts.data[keep] / (norms[sources] * norms[targets])
+        # Cosines lie in (0, 1], so one stable argsort on "row + (1 - score)"
+        # orders every row by descending score, ties by target, several times
+        # faster than a lexsort on separate keys.
+        order = np.argsort(local_rows + (1 - np.minimum(scores, 1)) * 0.5, kind='stable')
+        sources, targets, scores = sources[order], targets[order], scores[order]
+        starts = np.flatnonzero(np.r_[True, sources[1:] != sources[:-1]])
+        ranks = np.arange(len(sources)) - np.repeat(starts, np.diff(np.r_[starts, len(sources)]))
+        keep = ranks < k
+        yield sources[keep], targets[keep], scores[keep], ranks[keep]
+
+
+def _store(connection, movie_index, batches):
+    """Insert computed batches into ``movie_recommendations``; returns the row count."""
+    count = 0
+    for sources, targets, scores, ranks in batches:
+        if len(sources):
+            connection.execute(insert(MovieRecommendation), [
+                {'movie_id': movie_id, 'rank': rank, 'recommended_id': recommended_id, 'score': score}
+                for movie_id, rank, recommended_id, score in zip(
+                    movie_index[sources].tolist(), ranks.tolist(),
+                    movie_index[targets].tolist(), scores.tolist())
+            ])
+            count += len(sources)
+    return count
+
+
+def rebuild_recommendations(connection, k=10, batch_size=2048):
+    """Recompute the recommendations of every movie from all library entries.
+
+    Returns:
+        int: The number of recommendation rows stored.
+    """
+    user_ids, movie_ids = _load_pairs(connection, select(UserMovie.user_id, UserMovie.movie_id))
+    connection.execute(delete(MovieRecommendation))
+    connection.execute(delete(RecommendationQueue))
+    connection.execute(update(Movie).values(version=Movie.version + 1))
+    if not len(movie_ids):
+        return 0
+    matrix, movie_index = movie_user_matrix(user_ids, movie_ids)
+    popularity = matrix.getnnz(axis=1)
+    return _store(connection, movie_index,
+                  top_k_similar(matrix, popularity, np.arange(len(movie_index)), k, batch_size))
+
+
+def refresh_recommendations(connection, k=10, batch_size=2048, limit=1000):
+    """Fold up to ``limit`` queued library additions into the recommendations.
+
+    Adding movie M to user U's library changes M's similarity to every other
+    movie in U's library, so M and U's library are recomputed. Only the
+    libraries of the users who saved one of those movies are loaded, which
+    holds every co-occurrence they take part in. Other movies that list M
+    keep their slightly stale scores for it until the next full rebuild.
+
+    Returns:
+        int: The number of queue entries processed.
+    """
+    queued = connection.execute(select(RecommendationQueue.user_id, RecommendationQueue.movie_id)
+                                .order_by(RecommendationQueue.queued_at).limit(limit)).all()
+    if not queued:
+        return 0
+
+    affected = {movie_id for _, movie_id in queued}
+    for user_chunk in _chunks(sorted({user_id for user_id, _ in queued})):
+        affected.update(connection.scalars(select(UserMovie.movie_id)
+                                           .where(UserMovie.user_id.in_(user_chunk))))
+    affected = sorted(affected)
+
+    users = set()
+    for movie_chunk in _chunks(affected):
+        users.update(connection.scalars(select(UserMovie.user_id).where(UserMovie.movie_id.in_(movie_chunk))))
+    user_ids, movie_ids = [], []
+    for user_chunk in _chunks(sorted(users)):
+        users_part, movies_part = _load_pairs(connection, select(UserMovie.user_id, UserMovie.movie_id)
+                                              .where(UserMovie.user_id.in_(user_chunk)))
+        user_ids.append(users_part)
+        movie_ids.append(movies_part)
+
+    for movie_chunk in _chunks(affected):
+        connection.execute(delete(MovieRecommendation).where(MovieRecommendation.movie_id.in_(movie_chunk)))
+        for statement in touch_movies(movie_chunk, owners=False):
+            connection.execute(statement)
+    if users:
+        matrix, movie_index = movie_user_matrix(np.concatenate(user_ids), np.concatenate(movie_ids))
+        # The submatrix only holds some of each movie's users; the cosine
+        # needs their global popularity.
+        popularity = np.zeros(len(movie_index), dtype=np.int64)
+        for movie_chunk in _chunks(movie_index.tolist()):
+            for movie_id, count in connection.execute(
+                    select(UserMovie.movie_id, func.count())
+                    .where(UserMovie.movie_id.in_(movie_chunk))
+                    .group_by(UserMovie.movie_id)):
+                popularity[np.searchsorted(movie_index, movie_id)] = count
+        rows = np.searchsorted(movie_index, np.intersect1d(movie_index, affected))
+        _store(connection, movie_index, top_k_similar(matrix, popularity, rows, k, batch_size))
+
+    connection.execute(delete(RecommendationQueue).where(RecommendationQueue.user_id == bindparam('queued_user'),
+                                                         RecommendationQueue.movie_id == bindparam('queued_movie')),
+                       [{'queued_user': user_id, 'queued_movie': movie_id} for user_id, movie_id in queued])
+    return len(queued)
@@ -1,13 +1,15 @@
-import logging
 from functools import wraps
-from flask import Blueprint, request, render_template, url_for, flash, redirect, session, abort
+from flask import Blueprint, request, render_template, url_for, flash, redirect, session, abort, current_app
 from app import db
+from app import logs
+from app.cache import dashboard_cache, fragment_cache, library_bitset_cache, user_cache
+from app.genre_index import genre_index
+from app.instrumentation import HISTOGRAM_BUCKETS_MS, metrics
+from app.passwords import password_hasher
+from app.tasks import run_in_background
 from app.datamanager.sqlite_data_manager import SQLiteDataManager
 from flask_login import current_user
 
-# Configure logging
-logging.basicConfig(level=logging.DEBUG)
-
 # Initialize the data manager
 data_manager = SQLiteDataManager(db)
 
@@ -35,12 +37,25 @@ def admin_required(f):
 def admin_dashboard():
     """Render the admin dashboard.
 
-    Retrieves all users and genres from the database and displays
-    the admin_dashboard.html template.
+    Shows one page of users with their library and review counts and all
+    genres with their movie counts, selected as plain columns in one
+    statement each. Both are kept in ``dashboard_cache`` for
+    ``ADMIN_DASHBOARD_CACHE_TTL`` seconds, so repeated refreshes cost no
+    queries. The ``after`` and ``before`` query parameters are user ID
+    cursors.
     """
-    users = data_manager.get_all_users()
-    genres = data_manager.get_all_genre()
-    return render_template('admin_dashboard.html', users=users, genres=genres)
+    after = request.args.get('after', type=int)
+    before = request.args.get('before', type=int)
+    per_page = current_app.config['USERS_PER_PAGE']
+    page = dashboard_cache.get(('users', after, before, per_page))
+    if page is None:
+        page = data_manager.get_user_summaries_page(after=after, before=before, per_page=per_page)
+        dashboard_cache.set(('users', after, before, per_page), page)
+    genres = dashboard_cache.get('genres')
+    if genres is None:
+        genres = data_manager.get_genre_summaries()
+        dashboard_cache.set('genres', genres)
+    return render_template('admin_dashboard.html', users=page.items, page=page, genres=genres)
 
 
 @admin_routes.route('/admin/genre/<genre_id>/delete')
@@ -52,6 +67,7 @@ def delete_genre(genre_id):
     Redirects to the admin dashboard after deletion.
     """
     data_manager.delete_genre(genre_id)
+    dashboard_cache.clear()
     flash('Genre is deleted', 'success')
     return redirect(url_for('admin_routes.admin_dashboard'))
 
@@ -73,6 +89,7 @@ def add_genre():
         flash('Genre already exists.', 'danger')
     else:
         data_manager.add_genre(name=name, description=description)
+        dashboard_cache.clear()
         flash('Genre added successfully!', 'success')
 
     return redirect(url_for('admin_routes.admin_dashboard'))
@@ -83,9 +100,35 @@ def add_genre():
 def delete_user(user_id):
     """Delete a user by their ID.
 
-    Removes the user from the database and flashes a success message.
-    Redirects to the admin dashboard after deletion.
+    Small accounts are removed right away. Accounts with more than
+    ``USER_PURGE_SYNC_LIMIT`` library entries and reviews are flagged and
+    purged in chunks on the background worker, so the request returns
+    immediately. Redirects to the admin dashboard afterwards.
     """
-    data_manager.delete_user(user_id)
-    flash('User deleted successfully!', 'success')
+    limit = current_app.config['USER_PURGE_SYNC_LIMIT']
+    if data_manager.count_user_rows(user_id, limit=limit) <= limit:
+        data_manager.delete_user(user_id)
+        flash('User deleted successfully!', 'success')
+    elif data_manager.request_user_deletion(user_id):
+        run_in_background(data_manager.purge_user, user_id,
+                          chunk_size=current_app.config['USER_PURGE_CHUNK_SIZE'])
+        flash('User deletion started. Their data is being removed in the background.', 'success')
+    dashboard_cache.clear()
     return redirect(url_for('admin_routes.admin_dashboard'))
+
+
+@admin_routes.route('/admin/metrics')
+@admin_required
+def admin_metrics():
+    """Render per-endpoint latency and SQL statistics.
+
+    Shows the rolling latency histogram, percentiles, average query and
+    commit counts and the slowest statement seen for every endpoint, along
+    with the in-process cache, password hashing pool, log queue and genre
+    index counters.
+    """
+    caches = {'users': user_cache.stats(), 'fragments': fragment_cache.stats(),
+              'admin dashboard': dashboard_cache.stats(), 'library bitsets': library_bitset_cache.stats()}
+    return render_template('admin_metrics.html', endpoints=metrics.snapshot(), buckets=HISTOGRAM_BUCKETS_MS,
+                           caches=caches, hashing=password_hasher.stats(), log_queue=logs.stats(),
+                           genre_index=genre_index.stats())
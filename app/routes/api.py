@@ -0,0 +1,163 @@
+import json
+
+from flask import Blueprint, Response, abort, current_app, jsonify, request, stream_with_context
+from flask_login import current_user
+from werkzeug.exceptions import HTTPException
+
+from app import db
+from app.datamanager.projections import GENRE_COLUMNS, MOVIE_COLUMNS, REVIEW_COLUMNS
+from app.datamanager.sqlite_data_manager import SQLiteDataManager
+from app.export import json_default
+
+# Read-only JSON API over the current user's movies and reviews and the
+# genres, authenticated with the same session cookie as the HTML pages.
+# Responses are built straight from the selected columns, without ORM
+# objects, templates or forms.
+
+# Initialize the data manager
+data_manager = SQLiteDataManager(db)
+
+api_routes = Blueprint('api_routes', __name__, url_prefix='/api/v1')
+
+# Fields returned when the request does not name any with ?fields=
+DEFAULT_MOVIE_FIELDS = ('id', 'name', 'director', 'year', 'rating')
+DEFAULT_REVIEW_FIELDS = tuple(REVIEW_COLUMNS)
+DEFAULT_GENRE_FIELDS = tuple(GENRE_COLUMNS)
+# Items serialized per chunk of a streamed list
+STREAM_BATCH_SIZE = 500
+
+_encoder = json.JSONEncoder(default=json_default, separators=(',', ':'))
+
+
+@api_routes.before_request
+def require_login():
+    """Answer 401 instead of redirecting to the login page."""
+    if not current_user.is_authenticated:
+        abort(401)
+
+
+@api_routes.errorhandler(HTTPException)
+def json_error(error):
+    """Return errors as ``{"error": ...}`` JSON objects."""
+    return jsonify(error=error.description), error.code
+
+
+def requested_fields(available, default):
+    """Return the fields named in ``?fields=a,b``, or ``default`` when there are none.
+
+    Answers 400 when a name is not one of ``available``.
+    """
+    value = request.args.get('fields', '')
+    fields = tuple(dict.fromkeys(field.strip() for field in value.split(',') if field.strip()))
+    if not fields:
+        return tuple(default)
+    unknown = [field for field in fields if field not in available]
+    if unknown:
+        abort(400, f"Unknown fields: {', '.join(unknown)}. Available fields: {', '.join(available)}")
+    return fields
+
+
+def requested_limit():
+    """Return ``?limit=``, clamped to ``API_MAX_PAGE_SIZE``, or ``API_PAGE_SIZE``."""
+    limit = request.args.get('limit', current_app.config['API_PAGE_SIZE'], type=int)
+    return max(1, min(limit, current_app.config['API_MAX_PAGE_SIZE']))
+
+
+def encode_row(fields, row):
+    """Serialize a row of ``fields`` as a JSON object; ``genres`` becomes a list."""
+    record = dict(zip(fields, row))
+    if 'genres' in record:
+        record['genres'] = record['genres'].split('|') if record['genres'] else []
+    return _encoder.encode(record)
+
+
+def iter_list(rows, fields, limit):
+    """Yield ``{"items": [...], "next_cursor": ...}`` for up to ``limit`` of ``rows``, in pieces.
+
+    ``rows`` are expected to select ``fields`` with ``id`` in front when it is
+    not one of them, and to hold one row more than ``limit`` when another page
+    follows. ``next_cursor`` is the ``after`` value of that page, or null.
+    """
+    key_added = 'id' not in fields
+    key = 0 if key_added else fields.index('id')
+    yield '{"items":['
+    batch, separator, count, last_key = [], '', 0, None
+    for row in rows:
+        if count == limit:
+            break
+        count += 1
+        last_key = row[key]
+        batch.append(encode_row(fields, row[1:] if key_added else row))
+        if len(batch) == STREAM_BATCH_SIZE:
+            yield separator + ','.join(batch)
+            batch, separator = [], ','
+    else:
+        last_key = None
+    if batch:
+        yield separator + ','.join(batch)
+    yield f'],"next_cursor":{_encoder.encode(last_key)}}}'
+
+
+def stream_list(rows, fields, limit):
+    """Stream ``iter_list`` as the JSON response."""
+    return Response(stream_with_context(iter_list(rows, fields, limit)), mimetype='application/json')
+
+
+def with_key(fields):
+    """Return the fields to select for a list: ``fields`` with ``id`` in front if missing."""
+    return fields if 'id' in fields else ('id',) + fields
+
+
+@api_routes.route('/movies', methods=['GET'])
+def list_movies():
+    """List the current user's movies, ordered by ID.
+
+    Query parameters: ``fields``, ``after`` (the previous ``next_cursor``) and
+    ``limit``. Available fields are the keys of ``MOVIE_COLUMNS``.
+    """
+    fields = requested_fields(MOVIE_COLUMNS, DEFAULT_MOVIE_FIELDS)
+    limit = requested_limit()
+    rows = data_manager.iter_user_movie_rows(current_user.id, with_key(fields),
+                                             after=request.args.get('after', type=int), limit=limit + 1)
+    return stream_list(rows, fields, limit)
+
+
+@api_routes.route('/movies/<int:movie_id>', methods=['GET'])
+def get_movie(movie_id):
+    """Return one movie of the current user's library; 404 if it is not in it."""
+    fields = requested_fields(MOVIE_COLUMNS, DEFAULT_MOVIE_FIELDS)
+    row = data_manager.get_user_movie_row(current_user.id, movie_id, fields)
+    if row is None:
+        abort(404, 'Movie not found')
+    return Response(encode_row(fields, row), mimetype='application/json')
+
+
+@api_routes.route('/movies/<int:movie_id>/reviews', methods=['GET'])
+def list_movie_reviews(movie_id):
+    """List the current user's reviews of a movie, ordered by ID.
+
+    Takes the same query parameters as ``list_reviews``.
+    """
+    return list_reviews(movie_id=movie_id)
+
+
+@api_routes.route('/reviews', methods=['GET'])
+def list_reviews(movie_id=None):
+    """List the current user's reviews, ordered by ID.
+
+    Query parameters: ``fields``, ``after`` and ``limit``. Available fields
+    are the keys of ``REVIEW_COLUMNS``.
+    """
+    fields = requested_fields(REVIEW_COLUMNS, DEFAULT_REVIEW_FIELDS)
+    limit = requested_limit()
+    rows = data_manager.iter_user_review_rows(current_user.id, with_key(fields), movie_id=movie_id,
+                                              after=request.args.get('after', type=int), limit=limit + 1)
+    return stream_list(rows, fields, limit)
+
+
+@api_routes.route('/genres', methods=['GET'])
+def list_genres():
+    """List every genre, ordered by ID. Takes ``fields``; the list is not paginated."""
+    fields = requested_fields(GENRE_COLUMNS, DEFAULT_GENRE_FIELDS)
+    items = ','.join(encode_row(fields, row) for row in data_manager.get_genre_rows(fields))
+    return Response(f'{{"items":[{items}]}}', mimetype='application/json')
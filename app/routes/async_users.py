@@ -0,0 +1,56 @@
+import asyncio
+
+from flask import Blueprint, request, render_template, current_app, abort
+from flask_login import current_user, login_required
+from app.forms.review_form import ReviewForm
+
+# Read-only variants of the user routes served by the asynchronous data
+# manager. Registered under /async when ASYNC_DATA_MANAGER is enabled.
+async_user_routes = Blueprint('async_user_routes', __name__, url_prefix='/async')
+
+
+def get_data_manager():
+    """Return the application's AsyncSQLiteDataManager."""
+    return current_app.extensions['async_data_manager']
+
+
+@async_user_routes.route('/user/movies', methods=['GET'])
+@login_required
+async def get_user_movies():
+    """Render one page of the user's movies using the async data manager.
+
+    Returns:
+        Rendered template with the user's movies.
+    """
+    page = await get_data_manager().get_user_movies_page(
+        user_id=current_user.id,
+        after=request.args.get('after', type=int),
+        before=request.args.get('before', type=int),
+        per_page=current_app.config['MOVIES_PER_PAGE'],
+    )
+    return render_template('movies.html', user_movies=page.items, page=page,
+                           page_endpoint='async_user_routes.get_user_movies')
+
+
+@async_user_routes.route('/user/movies/show_movie/<int:movie_id>', methods=['GET'])
+@login_required
+async def show_movie(movie_id):
+    """Display a movie with the user's reviews, loading both concurrently.
+
+    Args:
+        movie_id: The ID of the movie to display.
+
+    Returns:
+        Rendered template for displaying movie details and reviews.
+    """
+    data_manager = get_data_manager()
+    movie, user_reviews, recommendations = await asyncio.gather(
+        data_manager.get_movie_by_id(movie_id, current_user.id),
+        data_manager.get_user_reviews_for_movie(movie_id=movie_id, user_id=current_user.id),
+        data_manager.get_movie_recommendations(movie_id=movie_id, user_id=current_user.id,
+                                               limit=current_app.config['RECOMMENDATIONS_PER_MOVIE']),
+    )
+    if movie is None:
+        abort(403)
+    return render_template('show_movie.html', movie=movie, user_reviews=user_reviews, form=ReviewForm(),
+                           recommendations=recommendations)
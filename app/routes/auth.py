@@ -2,20 +2,27 @@ import logging
 import os
 from flask import Blueprint, flash, redirect, render_template, request, session, url_for
 from flask_login import login_user, logout_user
-from werkzeug.security import generate_password_hash, check_password_hash
 from app import db
 from app.datamanager.sqlite_data_manager import SQLiteDataManager
+from app.passwords import HashingBusy, password_hasher
 from app.forms.login_form import LoginForm
 from app.forms.signup_form import SignupForm
 
 # Initialize the data manager
 data_manager = SQLiteDataManager(db)
-logging.basicConfig(level=logging.DEBUG)
 auth = Blueprint('auth', __name__)
 
 # Load admin credentials from environment variables
 ADMIN_EMAIL = os.getenv('ADMIN_EMAIL')
 ADMIN_PASSWORD = os.getenv('ADMIN_PASSWORD')
+# Seconds clients are asked to wait when the password hashing queue is full
+BUSY_RETRY_AFTER = 5
+
+
+def busy_response(template, form):
+    """Render ``template`` with a 503 status when no password hash can be computed right now."""
+    flash('We are handling a lot of sign-ins right now. Please try again in a moment.', 'danger')
+    return render_template(template, form=form), 503, {'Retry-After': str(BUSY_RETRY_AFTER)}
 
 
 @auth.route('/login', methods=['GET', 'POST'])
@@ -24,13 +31,14 @@ def login():
 
     Validates the login form and checks if the credentials match either
     a normal user or the admin account. If successful, the user is logged
-    in and redirected accordingly.
+    in and redirected accordingly. A stored hash made with outdated
+    parameters is replaced by a new one while the password is at hand.
     """
     form = LoginForm()
     if form.validate_on_submit():
         email = form.email.data
         password = form.password.data
-        logging.debug(f"Form validated. Email: {email}")
+        logging.debug("Form validated. Email: %s", email)
 
         # Check if the user is an admin
         if email == ADMIN_EMAIL and password == ADMIN_PASSWORD:
@@ -41,15 +49,27 @@ def login():
 
         # Handle normal user login
         user = data_manager.get_user_by_email(email=email)
-        if user and check_password_hash(user.password, password):
-            login_user(user)
+        try:
+            valid = user is not None and password_hasher.verify(user.password, password)
+        except HashingBusy:
+            return busy_response('login.html', form)
+        if valid:
+            # Flask-Login refuses inactive users, i.e. accounts queued for deletion
+            if not login_user(user):
+                flash('This account is being deleted and can no longer log in.', 'danger')
+                return render_template('login.html', form=form)
+            try:
+                if password_hasher.needs_rehash(user.password):
+                    data_manager.update_password(user.id, password_hasher.hash(password))
+            except HashingBusy:
+                logging.info("Password hash upgrade of user %s postponed", user.id)
             session['admin'] = False
             flash('Logged in successfully!', 'success')
             return redirect(url_for('main_routes.home'))
         else:
             flash('Login unsuccessful. Please check your email and password.', 'danger')
     else:
-        logging.debug(f"Form not validated. Errors: {form.errors}")
+        logging.debug("Form not validated. Errors: %s", form.errors)
     return render_template('login.html', form=form)
 
 
@@ -68,11 +88,11 @@ def signup():
             flash('Email is already registered. Please log in.', 'danger')
             return redirect(url_for('auth.login'))
 
-        new_user = data_manager.add_user(
-            form.name.data,
-            form.email.data,
-            generate_password_hash(form.password.data)
-        )
+        try:
+            password_hash = password_hasher.hash(form.password.data)
+        except HashingBusy:
+            return busy_response('signup.html', form)
+        new_user = data_manager.add_user(form.name.data, form.email.data, password_hash)
         login_user(new_user)
         flash('Registration successful!', 'success')
         return redirect(url_for('main_routes.home'))
@@ -1,59 +1,204 @@
-from flask import Blueprint, request, render_template, url_for, flash, redirect, abort
+from flask import (Blueprint, request, render_template, url_for, flash, redirect, abort, current_app,
+                   Response, stream_with_context, session, make_response)
 from app import db
+from app.datamanager.pagination import page_from_items
 from app.datamanager.sqlite_data_manager import SQLiteDataManager
+from app.export import EXPORT_KINDS, MIMETYPES, iter_export
+from app.genre_index import genre_index, library_bits, page_ids
 from flask_login import current_user, login_required
+from collections import namedtuple
+import hashlib
 import logging
+import time
 from app.forms.movie_form import MovieForm
 from app.forms.review_form import ReviewForm
 
-logging.basicConfig(level=logging.DEBUG)
-
 # Initialize the data manager
 data_manager = SQLiteDataManager(db)
 
 # Define a blueprint for user routes
 user_routes = Blueprint('user_routes', __name__)
 
+# A genre filter link of the library page
+GenreFacet = namedtuple('GenreFacet', ['id', 'name', 'count', 'selected', 'toggle'])
+
+
+def page_etag(*versions, csrf=False):
+    """Build a strong ETag for the current user's view of ``versions``.
+
+    The versions are bumped by every data manager write that changes what the
+    page shows. Pages with a CSRF token also depend on the session's token and
+    on a time window shorter than its expiry, so a revalidated page never
+    carries an expired token. Pending flash messages are part of the tag too:
+    a redirect that only flashed must render the message, and the page that
+    showed it must not be revalidated once it is gone.
+    """
+    parts = [request.endpoint, current_user.id, session.get('admin'), request.query_string.decode(),
+             session.get('_flashes'), *versions]
+    if csrf and current_app.config.get('WTF_CSRF_ENABLED', True):
+        parts.append(session.get('csrf_token'))
+        time_limit = current_app.config.get('WTF_CSRF_TIME_LIMIT', 3600)
+        if time_limit:
+            parts.append(int(time.time() // (time_limit / 2)))
+    return hashlib.sha256(repr(parts).encode()).hexdigest()
+
+
+def not_modified(etag):
+    """Return a 304 response if the client already has ``etag``, else None."""
+    if request.if_none_match.contains(etag):
+        response = make_response('', 304)
+        response.set_etag(etag)
+        response.headers['Cache-Control'] = 'private, no-cache'
+        return response
+    return None
+
+
+def with_etag(body, etag):
+    """Wrap a rendered page in a response that must be revalidated with ``etag``."""
+    response = make_response(body)
+    response.set_etag(etag)
+    response.headers['Cache-Control'] = 'private, no-cache'
+    return response
+
 
 @user_routes.route('/user/movies', methods=['GET'])
 @login_required
 def get_user_movies():
     """Render the user's movies page.
 
-    Fetches and displays the movies associated with the current user.
+    Fetches and displays one page of the movies associated with the current
+    user. The ``after`` and ``before`` query parameters are movie ID cursors.
+    Repeated ``genre`` parameters keep the movies having all of those genres;
+    the filter and the count of every genre facet come from the in-process
+    genre index. Answers ``If-None-Match`` with 304 from the user's version
+    alone.
 
     Returns:
         Rendered template with the user's movies.
     """
-    user_movies = data_manager.get_user_movies(user_id=current_user.id)
-    logging.debug(f"User Movies: {user_movies}")  # Use logging instead of print
-    return render_template('movies.html', user_movies=user_movies)
+    versions = data_manager.get_versions(current_user.id)
+    etag = page_etag(*versions)
+    cached = not_modified(etag)
+    if cached:
+        return cached
+    genre_ids = sorted(set(request.args.getlist('genre', type=int)))
+    genre_index.sync(data_manager)
+    facets = genre_index.facets(library_bits(data_manager, current_user.id, versions[0]), genre_ids)
+    after = request.args.get('after', type=int)
+    before = request.args.get('before', type=int)
+    per_page = current_app.config['MOVIES_PER_PAGE']
+    if genre_ids:
+        movie_ids = page_ids(facets.matching, after=after, before=before, per_page=per_page)
+        has_previous = bool(movie_ids) and bool(facets.matching & ((1 << movie_ids[0]) - 1))
+        page = page_from_items(data_manager.get_movies_readonly(movie_ids), after, before, per_page,
+                               has_previous)
+    else:
+        page = data_manager.get_user_movies_page_readonly(
+            user_id=current_user.id, after=after, before=before, per_page=per_page)
+    logging.debug("User %s movies: %d on this page", current_user.id, len(page.items))
+    return with_etag(render_template('movies.html', user_movies=page.items, page=page,
+                                     genre_facets=genre_facets(facets, genre_ids), facets_total=facets.total,
+                                     page_args={'genre': genre_ids}), etag)
+
+
+def genre_facets(facets, genre_ids):
+    """List the genre filters of the library page, with the movies each would leave.
+
+    Genres left with no movie are hidden unless selected. ``toggle`` is the
+    ``genre`` query parameter of the link that selects or clears the genre.
+    """
+    items = []
+    for genre_id, name in data_manager.get_genre_rows(('id', 'name')):
+        selected = genre_id in genre_ids
+        count = facets.counts.get(genre_id, 0)
+        if count or selected:
+            toggle = [other for other in genre_ids if other != genre_id] if selected else genre_ids + [genre_id]
+            items.append(GenreFacet(genre_id, name, count, selected, toggle))
+    return items
+
+
+@user_routes.route('/user/movies/search', methods=['GET'])
+@login_required
+def search_movies():
+    """Search the current user's movies.
+
+    Matches the ``q`` query parameter against movie titles, directors and the
+    user's own reviews and shows the ranked results one ``page`` at a time.
+
+    Returns:
+        Rendered template with the matching movies.
+    """
+    etag = page_etag(*data_manager.get_versions(current_user.id))
+    cached = not_modified(etag)
+    if cached:
+        return cached
+    query = request.args.get('q', '').strip()
+    results = data_manager.search_user_movies_readonly(
+        user_id=current_user.id,
+        terms=query,
+        page=max(request.args.get('page', 1, type=int), 1),
+        per_page=current_app.config['SEARCH_RESULTS_PER_PAGE'],
+    )
+    return with_etag(render_template('search.html', query=query, results=results), etag)
+
+
+@user_routes.route('/user/export/<kind>.<export_format>', methods=['GET'])
+@login_required
+def export_user_data(kind, export_format):
+    """Download the current user's library or reviews.
+
+    Rows are streamed from the database in chunks straight into the response,
+    so the download starts immediately and memory use does not grow with the
+    size of the library.
+
+    Args:
+        kind: Either ``library`` or ``reviews``.
+        export_format: Either ``csv`` or ``ndjson``.
+
+    Returns:
+        A streamed attachment response.
+    """
+    if kind not in EXPORT_KINDS or export_format not in MIMETYPES:
+        abort(404)
+    rows = iter_export(data_manager, current_user.id, kind, export_format)
+    return Response(
+        stream_with_context(rows),
+        mimetype=MIMETYPES[export_format],
+        headers={'Content-Disposition': f'attachment; filename={kind}.{export_format}'},
+    )
 
 
 @user_routes.route('/user/movies/add_movie', methods=['GET', 'POST'])
 @login_required
 def add_movie():
+    """Add a new movie to the user's library.
+
+    The movie, its genres and the library entry are written in one
+    transaction.
+
+    Returns:
+        Rendered form, or a redirect to the user's movies page on success.
+    """
     form = MovieForm()
-    genres = [(genre.id, genre.name) for genre in data_manager.get_all_genre()]
-    form.genres.choices = genres
+    genres = data_manager.get_all_genre()
+    form.genres.choices = [(genre.id, genre.name) for genre in genres]
     if form.validate_on_submit():
         try:
-            new_movie = data_manager.add_movie(
-                name=form.name.data,
-                director=form.director.data,
-                year=form.year.data,
-                rating=form.rating.data,
-            )
-            selected_genres = data_manager.get_genres_by_ids(form.genres.data)
-            new_movie.genres.extend(selected_genres)
-            data_manager.add_user_movie(user_id=current_user.id, movie_id=new_movie.id)
-            flash(f'Movie "{new_movie.name}" added successfully!', 'success')
+            with data_manager.unit_of_work():
+                new_movie = data_manager.add_movie(
+                    name=form.name.data,
+                    director=form.director.data,
+                    year=form.year.data,
+                    rating=form.rating.data,
+                )
+                data_manager.sync_movie_genres(new_movie.id, form.genres.data)
+                data_manager.add_user_movie(user_id=current_user.id, movie_id=new_movie.id)
+            flash(f'Movie "{form.name.data}" added successfully!', 'success')
             return redirect(url_for('user_routes.get_user_movies'))
         except Exception as e:
             logging.error("Error adding movie: %s", str(e))
             flash('An error occurred while adding the movie.', 'danger')
 
-    genres = data_manager.get_all_genre()
     return render_template('add_movie.html', form=form, genres=genres)
 
 
@@ -63,6 +208,7 @@ def update_movie(movie_id):
     """Update an existing movie's details.
 
     This route handles both displaying the current movie details and processing updates.
+    The movie's columns and genres are written in one transaction.
 
     Args:
         movie_id: The ID of the movie to be updated.
@@ -70,43 +216,29 @@ def update_movie(movie_id):
     Returns:
         Rendered template for updating the movie or redirects to the user's movies page.
     """
-    movie = get_movie_or_abort(movie_id)
+    movie = get_movie_or_abort(movie_id, with_genres=True)
     form = MovieForm()
-    if request.method == 'POST':
-        form.genres.choices = [(genre.id, genre.name) for genre in data_manager.get_all_genre()]  # Set choices
-        movie = get_movie_or_abort(movie_id)
-        if form.validate_on_submit():
-            try:
-                movie.title = request.form.get('title')
-                movie.director = request.form.get('director')
-                movie.year = request.form.get('year')
-                movie.rating = request.form.get('rating')
-                genre_ids = request.form.getlist('genres')
-                selected_genre_ids = set(genre_ids)
-                current_genre_ids = {genre.id for genre in movie.genres}
-                genres_to_remove = current_genre_ids - selected_genre_ids
-                for genre_id in genres_to_remove:
-                    data_manager.delete_movie_genre(movie.id, genre_id)
-                genres_to_add = selected_genre_ids - current_genre_ids
-                for genre_id in genres_to_add:
-                    genre = data_manager.get_genre_by_id(genre_id)
-                    if genre:
-                        movie.genres.append(genre)
-
-                db.session.commit()  # Commit the changes
-                flash('Movie updated successfully!', 'success')
-                return redirect(url_for('user_routes.get_user_movies'))
-            except Exception as e:
-                logging.error("Error update movie: %s", str(e))
-                flash('An error occurred while update the movie.', 'danger')
-    else:
-        form.name.data = movie.name
-        form.director.data = movie.director
-        form.year.data = movie.year
-        form.rating.data = movie.rating
-        form.genres.data = [str(genre.id) for genre in movie.genres]
-        genres = data_manager.get_all_genre()
-        return render_template('update_movie.html',form=form, movie=movie, genres=genres)
+    genres = data_manager.get_all_genre()
+    form.genres.choices = [(genre.id, genre.name) for genre in genres]
+    if form.validate_on_submit():
+        try:
+            with data_manager.unit_of_work():
+                data_manager.update_movie(
+                    movie_id=movie.id,
+                    title=form.name.data,
+                    director=form.director.data,
+                    year=form.year.data,
+                    rating=form.rating.data,
+                )
+                data_manager.sync_movie_genres(movie.id, form.genres.data)
+            flash('Movie updated successfully!', 'success')
+            return redirect(url_for('user_routes.get_user_movies'))
+        except Exception as e:
+            logging.error("Error update movie: %s", str(e))
+            flash('An error occurred while update the movie.', 'danger')
+    elif request.method == 'POST':
+        flash('Please correct the errors in the form.', 'danger')
+    return render_template('update_movie.html', form=form, movie=movie, genres=genres)
 
 
 @user_routes.route('/user/movies/<int:movie_id>/delete', methods=['POST'])
@@ -134,14 +266,28 @@ def delete_movie(movie_id):
 def show_movie(movie_id):
     """Display the details of a specific movie along with user reviews.
 
+    GET requests are answered with 304 when ``If-None-Match`` matches the
+    user's and the movie's versions.
+
     Args:
         movie_id: The ID of the movie to display.
 
     Returns:
         Rendered template for displaying movie details and reviews.
     """
-    movie = get_movie_or_abort(movie_id)
-    user_reviews = data_manager.get_user_reviews_for_movie(movie_id=movie_id, user_id=current_user.id)
+    etag = None
+    if request.method == 'GET':
+        user_version, movie_version = data_manager.get_versions(current_user.id, movie_id)
+        if movie_version is None:
+            abort(403)
+        etag = page_etag(user_version, movie_version, csrf=True)
+        cached = not_modified(etag)
+        if cached:
+            return cached
+    movie = data_manager.get_movie_by_id_readonly(movie_id, current_user.id)
+    if movie is None:
+        abort(403)
+    user_reviews = data_manager.get_user_reviews_for_movie_readonly(movie_id=movie_id, user_id=current_user.id)
     form = ReviewForm()
     if request.method == 'POST':
         if form.validate_on_submit():
@@ -154,8 +300,11 @@ def show_movie(movie_id):
         flash('Review added successfully!', 'success')
         return redirect(url_for('user_routes.show_movie', movie_id=movie_id))
 
+    recommendations = data_manager.get_movie_recommendations_readonly(
+        movie_id=movie_id, user_id=current_user.id, limit=current_app.config['RECOMMENDATIONS_PER_MOVIE'])
     # Render the movie detail page
-    return render_template('show_movie.html', movie=movie, user_reviews=user_reviews,form=form)
+    return with_etag(render_template('show_movie.html', movie=movie, user_reviews=user_reviews, form=form,
+                                     recommendations=recommendations), etag)
 
 
 @user_routes.route('/user/reviews/<int:review_id>/delete', methods=['POST'])
@@ -179,8 +328,8 @@ def delete_review(review_id):
     return redirect(url_for('user_routes.show_movie', movie_id=review.movie_id))
 
 
-def get_movie_or_abort(movie_id):
-    movie = data_manager.get_movie_by_id(movie_id, current_user.id)
+def get_movie_or_abort(movie_id, with_genres=False):
+    movie = data_manager.get_movie_by_id(movie_id, current_user.id, with_genres=with_genres)
     if movie is None:
         abort(403)
     return movie
@@ -0,0 +1,224 @@
+import re
+from collections import namedtuple
+
+from sqlalchemy import text
+
+# Contentless FTS5 tables holding one row per library entry and per review,
+# so a search only ever reads the searching user's part of the index. The
+# rowid is ``(user_id << 32) + movie_id`` (``+ review_id`` for reviews; both
+# IDs stay below 2**32), which keeps each user's rows in one contiguous rowid
+# range that FTS5 seeks to directly. Titles are indexed twice, on their own
+# and with the director, so title matches can rank first without a column
+# filter: FTS5 applies column filters after reading the doclist and would
+# scan past the user's range. Prefixes of up to 6 characters are indexed,
+# which keeps search-as-you-type queries on the seekable path. The triggers
+# below keep the tables in step on every write; a contentless table needs
+# the exact old values to delete a row.
+SEARCH_TABLES = ('library_fts', 'library_titles_fts', 'user_reviews_fts')
+
+# Tables of the earlier external-content index, dropped when the current one is created
+SUPERSEDED_TABLES = ('movies_fts', 'reviews_fts')
+
+_OPTIONS = "content='', prefix='1 2 3 4 5 6', tokenize='unicode61 remove_diacritics 2'"
+
+CREATE_STATEMENTS = (
+    f"CREATE VIRTUAL TABLE IF NOT EXISTS library_fts USING fts5(name, director, {_OPTIONS})",
+    f"CREATE VIRTUAL TABLE IF NOT EXISTS library_titles_fts USING fts5(name, {_OPTIONS})",
+    f"CREATE VIRTUAL TABLE IF NOT EXISTS user_reviews_fts USING fts5(text, {_OPTIONS})",
+    "CREATE TRIGGER IF NOT EXISTS library_fts_ai AFTER INSERT ON user_movies BEGIN "
+    "INSERT INTO library_fts(rowid, name, director) "
+    "SELECT (new.user_id << 32) + new.movie_id, name, director FROM movies WHERE id = new.movie_id; "
+    "INSERT INTO library_titles_fts(rowid, name) "
+    "SELECT (new.user_id << 32) + new.movie_id, name FROM movies WHERE id = new.movie_id; "
+    "END",
+    # Finds no movie when the entry goes with its movie: SQLite runs the
+    # cascade after removing the parent, and library_fts_movie_bd cleaned up
+    "CREATE TRIGGER IF NOT EXISTS library_fts_ad AFTER DELETE ON user_movies BEGIN "
+    "INSERT INTO library_fts(library_fts, rowid, name, director) "
+    "SELECT 'delete', (old.user_id << 32) + old.movie_id, name, director FROM movies WHERE id = old.movie_id; "
+    "INSERT INTO library_titles_fts(library_titles_fts, rowid, name) "
+    "SELECT 'delete', (old.user_id << 32) + old.movie_id, name FROM movies WHERE id = old.movie_id; "
+    "END",
+    "CREATE TRIGGER IF NOT EXISTS library_fts_au AFTER UPDATE OF user_id, movie_id ON user_movies BEGIN "
+    "INSERT INTO library_fts(library_fts, rowid, name, director) "
+    "SELECT 'delete', (old.user_id << 32) + old.movie_id, name, director FROM movies WHERE id = old.movie_id; "
+    "INSERT INTO library_titles_fts(library_titles_fts, rowid, name) "
+    "SELECT 'delete', (old.user_id << 32) + old.movie_id, name FROM movies WHERE id = old.movie_id; "
+    "INSERT INTO library_fts(rowid, name, director) "
+    "SELECT (new.user_id << 32) + new.movie_id, name, director FROM movies WHERE id = new.movie_id; "
+    "INSERT INTO library_titles_fts(rowid, name) "
+    "SELECT (new.user_id << 32) + new.movie_id, name FROM movies WHERE id = new.movie_id; "
+    "END",
+    "CREATE TRIGGER IF NOT EXISTS library_fts_movie_bd BEFORE DELETE ON movies BEGIN "
+    "INSERT INTO library_fts(library_fts, rowid, name, director) "
+    "SELECT 'delete', (user_id << 32) + old.id, old.name, old.director FROM user_movies WHERE movie_id = old.id; "
+    "INSERT INTO library_titles_fts(library_titles_fts, rowid, name) "
+    "SELECT 'delete', (user_id << 32) + old.id, old.name FROM user_movies WHERE movie_id = old.id; "
+    "END",
+    "CREATE TRIGGER IF NOT EXISTS library_fts_movie_au AFTER UPDATE OF name, director ON movies BEGIN "
+    "INSERT INTO library_fts(library_fts, rowid, name, director) "
+    "SELECT 'delete', (user_id << 32) + old.id, old.name, old.director FROM user_movies WHERE movie_id = old.id; "
+    "INSERT INTO library_titles_fts(library_titles_fts, rowid, name) "
+    "SELECT 'delete', (user_id << 32) + old.id, old.name FROM user_movies WHERE movie_id = old.id; "
+    "INSERT INTO library_fts(rowid, name, director) "
+    "SELECT (user_id << 32) + new.id, new.name, new.director FROM user_movies WHERE movie_id = new.id; "
+    "INSERT INTO library_titles_fts(rowid, name) "
+    "SELECT (user_id << 32) + new.id, new.name FROM user_movies WHERE movie_id = new.id; "
+    "END",
+    "CREATE TRIGGER IF NOT EXISTS user_reviews_fts_ai AFTER INSERT ON reviews WHEN new.user_id IS NOT NULL BEGIN "
+    "INSERT INTO user_reviews_fts(rowid, text) VALUES ((new.user_id << 32) + new.id, new.text); "
+    "END",
+    "CREATE TRIGGER IF NOT EXISTS user_reviews_fts_ad AFTER DELETE ON reviews WHEN old.user_id IS NOT NULL BEGIN "
+    "INSERT INTO user_reviews_fts(user_reviews_fts, rowid, text) VALUES ('delete', (old.user_id << 32) + old.id, old.text); "
+    "END",
+    "CREATE TRIGGER IF NOT EXISTS user_reviews_fts_au AFTER UPDATE OF text, user_id ON reviews BEGIN "
+    "INSERT INTO user_reviews_fts(user_reviews_fts, rowid, text) "
+    "SELECT 'delete', (old.user_id << 32) + old.id, old.text WHERE old.user_id IS NOT NULL; "
+    "INSERT INTO user_reviews_fts(rowid, text) "
+    "SELECT (new.user_id << 32) + new.id, new.text WHERE new.user_id IS NOT NULL; "
+    "END",
+)
+
+# Each table is emptied with 'delete-all', as contentless tables cannot 'rebuild'
+REBUILD_STATEMENTS = (
+    "INSERT INTO library_fts(library_fts) VALUES ('delete-all')",
+    "INSERT INTO library_fts(rowid, name, director) "
+    "SELECT (user_movies.user_id << 32) + user_movies.movie_id, movies.name, movies.director "
+    "FROM user_movies JOIN movies ON movies.id = user_movies.movie_id",
+    "INSERT INTO library_titles_fts(library_titles_fts) VALUES ('delete-all')",
+    "INSERT INTO library_titles_fts(rowid, name) "
+    "SELECT (user_movies.user_id << 32) + user_movies.movie_id, movies.name "
+    "FROM user_movies JOIN movies ON movies.id = user_movies.movie_id",
+    "INSERT INTO user_reviews_fts(user_reviews_fts) VALUES ('delete-all')",
+    "INSERT INTO user_reviews_fts(rowid, text) "
+    "SELECT (user_id << 32) + id, text FROM reviews WHERE user_id IS NOT NULL",
+)
+
+DROP_STATEMENTS = (
+    "DROP TRIGGER IF EXISTS library_fts_ai",
+    "DROP TRIGGER IF EXISTS library_fts_ad",
+    "DROP TRIGGER IF EXISTS library_fts_au",
+    "DROP TRIGGER IF EXISTS library_fts_movie_bd",
+    "DROP TRIGGER IF EXISTS library_fts_movie_au",
+    "DROP TRIGGER IF EXISTS user_reviews_fts_ai",
+    "DROP TRIGGER IF EXISTS user_reviews_fts_ad",
+    "DROP TRIGGER IF EXISTS user_reviews_fts_au",
+    "DROP TABLE IF EXISTS library_fts",
+    "DROP TABLE IF EXISTS library_titles_fts",
+    "DROP TABLE IF EXISTS user_reviews_fts",
+)
+
+SUPERSEDED_DROP_STATEMENTS = (
+    "DROP TRIGGER IF EXISTS movies_fts_ai",
+    "DROP TRIGGER IF EXISTS movies_fts_ad",
+    "DROP TRIGGER IF EXISTS movies_fts_au",
+    "DROP TABLE IF EXISTS movies_fts",
+    "DROP TRIGGER IF EXISTS reviews_fts_ai",
+    "DROP TRIGGER IF EXISTS reviews_fts_ad",
+    "DROP TRIGGER IF EXISTS reviews_fts_au",
+    "DROP TABLE IF EXISTS reviews_fts",
+)
+
+# Movies of the user's library matching the query on their own columns or
+# through one of the user's reviews, read from the user's rowid range only.
+# Title matches come first, then director (or title and director) matches,
+# then review matches. BM25 is not used: its IDF pass reads the whole doclist
+# of every term across all libraries, which costs more than the search.
+SEARCH_QUERY = text("""
+    SELECT matches.movie_id, MIN(matches.tier) AS tier
+    FROM (
+        SELECT rowid & 4294967295 AS movie_id, 0 AS tier
+        FROM library_titles_fts
+        WHERE library_titles_fts MATCH :query
+          AND rowid BETWEEN :user_id << 32 AND (:user_id << 32) + 4294967295
+        UNION ALL
+        SELECT rowid & 4294967295, 1
+        FROM library_fts
+        WHERE library_fts MATCH :query
+          AND rowid BETWEEN :user_id << 32 AND (:user_id << 32) + 4294967295
+        UNION ALL
+        SELECT reviews.movie_id, 2
+        FROM user_reviews_fts
+        JOIN reviews ON reviews.id = user_reviews_fts.rowid & 4294967295
+        JOIN user_movies ON user_movies.user_id = :user_id AND user_movies.movie_id = reviews.movie_id
+        WHERE user_reviews_fts MATCH :query
+          AND user_reviews_fts.rowid BETWEEN :user_id << 32 AND (:user_id << 32) + 4294967295
+    ) AS matches
+    GROUP BY matches.movie_id
+    ORDER BY tier, matches.movie_id
+    LIMIT :limit OFFSET :offset
+""")
+
+# One page of ranked search results. ``page`` is 1-based.
+SearchResults = namedtuple('SearchResults', ['items', 'page', 'has_next'])
+
+
+def search_words(terms):
+    """Split free text typed by a user into the words the index tokenizes it into."""
+    return re.findall(r'[^\W_]+', terms or '')
+
+
+def build_match_query(terms):
+    """Turn free text typed by a user into a safe FTS5 MATCH expression.
+
+    Every word is quoted so FTS5 operators in the input are taken literally,
+    all words must match, and the last word also matches as a prefix so
+    results show up while the user is still typing.
+
+    Returns:
+        str: The MATCH expression, or None if ``terms`` has no words.
+    """
+    words = search_words(terms)
+    if not words:
+        return None
+    quoted = [f'"{word}"' for word in words]
+    quoted[-1] += '*'
+    return ' '.join(quoted)
+
+
+def search_index_ready(bind):
+    """Return whether the FTS5 tables exist on the database behind ``bind``."""
+    if bind.dialect.name != 'sqlite':
+        return False
+    names = ', '.join(f"'{table}'" for table in SEARCH_TABLES)
+    found = bind.exec_driver_sql(
+        f"SELECT count(*) FROM sqlite_master WHERE type = 'table' AND name IN ({names})").scalar()
+    return found == len(SEARCH_TABLES)
+
+
+def create_search_index(bind):
+    """Create the FTS5 tables and triggers and index the existing rows.
+
+    Safe to call repeatedly. ``bind`` is an Engine or Connection, for example
+    ``op.get_bind()`` inside an Alembic migration.
+    """
+    if bind.dialect.name != 'sqlite':
+        return
+    for statement in SUPERSEDED_DROP_STATEMENTS + CREATE_STATEMENTS:
+        bind.exec_driver_sql(statement)
+    rebuild_search_index(bind)
+
+
+def rebuild_search_index(bind):
+    """Re-index every library entry and review from the base tables."""
+    for statement in REBUILD_STATEMENTS:
+        bind.exec_driver_sql(statement)
+
+
+def drop_search_index(bind):
+    """Remove the FTS5 tables and triggers."""
+    if bind.dialect.name != 'sqlite':
+        return
+    for statement in DROP_STATEMENTS + SUPERSEDED_DROP_STATEMENTS:
+        bind.exec_driver_sql(statement)
+
+
+def include_name(name, type_, parent_names):
+    """Alembic filter hiding the FTS5 tables from autogenerate.
+
+    Without it ``flask db migrate`` would see the virtual tables and their
+    shadow tables as unknown and emit DROP TABLE statements for them.
+    """
+    if type_ == 'table':
+        return not name.startswith(SEARCH_TABLES + SUPERSEDED_TABLES)
+    return True
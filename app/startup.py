@@ -0,0 +1,87 @@
+"""Startup support for pre-fork servers such as gunicorn with ``--preload``.
+
+The master process imports the app, configures the mappers, compiles every
+template, loads the genre index and freezes the garbage collector, so workers
+start hot and share those pages with the master copy-on-write. Connections must not cross the
+fork: each worker drops the pools it inherited and opens its own.
+See ``gunicorn.conf.py``.
+"""
+import gc
+import time
+
+from jinja2 import FileSystemBytecodeCache
+from sqlalchemy.orm import configure_mappers
+
+from app import db, logs, tasks
+from app.datamanager.sqlite_data_manager import SQLiteDataManager
+from app.genre_index import genre_index
+from app.passwords import password_hasher
+
+
+def init_app(app):
+    """Store compiled templates in a bytecode cache when ``JINJA_BYTECODE_CACHE`` is set.
+
+    The cache lives in ``JINJA_BYTECODE_CACHE_DIR``, or in a per-user
+    temporary directory, and survives restarts, so only changed templates
+    are compiled again.
+    """
+    if app.config['JINJA_BYTECODE_CACHE']:
+        app.jinja_env.bytecode_cache = FileSystemBytecodeCache(app.config['JINJA_BYTECODE_CACHE_DIR'])
+
+
+def warm_up(app):
+    """Do the lazy one-time work of the first requests up front.
+
+    Returns:
+        dict: Milliseconds spent per step.
+    """
+    timings = {}
+    started = time.perf_counter()
+    configure_mappers()
+    timings['mappers'] = (time.perf_counter() - started) * 1000
+
+    started = time.perf_counter()
+    templates = app.jinja_env.list_templates(extensions=['html'])
+    for name in templates:
+        app.jinja_env.get_template(name)
+    timings['templates'] = (time.perf_counter() - started) * 1000
+
+    started = time.perf_counter()
+    app.url_map.update()
+    timings['routes'] = (time.perf_counter() - started) * 1000
+
+    started = time.perf_counter()
+    with app.app_context():
+        genre_index.sync(SQLiteDataManager(db))
+    timings['genre index'] = (time.perf_counter() - started) * 1000
+    return timings
+
+
+def freeze():
+    """Move every object allocated so far out of the garbage collector's reach.
+
+    Collections in the workers then never write to the reference counts and
+    GC headers of the master's objects, which keeps those pages shared.
+    """
+    gc.collect()
+    gc.freeze()
+
+
+def after_fork(app):
+    """Reset the state a worker must not share with its parent.
+
+    Pooled connections are discarded without closing them, as the parent
+    still owns them. The background and password hashing executors and the
+    log listener, whose threads did not survive the fork, are replaced.
+    """
+    with app.app_context():
+        engines = list(db.engines.values())
+    if 'read_engine' in app.extensions:
+        engines.append(app.extensions['read_engine'])
+    if 'async_data_manager' in app.extensions:
+        engines.append(app.extensions['async_data_manager'].engine.sync_engine)
+    for engine in engines:
+        engine.dispose(close=False)
+    tasks.reset_executor()
+    password_hasher.reset()
+    logs.reset()
@@ -0,0 +1,33 @@
+import logging
+from concurrent.futures import ThreadPoolExecutor
+
+from flask import current_app
+
+# A single worker keeps background jobs from competing with each other for
+# the SQLite write lock; requests only ever wait on one short transaction.
+_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='background-task')
+
+
+def reset_executor():
+    """Replace the background worker, e.g. in a process forked from one that used it."""
+    global _executor
+    _executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='background-task')
+
+
+def run_in_background(func, *args, **kwargs):
+    """Run ``func`` on the background worker inside a fresh app context.
+
+    Must be called while an application context is active. Returns the
+    ``concurrent.futures.Future`` of the job.
+    """
+    app = current_app._get_current_object()
+
+    def run():
+        with app.app_context():
+            try:
+                return func(*args, **kwargs)
+            except Exception:
+                logging.exception("Background task %s failed", getattr(func, '__name__', func))
+                raise
+
+    return _executor.submit(run)
@@ -0,0 +1 @@
+"""Benchmarks for the movie app. Run each module with ``python -m benchmarks.<name>``."""
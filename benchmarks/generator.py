@@ -0,0 +1,155 @@
+"""Deterministic synthetic data for benchmarks.
+
+Seeds users, genres, movies, movie genres, library entries and reviews with
+multi-row executemany inserts, so a million movies can be generated in a
+reasonable time. The same ``seed`` always produces the same rows.
+
+    python -m benchmarks.generator sqlite:///bench.db --users 1000 --movies 1000000
+"""
+import argparse
+import random
+import time
+from dataclasses import dataclass
+
+from sqlalchemy import create_engine, insert
+from werkzeug.security import generate_password_hash
+
+from app import db
+from app.models.genre import Genre
+from app.models.movie import Movie
+from app.models.movie_genre import MovieGenre
+from app.models.movie_stats import rebuild_movie_stats
+from app.models.review import Review
+from app.models.user import User
+from app.models.user_movie import UserMovie
+
+PASSWORD = 'benchmark'
+GENRE_NAMES = ('Action', 'Adventure', 'Animation', 'Comedy', 'Crime', 'Documentary', 'Drama', 'Family',
+               'Fantasy', 'History', 'Horror', 'Music', 'Mystery', 'Romance', 'Science Fiction', 'Thriller',
+               'War', 'Western')
+WORDS = ('night', 'city', 'river', 'last', 'dark', 'summer', 'king', 'road', 'dream', 'ghost', 'star',
+         'house', 'storm', 'winter', 'secret', 'love', 'war', 'girl', 'man', 'island', 'fire', 'blue')
+DIRECTORS = tuple(f'{first} {last}' for first in ('Ana', 'Ben', 'Chen', 'Dara', 'Eli', 'Femi', 'Gus', 'Hana')
+                  for last in ('Lee', 'Park', 'Silva', 'Novak', 'Okafor', 'Ivanova', 'Moreau'))
+
+
+@dataclass
+class Scale:
+    """Sizes of the generated data set."""
+
+    users: int = 100
+    movies: int = 10000
+    genres: int = len(GENRE_NAMES)
+    genres_per_movie: int = 2
+    shared_ratio: float = 0.2  # Share of movies also saved by a second user
+    reviews: int = 5000
+    seed: int = 42
+    chunk_size: int = 10000
+
+
+def user_email(user_id):
+    """Return the email address of generated user ``user_id``."""
+    return f'user{user_id}@bench.example.com'
+
+
+def _chunks(rows, size):
+    chunk = []
+    for row in rows:
+        chunk.append(row)
+        if len(chunk) == size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def _insert(connection, model, rows, chunk_size):
+    count = 0
+    for chunk in _chunks(rows, chunk_size):
+        connection.execute(insert(model.__table__), chunk)
+        count += len(chunk)
+    return count
+
+
+def owner_of(movie_id, scale):
+    """Return the user whose library generated movie ``movie_id`` was created in."""
+    return (movie_id - 1) % scale.users + 1
+
+
+def generate(engine, scale):
+    """Create the schema on ``engine`` and fill it according to ``scale``.
+
+    Movie IDs run from 1 to ``scale.movies`` and user IDs from 1 to
+    ``scale.users``; every user's password is ``PASSWORD``.
+
+    Returns:
+        dict: The number of rows inserted per table.
+    """
+    rng = random.Random(scale.seed)
+    db.metadata.create_all(engine)
+    password = generate_password_hash(PASSWORD)
+    genre_ids = range(1, scale.genres + 1)
+    counts = {}
+
+    with engine.begin() as connection:
+        counts['users'] = _insert(connection, User, (
+            {'id': user_id, 'name': f'User {user_id}', 'email': user_email(user_id), 'password': password}
+            for user_id in range(1, scale.users + 1)
+        ), scale.chunk_size)
+        counts['genres'] = _insert(connection, Genre, (
+            {'id': genre_id, 'name': GENRE_NAMES[(genre_id - 1) % len(GENRE_NAMES)]
+             + ('' if genre_id <= len(GENRE_NAMES) else f' {genre_id}'), 'description': 'Generated genre'}
+            for genre_id in genre_ids
+        ), scale.chunk_size)
+        counts['movies'] = _insert(connection, Movie, (
+            {'id': movie_id, 'name': ' '.join(rng.choice(WORDS) for _ in range(rng.randint(1, 4))).title(),
+             'director': rng.choice(DIRECTORS), 'year': rng.randint(1930, 2024),
+             'rating': round(rng.uniform(1, 10), 1)}
+            for movie_id in range(1, scale.movies + 1)
+        ), scale.chunk_size)
+        counts['movie_genres'] = _insert(connection, MovieGenre, (
+            {'movie_id': movie_id, 'genre_id': genre_id}
+            for movie_id in range(1, scale.movies + 1)
+            for genre_id in rng.sample(genre_ids, min(scale.genres_per_movie, scale.genres))
+        ), scale.chunk_size)
+
+        def library_rows():
+            for movie_id in range(1, scale.movies + 1):
+                owner = owner_of(movie_id, scale)
+                yield {'user_id': owner, 'movie_id': movie_id}
+                if scale.users > 1 and rng.random() < scale.shared_ratio:
+                    other = rng.randint(1, scale.users - 1)
+                    yield {'user_id': other if other < owner else other + 1, 'movie_id': movie_id}
+
+        counts['user_movies'] = _insert(connection, UserMovie, library_rows(), scale.chunk_size)
+
+        def review_rows():
+            for _ in range(scale.reviews):
+                movie_id = rng.randint(1, scale.movies)
+                yield {'movie_id': movie_id, 'user_id': owner_of(movie_id, scale),
+                       'text': ' '.join(rng.choice(WORDS) for _ in range(rng.randint(3, 12))),
+                       'rating': rng.randint(1, 5)}
+
+        counts['reviews'] = _insert(connection, Review, review_rows(), scale.chunk_size)
+        rebuild_movie_stats(connection)
+    return counts
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Seed a database with synthetic benchmark data.')
+    parser.add_argument('database_uri')
+    for field, default in vars(Scale()).items():
+        parser.add_argument(f"--{field.replace('_', '-')}", dest=field, type=type(default), default=default)
+    args = vars(parser.parse_args())
+    engine = create_engine(args.pop('database_uri'))
+
+    started = time.perf_counter()
+    counts = generate(engine, Scale(**args))
+    elapsed = time.perf_counter() - started
+    for table, count in counts.items():
+        print(f'{table:<14} {count:>10,}')
+    print(f'Generated in {elapsed:.1f}s')
+
+
+if __name__ == '__main__':
+    main()
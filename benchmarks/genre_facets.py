@@ -0,0 +1,114 @@
+"""Time the genre bitmap index against the equivalent SQL.
+
+Seeds a temporary database through ``benchmarks.generator``, then measures
+building the index from ``movie_genres``, saving it and loading it back (a
+warm restart), and answering the facets of one library filtered by zero, one
+and two genres, next to the GROUP BY query SQLite would run for the same
+counts.
+
+    python -m benchmarks.genre_facets --movies 1000000 --users 10
+"""
+import argparse
+import os
+import tempfile
+import time
+import timeit
+
+from sqlalchemy import text
+
+# Facet counts of a library filtered by every genre in :genre_ids
+SQL_FACETS = """
+SELECT mg.genre_id, count(*) FROM user_movies um
+JOIN movie_genres mg ON mg.movie_id = um.movie_id
+WHERE um.user_id = :user_id AND um.movie_id IN (
+    SELECT movie_id FROM movie_genres WHERE genre_id IN ({placeholders})
+    GROUP BY movie_id HAVING count(*) = {count})
+GROUP BY mg.genre_id
+"""
+SQL_FACETS_UNFILTERED = """
+SELECT mg.genre_id, count(*) FROM user_movies um
+JOIN movie_genres mg ON mg.movie_id = um.movie_id
+WHERE um.user_id = :user_id
+GROUP BY mg.genre_id
+"""
+
+
+def best(function, runs):
+    """Return the best time of ``function()`` over ``runs`` calls, in seconds."""
+    return min(timeit.repeat(function, number=1, repeat=runs))
+
+
+def sql_facets(connection, user_id, genre_ids):
+    """Count the genres of a user's movies that have all of ``genre_ids``, in SQL."""
+    if not genre_ids:
+        return dict(connection.execute(text(SQL_FACETS_UNFILTERED), {'user_id': user_id}).all())
+    placeholders = ', '.join(f':g{index}' for index in range(len(genre_ids)))
+    statement = text(SQL_FACETS.format(placeholders=placeholders, count=len(genre_ids)))
+    parameters = {'user_id': user_id, **{f'g{index}': genre_id for index, genre_id in enumerate(genre_ids)}}
+    return dict(connection.execute(statement, parameters).all())
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--movies', type=int, default=1000000, help='Movies in the database.')
+    parser.add_argument('--users', type=int, default=10, help='Users sharing them; the first one is measured.')
+    parser.add_argument('--runs', type=int, default=20, help='Timed calls per measurement; the best one is shown.')
+    args = parser.parse_args()
+
+    directory = tempfile.mkdtemp(prefix='movie-app-facets-')
+    os.environ['FLASK_ENV'] = 'testing'
+    os.environ['TEST_DATABASE_URL'] = f'sqlite:///{os.path.join(directory, "facets.db")}'
+    from app import create_app, db
+    from app.datamanager.sqlite_data_manager import SQLiteDataManager
+    from app.genre_index import GenreBitmapIndex, from_words, iter_ids, page_ids
+    from benchmarks.generator import Scale, generate
+
+    app = create_app()
+    with app.app_context():
+        generate(db.engine, Scale(users=args.users, movies=args.movies, reviews=0))
+        data_manager = SQLiteDataManager(db)
+        path = os.path.join(directory, 'genre-index.bin')
+
+        index = GenreBitmapIndex()
+        index.configure(path=path, database='benchmark')
+        started = time.perf_counter()
+        index.rebuild(data_manager)
+        rebuilt = time.perf_counter() - started
+        stats = index.stats()
+        print(f"{args.movies} movies, {stats['pairs']} movie genres in {stats['genres']} bitmaps "
+              f"({stats['bytes'] / 2 ** 20:.1f} MiB)")
+        print(f'rebuild from movie_genres (and save)   {rebuilt * 1000:10.1f} ms')
+
+        restarted = GenreBitmapIndex()
+        restarted.configure(path=path, database='benchmark')
+        started = time.perf_counter()
+        restarted.sync(data_manager)
+        print(f'load saved file (warm restart)         {(time.perf_counter() - started) * 1000:10.1f} ms'
+              f'  (loads={restarted.loads}, rebuilds={restarted.rebuilds})')
+        print(f'sync with no new changes               {best(lambda: index.sync(data_manager), args.runs) * 1e6:10.1f} us')
+
+        started = time.perf_counter()
+        library = from_words(data_manager.get_user_movie_words(1))
+        print(f'library bitset of user 1               {(time.perf_counter() - started) * 1000:10.1f} ms'
+              f'  ({library.bit_count()} movies)')
+
+        genres = sorted(index._bits)
+        with db.engine.connect() as connection:
+            for genre_ids in ([], genres[:1], genres[:2]):
+                facets = index.facets(library, genre_ids)
+                expected = sql_facets(connection, 1, genre_ids)
+                assert {genre_id: count for genre_id, count in facets.counts.items() if count} == expected
+                bitmap = best(lambda: index.facets(library, genre_ids), args.runs)
+                sql = best(lambda: sql_facets(connection, 1, genre_ids), max(args.runs // 5, 1))
+                print(f'facets, {len(genre_ids)} genres selected ({facets.total:>7} movies)  '
+                      f'bitmap {bitmap * 1e6:10.1f} us   SQL {sql * 1000:8.1f} ms')
+
+        matching = index.facets(library, genres[:2]).matching
+        print(f'first page of 50 IDs                   {best(lambda: page_ids(matching), args.runs) * 1e6:10.1f} us')
+        middle = list(iter_ids(matching))[matching.bit_count() // 2]
+        print(f'page of 50 IDs after the middle        '
+              f'{best(lambda: page_ids(matching, after=middle), args.runs) * 1e6:10.1f} us')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,75 @@
+"""Compare ORM instances with the read-only rows of the listing methods.
+
+Seeds one user with a large library through ``benchmarks.generator`` and
+loads it with ``get_user_movies`` (Movie instances with their stats and
+genres) and with ``get_user_movies_readonly`` (MovieRow tuples). Prints the
+time per row and the memory each result holds per row, measured with
+tracemalloc while the result and the session are still alive.
+
+    python -m benchmarks.listing_rows --movies 100000 --runs 3
+"""
+import argparse
+import gc
+import os
+import tempfile
+import time
+import tracemalloc
+
+
+def measure(app, db, load, user_id, runs):
+    """Return ``(rows, best seconds, bytes held)`` for ``load(user_id)``."""
+    best = None
+    for _ in range(runs):
+        with app.app_context():
+            gc.collect()
+            started = time.perf_counter()
+            rows = load(user_id)
+            elapsed = time.perf_counter() - started
+            best = elapsed if best is None else min(best, elapsed)
+            del rows
+            db.session.remove()
+
+    with app.app_context():
+        gc.collect()
+        tracemalloc.start()
+        before = tracemalloc.take_snapshot()
+        rows = load(user_id)
+        gc.collect()
+        held = sum(stat.size_diff for stat in tracemalloc.take_snapshot().compare_to(before, 'filename'))
+        tracemalloc.stop()
+        count = len(rows)
+        del rows
+        db.session.remove()
+    return count, best, held
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--movies', type=int, default=100000, help='Movies in the measured library.')
+    parser.add_argument('--runs', type=int, default=3, help='Timed loads per method; the best one is shown.')
+    args = parser.parse_args()
+
+    directory = tempfile.mkdtemp(prefix='movie-app-rows-')
+    os.environ['FLASK_ENV'] = 'testing'
+    os.environ['TEST_DATABASE_URL'] = f'sqlite:///{os.path.join(directory, "rows.db")}'
+    from app import create_app, db
+    from app.datamanager.sqlite_data_manager import SQLiteDataManager
+    from benchmarks.generator import Scale, generate
+
+    app = create_app()
+    with app.app_context():
+        generate(db.engine, Scale(users=1, movies=args.movies, reviews=args.movies // 2))
+    data_manager = SQLiteDataManager(db)
+    methods = [
+        ('get_user_movies', lambda user_id: data_manager.get_user_movies(user_id, with_genres=True)),
+        ('get_user_movies_readonly', data_manager.get_user_movies_readonly),
+    ]
+    print(f'{args.movies} movies, best of {args.runs} runs')
+    for name, load in methods:
+        count, seconds, held = measure(app, db, load, 1, args.runs)
+        print(f'{name:<26} rows={count}  total={seconds * 1000:8.1f} ms  per row={seconds * 1e6 / count:6.2f} us  '
+              f'held={held / 2 ** 20:7.1f} MiB  per row={held / count:7.0f} B')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,292 @@
+"""Route-level benchmark driving every blueprint through the Flask test client.
+
+Seeds a fresh SQLite database with ``benchmarks.generator``, logs in as a
+generated user and as the admin, and times each route. Reports p50/p95/p99
+latency, throughput and SQL statements per request, writes the results as
+JSON and optionally compares them with a baseline run.
+
+Statements are counted by a ``before_cursor_execute`` listener on every
+engine while the response body is drained, so streamed routes count the
+queries issued while streaming too. Routes that delete rows get a fresh
+target, created before timing starts, for every request.
+
+    python -m benchmarks.routes --movies 100000 --output results.json
+    python -m benchmarks.routes --movies 100000 --baseline results.json --max-regression 0.25
+"""
+import argparse
+import json
+import os
+import platform
+import re
+import sys
+import tempfile
+import time
+from collections import namedtuple
+from datetime import datetime, timezone
+
+from sqlalchemy import event
+
+ADMIN_EMAIL = 'admin@bench.example.com'
+ADMIN_PASSWORD = 'benchmark-admin'
+
+# ``path`` and ``data`` are values, or callables of the request number
+# returning them. ``setup(client, number)`` runs before each request, untimed.
+RouteCase = namedtuple('RouteCase', ['name', 'client', 'method', 'path', 'data', 'setup'],
+                       defaults=(None, None))
+
+
+def percentile(sorted_values, percent):
+    index = max(0, int(round(percent / 100 * len(sorted_values))) - 1)
+    return sorted_values[index]
+
+
+def configure_environment(database_path):
+    """Point the testing configuration at ``database_path``.
+
+    The configuration classes and the auth blueprint read the environment at
+    import time, so this must run before anything imports ``app``.
+    """
+    os.environ['FLASK_ENV'] = 'testing'
+    os.environ['TEST_DATABASE_URL'] = f'sqlite:///{database_path}'
+    os.environ['ADMIN_EMAIL'] = ADMIN_EMAIL
+    os.environ['ADMIN_PASSWORD'] = ADMIN_PASSWORD
+
+
+def prepare_targets(data_manager, user_id, requests):
+    """Create the rows the deleting routes remove, one per request.
+
+    Must be called inside an application context.
+
+    Returns:
+        dict: Lists of IDs under ``'movies'`` and ``'reviews'`` (owned by
+        ``user_id``), ``'genres'`` and ``'users'``.
+    """
+    targets = {'movies': [], 'reviews': [], 'genres': [], 'users': []}
+    for number in range(requests):
+        movie = data_manager.add_movie(f'Benchmark Target {number}', 'Bench', 2000, 5.0)
+        data_manager.add_user_movie(user_id, movie.id)
+        targets['movies'].append(movie.id)
+        data_manager.add_user_review(movie.id, user_id, 'benchmark target', 3.0)
+        targets['reviews'].extend(review.id for review in data_manager.get_user_reviews_for_movie(movie.id, user_id))
+        data_manager.add_genre(f'Benchmark Target {number}', 'Deleted by the benchmark')
+        targets['genres'].append(data_manager.get_genres_by_name(f'Benchmark Target {number}').id)
+        user = data_manager.add_user(f'Target {number}', f'target{number}@bench.example.com', 'x')
+        data_manager.add_user_movie(user.id, movie.id)
+        targets['users'].append(user.id)
+    return targets
+
+
+def route_cases(scale, user_id, targets):
+    """Return a ``RouteCase`` for every route.
+
+    ``client`` is ``'user'``, ``'admin'``, ``'anonymous'``, or ``'session'``
+    for a client of its own that the auth routes log in and out.
+    """
+    from app.datamanager.projections import MOVIE_COLUMNS as MOVIE_FIELDS
+    from benchmarks.generator import PASSWORD, owner_of, user_email
+
+    movie_id = next(movie for movie in range(1, scale.movies + 1) if owner_of(movie, scale) == user_id)
+    last_movie_id = max(movie for movie in range(max(1, scale.movies - scale.users), scale.movies + 1)
+                        if owner_of(movie, scale) == user_id)
+    movie_form = {'name': 'Benchmark Movie', 'director': 'Bench', 'year': 2000, 'rating': 5, 'genres': ['1', '2']}
+    credentials = {'email': user_email(user_id), 'password': PASSWORD}
+
+    def log_in(client, number):
+        client.post('/login', data=credentials)
+
+    return [
+        RouteCase('main.home', 'anonymous', 'GET', '/'),
+        RouteCase('auth.login_page', 'anonymous', 'GET', '/login'),
+        RouteCase('auth.signup_page', 'anonymous', 'GET', '/signup'),
+        RouteCase('user.movies', 'user', 'GET', '/user/movies'),
+        RouteCase('user.movies_deep_page', 'user', 'GET', f'/user/movies?before={last_movie_id}'),
+        RouteCase('user.movies_genre_filter', 'user', 'GET', '/user/movies?genre=1&genre=2'),
+        RouteCase('user.show_movie', 'user', 'GET', f'/user/movies/show_movie/{movie_id}'),
+        RouteCase('user.update_movie_form', 'user', 'GET', f'/user/movies/update_movie/{movie_id}'),
+        RouteCase('user.add_movie_form', 'user', 'GET', '/user/movies/add_movie'),
+        RouteCase('user.search', 'user', 'GET', '/user/movies/search?q=night'),
+        RouteCase('user.export_library', 'user', 'GET', '/user/export/library.csv'),
+        RouteCase('api.movies', 'user', 'GET', '/api/v1/movies?limit=50'),
+        RouteCase('api.movies_all_fields', 'user', 'GET', f"/api/v1/movies?limit=50&fields={','.join(MOVIE_FIELDS)}"),
+        RouteCase('api.movies_deep_page', 'user', 'GET', f'/api/v1/movies?limit=50&after={last_movie_id - 1}'),
+        RouteCase('api.movie', 'user', 'GET', f'/api/v1/movies/{movie_id}'),
+        RouteCase('api.reviews', 'user', 'GET', '/api/v1/reviews'),
+        RouteCase('api.genres', 'user', 'GET', '/api/v1/genres'),
+        RouteCase('user.add_review', 'user', 'POST', f'/user/movies/show_movie/{movie_id}',
+                  {'review': 'benchmark review', 'rating': 4}),
+        RouteCase('user.update_movie', 'user', 'POST', f'/user/movies/update_movie/{movie_id}', movie_form),
+        RouteCase('user.add_movie', 'user', 'POST', '/user/movies/add_movie', movie_form),
+        RouteCase('user.delete_review', 'user', 'POST',
+                  lambda number: f"/user/reviews/{targets['reviews'][number]}/delete"),
+        RouteCase('user.delete_movie', 'user', 'POST',
+                  lambda number: f"/user/movies/{targets['movies'][number]}/delete"),
+        RouteCase('admin.dashboard', 'admin', 'GET', '/admin'),
+        RouteCase('admin.dashboard_deep_page', 'admin', 'GET', f'/admin?after={scale.users // 2}'),
+        RouteCase('admin.metrics', 'admin', 'GET', '/admin/metrics'),
+        RouteCase('admin.add_genre', 'admin', 'POST', '/admin/add_genre',
+                  lambda number: {'name': f'Benchmark Genre {number}', 'description': 'Added by the benchmark'}),
+        RouteCase('admin.delete_genre', 'admin', 'GET',
+                  lambda number: f"/admin/genre/{targets['genres'][number]}/delete"),
+        RouteCase('admin.delete_user', 'admin', 'GET',
+                  lambda number: f"/admin/delete_user/{targets['users'][number]}"),
+        RouteCase('auth.login', 'session', 'POST', '/login', credentials),
+        RouteCase('auth.logout', 'session', 'GET', '/logout', setup=log_in),
+        RouteCase('auth.signup', 'session', 'POST', '/signup',
+                  lambda number: {'name': f'Signup {number}', 'email': f'signup{number}@bench.example.com',
+                                  'password': PASSWORD}),
+    ]
+
+
+def run_case(client, case, requests, statements):
+    """Issue ``requests`` requests of ``case`` and summarize them.
+
+    ``statements`` is the one-item list ``count_statements`` keeps up to date.
+    """
+    durations, queries = [], []
+    elapsed = 0.0
+    for number in range(requests):
+        if case.setup:
+            case.setup(client, number)
+        path = case.path(number) if callable(case.path) else case.path
+        data = case.data(number) if callable(case.data) else case.data
+        issued = statements[0]
+        start = time.perf_counter()
+        response = client.open(path, method=case.method, data=data)
+        response.get_data()  # Drain streamed bodies
+        duration = time.perf_counter() - start
+        queries.append(statements[0] - issued)
+        durations.append(duration * 1000)
+        elapsed += duration
+        if response.status_code >= 400:
+            raise RuntimeError(f'{case.method} {path} returned {response.status_code}')
+
+    durations.sort()
+    return {
+        'method': case.method,
+        'path': case.path if isinstance(case.path, str) else path,
+        'requests': requests,
+        'p50_ms': percentile(durations, 50),
+        'p95_ms': percentile(durations, 95),
+        'p99_ms': percentile(durations, 99),
+        'max_ms': durations[-1],
+        'throughput_rps': requests / elapsed,
+        'queries_per_request': sum(queries) / len(queries),
+    }
+
+
+def count_statements(engines):
+    """Count the statements every engine in ``engines`` executes from now on.
+
+    Returns:
+        list: One item, the running count.
+    """
+    statements = [0]
+
+    def count(conn, cursor, statement, parameters, context, executemany):
+        statements[0] += 1
+
+    for engine in engines:
+        event.listen(engine, 'before_cursor_execute', count)
+    return statements
+
+
+def run(scale, requests, only=None):
+    """Seed a fresh database at ``scale`` and benchmark every route.
+
+    ``configure_environment`` must have been called first.
+    """
+    from app import create_app, db
+    from app.datamanager.sqlite_data_manager import SQLiteDataManager
+    from benchmarks.generator import PASSWORD, generate, user_email
+
+    app = create_app()
+    user_id = 1
+    with app.app_context():
+        seeded = generate(db.engine, scale)
+        targets = prepare_targets(SQLiteDataManager(db), user_id, requests)
+        engines = list(db.engines.values())
+    if 'read_engine' in app.extensions:
+        engines.append(app.extensions['read_engine'])
+    if 'async_data_manager' in app.extensions:
+        engines.append(app.extensions['async_data_manager'].engine.sync_engine)
+    statements = count_statements(engines)
+
+    clients = {name: app.test_client() for name in ('user', 'admin', 'anonymous', 'session')}
+    clients['user'].post('/login', data={'email': user_email(user_id), 'password': PASSWORD})
+    clients['admin'].post('/login', data={'email': ADMIN_EMAIL, 'password': ADMIN_PASSWORD})
+
+    results = {}
+    for case in route_cases(scale, user_id, targets):
+        if only and not re.search(only, case.name):
+            continue
+        results[case.name] = result = run_case(clients[case.client], case, requests, statements)
+        print(f"{case.name:<28} p50={result['p50_ms']:8.2f}ms  p95={result['p95_ms']:8.2f}ms  "
+              f"p99={result['p99_ms']:8.2f}ms  {result['throughput_rps']:8.1f} req/s  "
+              f"queries={result['queries_per_request']:.1f}")
+
+    return {
+        'meta': {
+            'created_at': datetime.now(timezone.utc).isoformat(),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'requests_per_route': requests,
+            'scale': vars(scale),
+            'seeded_rows': seeded,
+        },
+        'routes': results,
+    }
+
+
+def compare(results, baseline, max_regression):
+    """Return the regressions of ``results`` against ``baseline``.
+
+    A route regresses when its p95 latency grows by more than
+    ``max_regression`` (a fraction) or when it issues more SQL statements.
+    """
+    regressions = []
+    for name, current in results['routes'].items():
+        previous = baseline['routes'].get(name)
+        if previous is None:
+            continue
+        if current['p95_ms'] > previous['p95_ms'] * (1 + max_regression):
+            regressions.append(f"{name}: p95 {previous['p95_ms']:.2f}ms -> {current['p95_ms']:.2f}ms")
+        if (current['queries_per_request'] or 0) > (previous['queries_per_request'] or 0):
+            regressions.append(f"{name}: queries/request {previous['queries_per_request']} -> "
+                               f"{current['queries_per_request']}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark every route of the movie app.')
+    parser.add_argument('--users', type=int, default=100)
+    parser.add_argument('--movies', type=int, default=10000)
+    parser.add_argument('--reviews', type=int, default=5000)
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--requests', type=int, default=50, help='Requests per route.')
+    parser.add_argument('--only', help='Only run routes whose name matches this regular expression.')
+    parser.add_argument('--output', help='Write the results to this JSON file.')
+    parser.add_argument('--baseline', help='Compare with the results in this JSON file.')
+    parser.add_argument('--max-regression', type=float, default=0.2,
+                        help='Allowed relative p95 increase before a route counts as regressed.')
+    args = parser.parse_args()
+
+    configure_environment(os.path.join(tempfile.mkdtemp(prefix='movie-app-routes-'), 'bench.db'))
+    from benchmarks.generator import Scale
+
+    scale = Scale(users=args.users, movies=args.movies, reviews=args.reviews, seed=args.seed)
+    results = run(scale, args.requests, only=args.only)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as output:
+            json.dump(results, output, indent=2)
+
+    if args.baseline:
+        with open(args.baseline, encoding='utf-8') as baseline_file:
+            regressions = compare(results, json.load(baseline_file), args.max_regression)
+        for regression in regressions:
+            print(f'REGRESSION {regression}', file=sys.stderr)
+        if regressions:
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
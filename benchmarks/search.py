@@ -0,0 +1,111 @@
+"""Measure library search latency against the 20 ms p95 target.
+
+Seeds a temporary database through ``benchmarks.generator``, with the search
+index built by the triggers as the rows go in, then runs a fixed mix of
+queries as one user: whole title words, search-as-you-type prefixes, two
+words, director names and words that match nothing, on the first and on a
+later page. Prints the latency percentiles of each kind for the ranking
+query alone and for ``search_user_movies_readonly``, which also loads the
+rows of the page.
+
+    python -m benchmarks.search --movies 1000000 --users 100
+"""
+import argparse
+import os
+import random
+import statistics
+import tempfile
+import time
+
+TARGET_P95_MS = 20.0
+
+
+def query_mix(rng, count):
+    """Return ``count`` ``(kind, terms, page)`` searches drawn from the generator's vocabulary."""
+    from benchmarks.generator import DIRECTORS, WORDS
+
+    def prefix():
+        word = rng.choice(WORDS)
+        return word[:rng.randint(1, len(word))]
+
+    kinds = {
+        'word': lambda: rng.choice(WORDS),
+        'prefix': prefix,
+        'two words': lambda: f'{rng.choice(WORDS)} {rng.choice(WORDS)[:3]}',
+        'director': lambda: rng.choice(DIRECTORS),
+        'no match': lambda: rng.choice(('zzz', 'qwerty', 'night zzz')),
+    }
+    searches = []
+    for _ in range(count):
+        kind = rng.choice(sorted(kinds))
+        searches.append((kind, kinds[kind](), rng.choice((1, 1, 1, 5))))
+    return searches
+
+
+def percentiles(timings):
+    """Return the p50, p95 and maximum of ``timings``, in milliseconds."""
+    timings = sorted(timings)
+    cuts = statistics.quantiles(timings, n=100, method='inclusive')
+    return cuts[49] * 1000, cuts[94] * 1000, timings[-1] * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--movies', type=int, default=1000000, help='Movies in the database.')
+    parser.add_argument('--users', type=int, default=100, help='Users sharing them; the first one searches.')
+    parser.add_argument('--searches', type=int, default=500, help='Searches in the timed mix.')
+    parser.add_argument('--per-page', type=int, default=20, help='Results per page.')
+    args = parser.parse_args()
+
+    directory = tempfile.mkdtemp(prefix='movie-app-search-')
+    os.environ['FLASK_ENV'] = 'testing'
+    os.environ['TEST_DATABASE_URL'] = f'sqlite:///{os.path.join(directory, "search.db")}'
+    from app import create_app, db
+    from app.datamanager.sqlite_data_manager import SQLiteDataManager
+    from app.search import SEARCH_QUERY, build_match_query, search_index_ready
+    from benchmarks.generator import Scale, generate
+
+    app = create_app()
+    with app.app_context():
+        started = time.perf_counter()
+        counts = generate(db.engine, Scale(users=args.users, movies=args.movies))
+        print(f"{counts['movies']} movies, {counts['user_movies']} library entries and {counts['reviews']} "
+              f"reviews generated and indexed in {time.perf_counter() - started:.1f}s")
+        with db.engine.connect() as connection:
+            assert search_index_ready(connection)
+        data_manager = SQLiteDataManager(db)
+        print(f'user 1 has {data_manager.count_user_rows(1, args.movies)} library entries and reviews\n')
+
+        def rank(terms, page):
+            return db.session.execute(SEARCH_QUERY, {
+                'query': build_match_query(terms), 'user_id': 1,
+                'limit': args.per_page + 1, 'offset': (page - 1) * args.per_page,
+            }).all()
+
+        def search(terms, page):
+            return data_manager.search_user_movies_readonly(1, terms, page=page, per_page=args.per_page)
+
+        searches = query_mix(random.Random(42), args.searches)
+        for terms in ('night', 'n', 'dark ci'):
+            search(terms, 1)
+        print(f"{'':<24}{'searches':>9}{'p50 ms':>9}{'p95 ms':>9}{'max ms':>9}")
+        for label, function in (('ranking query', rank), ('search_user_movies', search)):
+            timings = {}
+            for kind, terms, page in searches:
+                started = time.perf_counter()
+                function(terms, page)
+                timings.setdefault(kind, []).append(time.perf_counter() - started)
+                db.session.remove()
+            print(label)
+            for kind, kind_timings in sorted(timings.items()):
+                print(f'  {kind:<22}{len(kind_timings):>9}' + ''.join(f'{value:9.2f}'
+                                                                    for value in percentiles(kind_timings)))
+            overall = [timing for kind_timings in timings.values() for timing in kind_timings]
+            p50, p95, slowest = percentiles(overall)
+            verdict = 'within' if p95 < TARGET_P95_MS else 'OVER'
+            print(f"  {'all':<22}{len(overall):>9}{p50:9.2f}{p95:9.2f}{slowest:9.2f}"
+                  f'   {verdict} the {TARGET_P95_MS:.0f} ms p95 target')
+
+
+if __name__ == '__main__':
+    main()
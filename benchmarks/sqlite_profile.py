@@ -0,0 +1,114 @@
+"""Compare SQLite throughput with and without the SQLITE_PRAGMAS engine profile.
+
+Runs a mixed workload of review inserts (the ``add_user_review`` write path)
+and library reads from several threads against a fresh database file, once
+with SQLite's defaults and once with the configured profile, and prints the
+operations per second and the number of "database is locked" failures.
+
+    python -m benchmarks.sqlite_profile --seconds 5 --writers 4 --readers 8
+"""
+import argparse
+import os
+import random
+import tempfile
+import threading
+import time
+
+from sqlalchemy import create_engine, func, insert, select
+from sqlalchemy.exc import OperationalError
+
+from app import db
+from app.config import Config
+from app.engine_profile import configure_engine
+from app.models.movie import Movie
+from app.models.movie_genre import MovieGenre  # noqa: F401  (registers movie_genres for the mappers)
+from app.models.review import Review
+from app.models.user import User
+from app.models.user_movie import UserMovie
+
+USERS = 50
+MOVIES_PER_USER = 200
+
+
+def seed(engine):
+    db.metadata.create_all(engine)
+    with engine.begin() as connection:
+        connection.execute(insert(User), [
+            {'id': user_id, 'name': f'user{user_id}', 'email': f'user{user_id}@example.com', 'password': 'x'}
+            for user_id in range(1, USERS + 1)
+        ])
+        connection.execute(insert(Movie), [
+            {'id': movie_id, 'name': f'movie{movie_id}', 'director': 'director', 'year': 2000, 'rating': 5.0}
+            for movie_id in range(1, USERS * MOVIES_PER_USER + 1)
+        ])
+        connection.execute(insert(UserMovie), [
+            {'user_id': (movie_id - 1) // MOVIES_PER_USER + 1, 'movie_id': movie_id}
+            for movie_id in range(1, USERS * MOVIES_PER_USER + 1)
+        ])
+
+
+def writer(engine, deadline, counters):
+    rng = random.Random()
+    while time.perf_counter() < deadline:
+        user_id = rng.randint(1, USERS)
+        movie_id = (user_id - 1) * MOVIES_PER_USER + rng.randint(1, MOVIES_PER_USER)
+        try:
+            with engine.begin() as connection:
+                connection.execute(insert(Review), {
+                    'user_id': user_id, 'movie_id': movie_id, 'text': 'benchmark', 'rating': 4.0,
+                })
+            counters['writes'] += 1
+        except OperationalError:
+            counters['locked'] += 1
+
+
+def reader(engine, deadline, counters):
+    rng = random.Random()
+    query = (select(Movie.id, Movie.name, func.count(Review.id))
+             .join(UserMovie, UserMovie.movie_id == Movie.id)
+             .outerjoin(Review, Review.movie_id == Movie.id)
+             .group_by(Movie.id))
+    while time.perf_counter() < deadline:
+        try:
+            with engine.connect() as connection:
+                connection.execute(query.where(UserMovie.user_id == rng.randint(1, USERS))).all()
+            counters['reads'] += 1
+        except OperationalError:
+            counters['locked'] += 1
+
+
+def run(label, pragmas, seconds, writers, readers):
+    directory = tempfile.mkdtemp(prefix='movie-app-bench-')
+    engine = create_engine(f"sqlite:///{os.path.join(directory, 'bench.db')}",
+                           pool_size=writers + readers, max_overflow=0)
+    configure_engine(engine, pragmas)
+    seed(engine)
+
+    counters = {'writes': 0, 'reads': 0, 'locked': 0}
+    deadline = time.perf_counter() + seconds
+    threads = ([threading.Thread(target=writer, args=(engine, deadline, counters)) for _ in range(writers)]
+               + [threading.Thread(target=reader, args=(engine, deadline, counters)) for _ in range(readers)])
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    engine.dispose()
+
+    print(f"{label:<10} writes/s={counters['writes'] / seconds:>9,.0f}  "
+          f"reads/s={counters['reads'] / seconds:>9,.0f}  locked={counters['locked']}")
+    return counters
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--seconds', type=float, default=5.0)
+    parser.add_argument('--writers', type=int, default=4)
+    parser.add_argument('--readers', type=int, default=8)
+    args = parser.parse_args()
+
+    run('default', {}, args.seconds, args.writers, args.readers)
+    run('profile', Config.SQLITE_PRAGMAS, args.seconds, args.writers, args.readers)
+
+
+if __name__ == '__main__':
+    main()
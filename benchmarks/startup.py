@@ -0,0 +1,116 @@
+"""Measure application startup the way a fresh worker process sees it.
+
+Every run is a new interpreter that imports ``app``, calls ``create_app``,
+optionally runs ``app.startup.warm_up`` and then times its first requests.
+Runs with a cold and a warm Jinja bytecode cache show what the cache saves;
+``--imports`` lists the slowest imports from ``python -X importtime``.
+
+    python -m benchmarks.startup --runs 5 --imports 15
+"""
+import argparse
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+FIRST_REQUESTS = ('/', '/login', '/signup')
+
+
+def child(warm_up, bytecode_cache_dir):
+    """Run inside the measured process; prints one JSON line of timings in ms."""
+    started = time.perf_counter()
+    import app as app_package
+    imported = time.perf_counter()
+
+    from app.config import config
+    config['testing'].JINJA_BYTECODE_CACHE = bytecode_cache_dir is not None
+    config['testing'].JINJA_BYTECODE_CACHE_DIR = bytecode_cache_dir
+    app = app_package.create_app()
+    created = time.perf_counter()
+    timings = {'import': (imported - started) * 1000, 'create_app': (created - imported) * 1000}
+
+    if warm_up:
+        from app.startup import warm_up as run_warm_up
+        timings['warm_up'] = sum(run_warm_up(app).values())
+
+    client = app.test_client()
+    first = time.perf_counter()
+    for path in FIRST_REQUESTS:
+        client.get(path)
+    timings['first_requests'] = (time.perf_counter() - first) * 1000
+    timings['modules'] = len(sys.modules)
+    print(json.dumps(timings))
+
+
+def measure(runs, warm_up, bytecode_cache_dir, environment):
+    command = [sys.executable, '-m', 'benchmarks.startup', '--child']
+    if warm_up:
+        command.append('--warm-up')
+    if bytecode_cache_dir:
+        command += ['--bytecode-cache-dir', bytecode_cache_dir]
+    samples = []
+    for _ in range(runs):
+        output = subprocess.run(command, env=environment, check=True, capture_output=True, text=True).stdout
+        samples.append(json.loads(output.strip().splitlines()[-1]))
+    return {key: sum(sample[key] for sample in samples) / runs for key in samples[0]}
+
+
+def slowest_imports(environment, limit):
+    """Return ``(cumulative_ms, module)`` for the slowest imports of create_app.
+
+    Only modules imported directly by the script or by a top-level module are
+    listed, so nested imports are not counted twice.
+    """
+    code = 'from app import create_app; create_app()'
+    stderr = subprocess.run([sys.executable, '-X', 'importtime', '-c', code], env=environment,
+                            check=True, capture_output=True, text=True).stderr
+    imports = []
+    for line in stderr.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        _, cumulative, name = line[len('import time:'):].split('|')
+        depth = (len(name) - len(name.lstrip()) - 1) // 2
+        if depth <= 1:
+            imports.append((int(cumulative) / 1000, '  ' * depth + name.strip()))
+    return sorted(imports, reverse=True)[:limit]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--runs', type=int, default=5, help='Processes started per scenario.')
+    parser.add_argument('--imports', type=int, default=0, help='List this many of the slowest imports.')
+    parser.add_argument('--child', action='store_true', help=argparse.SUPPRESS)
+    parser.add_argument('--warm-up', action='store_true', help=argparse.SUPPRESS)
+    parser.add_argument('--bytecode-cache-dir', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.child:
+        child(args.warm_up, args.bytecode_cache_dir)
+        return
+
+    directory = tempfile.mkdtemp(prefix='movie-app-startup-')
+    environment = dict(os.environ, FLASK_ENV='testing',
+                       TEST_DATABASE_URL=f'sqlite:///{os.path.join(directory, "startup.db")}')
+    cache_dir = os.path.join(directory, 'jinja-cache')
+    os.makedirs(cache_dir)
+    try:
+        scenarios = [('no bytecode cache', False, None)]
+        # The first run fills the cache; the measured ones then read it
+        measure(1, False, cache_dir, environment)
+        scenarios += [('bytecode cache', False, cache_dir), ('bytecode cache + warm-up', True, cache_dir)]
+        print(f'{args.runs} processes per scenario, times in ms; first requests: {", ".join(FIRST_REQUESTS)}')
+        for label, warm_up, bytecode_cache_dir in scenarios:
+            result = measure(args.runs, warm_up, bytecode_cache_dir, environment)
+            print(f"{label:<26} import={result['import']:7.1f}  create_app={result['create_app']:6.1f}  "
+                  f"warm_up={result.get('warm_up', 0):6.1f}  first_requests={result['first_requests']:6.1f}  "
+                  f"modules={result['modules']:.0f}")
+        for cumulative, name in slowest_imports(environment, args.imports):
+            print(f'{cumulative:8.1f} ms  {name}')
+    finally:
+        shutil.rmtree(directory, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,117 @@
+"""Compare the movie write paths with and without ``SQLiteDataManager.unit_of_work``.
+
+Adds and updates movies the way the routes used to (a commit per data manager
+call and one per removed genre) and the way they do now (one unit of work with
+set-based genre sync), and prints the SQL statements, commits and latency per
+operation. With ``synchronous=FULL`` every commit is an fsync of the WAL, so the
+commit count is also the fsync count.
+
+    python -m benchmarks.unit_of_work --operations 500 --synchronous FULL
+"""
+import argparse
+import os
+import tempfile
+import time
+
+from sqlalchemy import event
+
+
+def legacy_add(data_manager, user_id, genre_ids):
+    movie = data_manager.add_movie(name='Benchmark', director='Bench', year=2000, rating=5.0)
+    movie.genres.extend(data_manager.get_genres_by_ids(genre_ids))
+    data_manager.db.session.commit()
+    data_manager.add_user_movie(user_id=user_id, movie_id=movie.id)
+    return movie.id
+
+
+def unit_of_work_add(data_manager, user_id, genre_ids):
+    with data_manager.unit_of_work():
+        movie = data_manager.add_movie(name='Benchmark', director='Bench', year=2000, rating=5.0)
+        data_manager.sync_movie_genres(movie.id, genre_ids)
+        data_manager.add_user_movie(user_id=user_id, movie_id=movie.id)
+    return movie.id
+
+
+def legacy_update(data_manager, user_id, movie_id, genre_ids):
+    data_manager.update_movie(movie_id, title='Updated', director='Bench', year=2001, rating=4.0)
+    movie = data_manager.get_movie_by_id(movie_id, user_id, with_genres=True)
+    current = {genre.id for genre in movie.genres}
+    for genre_id in current - set(genre_ids):
+        data_manager.delete_movie_genre(movie_id, genre_id)
+    for genre_id in set(genre_ids) - current:
+        movie.genres.append(data_manager.get_genre_by_id(genre_id))
+    data_manager.db.session.commit()
+
+
+def unit_of_work_update(data_manager, user_id, movie_id, genre_ids):
+    with data_manager.unit_of_work():
+        data_manager.update_movie(movie_id, title='Updated', director='Bench', year=2001, rating=4.0)
+        data_manager.sync_movie_genres(movie_id, genre_ids)
+
+
+def measure(engine, operation, arguments):
+    """Run ``operation`` once per argument tuple; return per-operation averages."""
+    counts = {'statements': 0, 'commits': 0}
+
+    def count_statement(*args):
+        counts['statements'] += 1
+
+    def count_commit(*args):
+        counts['commits'] += 1
+
+    event.listen(engine, 'before_cursor_execute', count_statement)
+    event.listen(engine, 'commit', count_commit)
+    started = time.perf_counter()
+    try:
+        results = [operation(*args) for args in arguments]
+    finally:
+        elapsed = time.perf_counter() - started
+        event.remove(engine, 'before_cursor_execute', count_statement)
+        event.remove(engine, 'commit', count_commit)
+    n = len(arguments)
+    return results, {'statements': counts['statements'] / n, 'commits': counts['commits'] / n,
+                     'ms': elapsed * 1000 / n}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--operations', type=int, default=200)
+    parser.add_argument('--genres', type=int, default=6, help='Genres per movie.')
+    parser.add_argument('--synchronous', default='FULL', choices=['OFF', 'NORMAL', 'FULL'])
+    args = parser.parse_args()
+
+    from benchmarks.routes import configure_environment
+    configure_environment(os.path.join(tempfile.mkdtemp(prefix='movie-app-uow-'), 'bench.db'))
+    from app import create_app, db
+    from app.config import Config, config
+    from app.datamanager.sqlite_data_manager import SQLiteDataManager
+    from app.models.genre import Genre
+
+    # The configuration classes are read by create_app
+    config['testing'].SQLITE_PRAGMAS = dict(Config.SQLITE_PRAGMAS, synchronous=args.synchronous)
+    config['testing'].RECOMMENDATION_AUTO_REFRESH = False
+    app = create_app()
+    with app.app_context():
+        db.create_all()
+        data_manager = SQLiteDataManager(db)
+        user_id = data_manager.add_user(name='bench', email='bench@bench.example.com', password='x').id
+        db.session.add_all([Genre(name=f'Genre {number}', description='') for number in range(args.genres * 2)])
+        db.session.commit()
+        first = list(range(1, args.genres + 1))
+        # Keep half of the genres and swap the other half
+        second = first[:args.genres // 2] + list(range(args.genres + 1, args.genres * 2 - args.genres // 2 + 1))
+
+        print(f'synchronous={args.synchronous}, {args.operations} operations, {args.genres} genres per movie')
+        for label, add, update in (('legacy', legacy_add, legacy_update),
+                                   ('unit of work', unit_of_work_add, unit_of_work_update)):
+            movie_ids, added = measure(db.engine, lambda: add(data_manager, user_id, first),
+                                       [()] * args.operations)
+            _, updated = measure(db.engine, lambda movie_id: update(data_manager, user_id, movie_id, second),
+                                 [(movie_id,) for movie_id in movie_ids])
+            for name, stats in (('add', added), ('update', updated)):
+                print(f"{label:<13} {name:<7} statements={stats['statements']:5.1f}  "
+                      f"commits={stats['commits']:4.1f}  {stats['ms']:7.2f} ms/op")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,34 @@
+"""Gunicorn settings: load and warm up the app once, then fork the workers.
+
+    gunicorn -c gunicorn.conf.py run:app
+
+The master imports the app (``preload_app``), configures the mappers and
+compiles the templates before forking, so workers serve their first request
+hot and share that memory copy-on-write. Each worker then drops the database
+connections it inherited; see ``app/startup.py``.
+"""
+import multiprocessing
+import os
+
+bind = os.getenv('GUNICORN_BIND', '127.0.0.1:8000')
+workers = int(os.getenv('WEB_CONCURRENCY', multiprocessing.cpu_count() * 2 + 1))
+preload_app = True
+
+
+def when_ready(server):
+    from app.startup import warm_up
+
+    timings = warm_up(server.app.wsgi())
+    server.log.info('Warm-up done: %s', ', '.join(f'{step} {ms:.1f} ms' for step, ms in timings.items()))
+
+
+def pre_fork(server, worker):
+    from app.startup import freeze
+
+    freeze()
+
+
+def post_fork(server, worker):
+    from app.startup import after_fork
+
+    after_fork(worker.app.wsgi())
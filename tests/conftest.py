@@ -0,0 +1,75 @@
+import os
+from contextlib import contextmanager
+
+import pytest
+from sqlalchemy import event
+
+# Select TestingConfig before the app package reads the environment
+os.environ['FLASK_ENV'] = 'testing'
+
+from app import create_app, db  # noqa: E402
+from app.config import config  # noqa: E402
+from app.datamanager.sqlite_data_manager import SQLiteDataManager  # noqa: E402
+from app.passwords import password_hasher  # noqa: E402
+
+PASSWORD = 'secret1'
+
+
+@pytest.fixture
+def app(tmp_path, monkeypatch):
+    """An app on a fresh SQLite file with every table created."""
+    monkeypatch.setattr(config['testing'], 'SQLALCHEMY_DATABASE_URI', f'sqlite:///{tmp_path / "test.db"}')
+    app = create_app()
+    with app.app_context():
+        db.create_all()
+    yield app
+    with app.app_context():
+        db.session.remove()
+        engines = list(db.engines.values())
+    if 'read_engine' in app.extensions:
+        engines.append(app.extensions['read_engine'])
+    for engine in engines:
+        engine.dispose()
+
+
+@pytest.fixture
+def data_manager(app):
+    with app.app_context():
+        yield SQLiteDataManager(db)
+
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
+
+
+def add_user(data_manager, name='user', email='user@example.com'):
+    """Create a user who can log in with ``PASSWORD`` and return their ID."""
+    data_manager.add_user(name, email, password_hasher.hash(PASSWORD))
+    return data_manager.get_user_by_email(email).id
+
+
+def login(client, email='user@example.com'):
+    response = client.post('/login', data={'email': email, 'password': PASSWORD})
+    assert response.status_code == 302, response.get_data(as_text=True)
+
+
+@contextmanager
+def count_statements(app):
+    """Collect the SQL statements every engine of ``app`` executes inside the block."""
+    with app.app_context():
+        engines = list(db.engines.values())
+    if 'read_engine' in app.extensions:
+        engines.append(app.extensions['read_engine'])
+    statements = []
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    for engine in engines:
+        event.listen(engine, 'before_cursor_execute', before_cursor_execute)
+    try:
+        yield statements
+    finally:
+        for engine in engines:
+            event.remove(engine, 'before_cursor_execute', before_cursor_execute)
@@ -0,0 +1,221 @@
+"""AsyncSQLiteDataManager returns and writes the same as SQLiteDataManager.
+
+Read methods run against one seeded database. Each write method runs on one
+of two copies of it, synchronously on the first and asynchronously on the
+second, after which both the return values and the full table contents are
+compared.
+"""
+import asyncio
+import inspect
+
+import pytest
+from sqlalchemy import inspect as inspect_instance, select, text
+from sqlalchemy.engine import Row
+
+from app import db
+from app.datamanager.async_sqlite_data_manager import AsyncSQLiteDataManager
+from app.datamanager.data_manager_interface import AsyncDataManagerInterface, DataManagerInterface
+from app.datamanager.pagination import Page
+from app.datamanager.sqlite_data_manager import SQLiteDataManager
+from app.engine_profile import configure_engine
+from app.models.genre import Genre
+from app.models.movie import Movie
+from app.models.recommendation import MovieRecommendation
+from app.models.review import Review
+from app.models.user import User
+from app.models.user_movie import UserMovie
+
+# Keyword arguments of every read method, from the IDs of the seeded rows
+READ_CALLS = {
+    'get_all_users': lambda s: {},
+    'get_users_page': lambda s: {'after': 0, 'per_page': 1},
+    'get_user_movies': lambda s: {'user_id': s['user_id']},
+    'get_user_movies_page': lambda s: {'user_id': s['user_id'], 'after': s['movie_ids'][0], 'per_page': 2},
+    'get_user_by_email': lambda s: {'email': 'one@example.com'},
+    'get_user_by_id': lambda s: {'user_id': s['user_id']},
+    'get_all_genre': lambda s: {},
+    'get_genres_by_ids': lambda s: {'ids': s['genre_ids'][:2]},
+    'get_genres_by_name': lambda s: {'name': 'Noir'},
+    'get_user_reviews_for_movie': lambda s: {'movie_id': s['movie_ids'][0], 'user_id': s['user_id']},
+    'get_movie_by_id': lambda s: {'movie_id': s['movie_ids'][0], 'user_id': s['user_id'], 'with_genres': True},
+    'get_versions': lambda s: {'user_id': s['user_id'], 'movie_id': s['movie_ids'][0]},
+    'get_movie_recommendations': lambda s: {'movie_id': s['movie_ids'][0], 'user_id': s['other_user_id']},
+    'get_review_by_id': lambda s: {'review_id': s['review_id']},
+    'get_genre_by_id': lambda s: {'genre_id': s['genre_ids'][0]},
+}
+
+WRITE_CALLS = {
+    'add_user': lambda s: {'name': 'three', 'email': 'three@example.com', 'password': 'x'},
+    'delete_user': lambda s: {'user_id': s['user_id']},
+    'add_movie': lambda s: {'name': 'new', 'director': 'director', 'year': 2001, 'rating': 6.0},
+    'update_movie': lambda s: {'movie_id': s['movie_ids'][0], 'title': 'renamed', 'director': 'someone',
+                               'year': 1999, 'rating': 4.0},
+    'delete_movie': lambda s: {'movie_id': s['movie_ids'][0]},
+    'add_user_movie': lambda s: {'user_id': s['other_user_id'], 'movie_id': s['movie_ids'][2]},
+    'add_user_review': lambda s: {'movie_id': s['movie_ids'][1], 'user_id': s['other_user_id'],
+                                  'text': 'fine', 'rating': 7.0},
+    'delete_genre': lambda s: {'genre_id': s['genre_ids'][0]},
+    'add_genre': lambda s: {'name': 'Western', 'description': 'western'},
+    'delete_review': lambda s: {'review_id': s['review_id']},
+    'delete_movie_genre': lambda s: {'movie_id': s['movie_ids'][0], 'genre_id': s['genre_ids'][0]},
+}
+
+# Columns filled from the clock, which differ between two runs of a write
+CLOCK_COLUMNS = {'created_at', 'queued_at', 'changed_at', 'updated_at'}
+# Logs whose IDs follow the order the ORM flushes cascaded deletes in, which
+# is not fixed; their entries are compared regardless of order
+LOG_TABLES = {'genre_index_changes'}
+
+
+def seed():
+    """Fill the database with a small fixture and return the IDs of its rows."""
+    user = User(name='one', email='one@example.com', password='x')
+    other_user = User(name='two', email='two@example.com', password='x')
+    genres = [Genre(name=name, description=name.lower()) for name in ('Drama', 'Noir', 'Comedy')]
+    movies = [Movie(name=f'movie {i}', director='director', year=2000 + i, rating=5.0 + i,
+                    genres=genres[:i % 3 + 1]) for i in range(4)]
+    db.session.add_all([user, other_user, *genres, *movies])
+    db.session.flush()
+    db.session.add_all([UserMovie(user_id=user.id, movie_id=movie.id) for movie in movies]
+                       + [UserMovie(user_id=other_user.id, movie_id=movies[1].id)])
+    review = Review(movie_id=movies[0].id, user_id=user.id, text='good', rating=8.0)
+    db.session.add_all([review, Review(movie_id=movies[0].id, user_id=user.id, text='again', rating=6.0),
+                        Review(movie_id=movies[1].id, user_id=other_user.id, text='meh', rating=3.0)])
+    db.session.add_all(MovieRecommendation(movie_id=movies[0].id, rank=rank, recommended_id=movie.id,
+                                           score=1.0 / (rank + 1))
+                       for rank, movie in enumerate(movies[1:]))
+    db.session.commit()
+    return {
+        'user_id': user.id,
+        'other_user_id': other_user.id,
+        'genre_ids': [genre.id for genre in genres],
+        'movie_ids': [movie.id for movie in movies],
+        'review_id': review.id,
+    }
+
+
+def normalize(value):
+    """Turn a data manager result into plain, comparable values."""
+    if isinstance(value, Page):
+        return 'page', normalize(value.items), value.next_cursor, value.prev_cursor
+    if isinstance(value, Row):
+        return tuple(value)
+    if isinstance(value, (list, tuple)):
+        return [normalize(item) for item in value]
+    if isinstance(value, db.Model):
+        state = inspect_instance(value)
+        data = {attribute.key: getattr(value, attribute.key) for attribute in state.mapper.column_attrs}
+        for name in ('genres', 'stats'):
+            if name in state.mapper.relationships and name not in state.unloaded:
+                related = getattr(value, name)
+                data[name] = (sorted(normalize(related), key=repr) if isinstance(related, list)
+                              else normalize(related))
+        return type(value).__name__, data
+    return value
+
+
+def dump(engine):
+    """Return every row of every table, keyed by table and primary key."""
+    tables = {}
+    with engine.connect() as connection:
+        for table in db.metadata.sorted_tables:
+            key = [column.name for column in table.primary_key.columns]
+            tables[table.name] = {
+                tuple(row[name] for name in key): dict(row)
+                for row in connection.execute(select(table)).mappings()
+            }
+    return tables
+
+
+def comparable(before, after):
+    """Mask the clock-dependent values of ``after``: timestamps, and the versions of new rows."""
+    masked = {}
+    for table, rows in after.items():
+        masked[table] = {}
+        for key, row in rows.items():
+            row = {name: value for name, value in row.items() if name not in CLOCK_COLUMNS}
+            if key not in before[table] and 'version' in row:
+                row['version'] = 'new'
+            masked[table][key] = row
+        if table in LOG_TABLES:
+            masked[table] = sorted(sorted((name, value) for name, value in row.items() if name != 'id')
+                                   for row in masked[table].values())
+    return masked
+
+
+def comparable_result(value):
+    """Mask the clock-dependent values of a normalized return value, like ``comparable``."""
+    if isinstance(value, tuple) and len(value) == 2 and isinstance(value[1], dict):
+        return value[0], {name: item for name, item in value[1].items()
+                          if name not in CLOCK_COLUMNS and name != 'version'}
+    return value
+
+
+def async_manager(app, uri):
+    """Build an AsyncSQLiteDataManager configured like the one create_app builds."""
+    manager = AsyncSQLiteDataManager(uri)
+    configure_engine(manager.engine.sync_engine, app.config['SQLITE_PRAGMAS'])
+    return manager
+
+
+def call_async(app, uri, method, kwargs):
+    async def run():
+        manager = async_manager(app, uri)
+        try:
+            return normalize(await getattr(manager, method)(**kwargs))
+        finally:
+            await manager.dispose()
+
+    return asyncio.run(run())
+
+
+@pytest.fixture
+def seeded(app):
+    with app.app_context():
+        return seed()
+
+
+def test_every_async_method_is_compared():
+    methods = {name for name, member in inspect.getmembers(AsyncSQLiteDataManager, inspect.iscoroutinefunction)
+               if not name.startswith('_')}
+    assert methods == set(READ_CALLS) | set(WRITE_CALLS) | {'dispose'}
+    assert methods - {'dispose'} <= set(dir(SQLiteDataManager))
+
+
+def test_interfaces():
+    assert issubclass(AsyncSQLiteDataManager, AsyncDataManagerInterface)
+    assert not issubclass(AsyncSQLiteDataManager, DataManagerInterface)
+    for name in AsyncDataManagerInterface.__abstractmethods__:
+        assert inspect.iscoroutinefunction(getattr(AsyncSQLiteDataManager, name)), name
+
+
+@pytest.mark.parametrize('method', sorted(READ_CALLS))
+def test_read_parity(app, seeded, method):
+    kwargs = READ_CALLS[method](seeded)
+    with app.app_context():
+        expected = normalize(getattr(SQLiteDataManager(db), method)(**kwargs))
+    assert call_async(app, app.config['SQLALCHEMY_DATABASE_URI'], method, kwargs) == expected
+
+
+@pytest.mark.parametrize('method', sorted(WRITE_CALLS))
+def test_write_parity(app, seeded, tmp_path, method):
+    kwargs = WRITE_CALLS[method](seeded)
+    copy_uri = f'sqlite:///{tmp_path / "copy.db"}'
+    with app.app_context():
+        with db.engine.connect() as connection:
+            connection.execute(text('VACUUM INTO :path'), {'path': str(tmp_path / 'copy.db')})
+        before = dump(db.engine)
+        expected = normalize(getattr(SQLiteDataManager(db), method)(**kwargs))
+        db.session.remove()
+        expected_tables = comparable(before, dump(db.engine))
+
+    result = call_async(app, copy_uri, method, kwargs)
+    copy_engine = db.create_engine(copy_uri)
+    try:
+        tables = comparable(before, dump(copy_engine))
+    finally:
+        copy_engine.dispose()
+
+    assert comparable_result(result) == comparable_result(expected)
+    assert tables == expected_tables
+
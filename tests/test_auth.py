@@ -0,0 +1,19 @@
+from tests.conftest import PASSWORD, add_user, login
+
+
+def test_login(client, data_manager):
+    add_user(data_manager)
+    login(client)
+    assert b'Logged in successfully!' in client.get('/user/movies').data
+
+
+def test_login_refused_while_deletion_is_pending(client, data_manager):
+    user_id = add_user(data_manager)
+    data_manager.request_user_deletion(user_id)
+
+    response = client.post('/login', data={'email': 'user@example.com', 'password': PASSWORD})
+    assert response.status_code == 200
+    assert b'This account is being deleted' in response.data
+    assert b'Logged in successfully!' not in response.data
+    with client.session_transaction() as session:
+        assert '_user_id' not in session
@@ -0,0 +1,49 @@
+from sqlalchemy import func, select
+
+from app import db
+from app.models.movie import Movie
+from app.models.user_movie import UserMovie
+from tests.conftest import add_user
+
+CATALOG = 'name,director,year,user_id\nFirst,Ana Lee,2001,\nSecond,Ben Park,2002,{owner}\n'
+
+
+def run_import(app, path, *args):
+    with app.app_context():
+        return app.test_cli_runner().invoke(args=['import', str(path), '--chunk-size', '1', *args])
+
+
+def count(app, model):
+    with app.app_context():
+        return db.session.scalar(select(func.count()).select_from(model))
+
+
+def test_import_into_a_library(app, data_manager, tmp_path):
+    user_id = add_user(data_manager)
+    path = tmp_path / 'catalog.csv'
+    path.write_text(CATALOG.format(owner=user_id))
+
+    result = run_import(app, path, '--user-id', str(user_id))
+    assert result.exit_code == 0, result.output
+    assert count(app, Movie) == 2 and count(app, UserMovie) == 2
+
+
+def test_import_rejects_an_unknown_user_id(app, data_manager, tmp_path):
+    path = tmp_path / 'catalog.csv'
+    path.write_text(CATALOG.format(owner=''))
+
+    result = run_import(app, path, '--user-id', '42')
+    assert result.exit_code == 2
+    assert "Invalid value for '--user-id': no user with ID 42." in result.output
+    assert count(app, Movie) == 0
+
+
+def test_import_stops_at_a_record_with_an_unknown_owner(app, data_manager, tmp_path):
+    user_id = add_user(data_manager)
+    path = tmp_path / 'catalog.csv'
+    path.write_text(CATALOG.format(owner=user_id + 1))
+
+    result = run_import(app, path, '--user-id', str(user_id))
+    assert result.exit_code == 1
+    assert f'Invalid record #2: no user with ID {user_id + 1}' in result.output
+    assert count(app, Movie) == 1 and count(app, UserMovie) == 1
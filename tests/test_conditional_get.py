@@ -0,0 +1,20 @@
+from tests.conftest import add_user, login
+
+
+def test_pending_flash_defeats_revalidation(app, client, data_manager):
+    add_user(data_manager)
+    login(client)
+    first = client.get('/user/movies')
+    assert first.status_code == 200 and first.get_etag()[0]
+
+    # A POST that writes nothing and redirects with a message
+    assert client.post('/user/movies/999/delete').status_code == 302
+    flashed = client.get('/user/movies', headers={'If-None-Match': first.get_etag()[0]})
+    assert flashed.status_code == 200
+    assert b'Unauthorized action!' in flashed.data
+
+    # The page that showed the message is not reused once it was consumed
+    after = client.get('/user/movies', headers={'If-None-Match': flashed.get_etag()[0]})
+    assert after.status_code == 200
+    assert b'Unauthorized action!' not in after.data
+    assert client.get('/user/movies', headers={'If-None-Match': after.get_etag()[0]}).status_code == 304
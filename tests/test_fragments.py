@@ -0,0 +1,34 @@
+from sqlalchemy import BigInteger, delete, insert
+
+from app import db
+from app.models.movie import initial_version
+from app.models.review import Review
+from tests.conftest import add_user, login
+
+
+def test_review_fragment_follows_a_reused_id(app, client, data_manager):
+    user_id = add_user(data_manager)
+    movie = data_manager.add_movie('Movie', 'Director', 2000, 5.0)
+    data_manager.add_user_movie(user_id, movie.id)
+    data_manager.add_user_review(movie.id, user_id, 'first review', 4.0)
+    [review] = data_manager.get_user_reviews_for_movie(movie.id, user_id)
+    login(client, 'user@example.com')
+    url = f'/user/movies/show_movie/{movie.id}'
+    assert b'first review' in client.get(url).data
+
+    # Another worker replaces the review without invalidating this process's fragments
+    db.session.execute(delete(Review).where(Review.id == review.id))
+    db.session.execute(insert(Review).values(id=review.id, movie_id=movie.id, user_id=user_id,
+                                             text='second review', rating=4.0, created_at=review.created_at))
+    db.session.commit()
+
+    page = client.get(url).data
+    assert b'second review' in page
+    assert b'first review' not in page
+
+
+def test_version_columns_hold_clock_seeds(app):
+    for table in db.metadata.sorted_tables:
+        if 'version' in table.columns:
+            assert isinstance(table.columns['version'].type, BigInteger), table.name
+    assert initial_version() >= 2 ** 31
@@ -0,0 +1,40 @@
+from types import SimpleNamespace
+
+import pytest
+from sqlalchemy.dialects import mysql, postgresql
+from sqlalchemy.schema import CreateTable
+
+from app.genre_index import GenreBitmapIndex, iter_ids
+from app.models.genre_index_change import GenreIndexChange, create_genre_index_triggers
+
+
+def test_changes_are_logged_and_saved(data_manager, tmp_path):
+    data_manager.add_genre(name='Drama', description='drama')
+    genre_id = data_manager.get_genres_by_name(name='Drama').id
+    movie = data_manager.add_movie('Movie', 'Director', 2000, 5.0)
+    data_manager.sync_movie_genres(movie.id, [genre_id])
+
+    path = str(tmp_path / 'genre-index.bin')
+    index = GenreBitmapIndex()
+    index.configure(path=path, database='test')
+    index.sync(data_manager)
+    assert list(iter_ids(index.movies(genre_id))) == [movie.id]
+    assert index.save()
+
+    data_manager.sync_movie_genres(movie.id, [])
+    restarted = GenreBitmapIndex()
+    restarted.configure(path=path, database='test')
+    assert restarted.sync(data_manager) == 1
+    assert (restarted.loads, restarted.rebuilds) == (1, 0)
+    assert restarted.movies(genre_id) == 0
+
+
+def test_change_log_ddl_is_portable():
+    ddl = str(CreateTable(GenreIndexChange.__table__).compile(dialect=postgresql.dialect()))
+    assert 'DEFAULT CURRENT_TIMESTAMP' in ddl
+    assert 'strftime' not in ddl
+
+
+def test_triggers_fail_loudly_without_support():
+    with pytest.raises(NotImplementedError):
+        create_genre_index_triggers(SimpleNamespace(dialect=mysql.dialect()))
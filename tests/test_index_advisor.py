@@ -0,0 +1,33 @@
+from sqlalchemy import inspect, text
+
+from app import db
+from app.datamanager.index_advisor import analyze, create_missing_indexes, unexpected_scans
+
+
+def index_names(connection, table):
+    return {index['name'] for index in inspect(connection).get_indexes(table)}
+
+
+def test_no_unexpected_scans(app):
+    with app.app_context():
+        reports = analyze(db)
+    assert reports
+    assert unexpected_scans(reports) == []
+
+
+def test_create_missing_indexes(app):
+    with app.app_context():
+        with db.engine.begin() as connection:
+            connection.execute(text('DROP INDEX ix_reviews_movie_id_user_id'))
+            connection.execute(text('DROP INDEX ix_users_pending_deletion'))
+            assert 'ix_reviews_movie_id_user_id' not in index_names(connection, 'reviews')
+
+            created, skipped = create_missing_indexes(connection, db.metadata)
+            assert sorted(created) == ['ix_reviews_movie_id_user_id', 'ix_users_pending_deletion']
+            assert skipped == []
+            assert 'ix_reviews_movie_id_user_id' in index_names(connection, 'reviews')
+            assert create_missing_indexes(connection, db.metadata) == ([], [])
+
+        result = app.test_cli_runner().invoke(args=['create-indexes'])
+        assert result.exit_code == 0
+        assert 'No indexes were missing.' in result.output
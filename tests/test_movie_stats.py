@@ -0,0 +1,25 @@
+from sqlalchemy.dialects import postgresql
+
+from app import db
+from app.models.movie_stats import MovieStats, _recompute, rebuild_movie_stats, stale_movie_stats
+
+
+def test_recompute_is_portable():
+    statement = str(_recompute([1]).compile(dialect=postgresql.dialect()))
+    assert 'total(' not in statement
+    assert 'coalesce(sum(reviews.rating)' in statement
+
+
+def test_rebuild_counts_unrated_reviews(data_manager):
+    rated = data_manager.add_movie('Rated', 'Director', 2000, 5.0)
+    unrated = data_manager.add_movie('Unrated', 'Director', 2000, 5.0)
+    data_manager.add_user_review(rated.id, None, 'good', 8.0)
+    data_manager.add_user_review(rated.id, None, 'fine', 6.0)
+    data_manager.add_user_review(unrated.id, None, 'no rating', None)
+
+    with db.engine.begin() as connection:
+        rebuild_movie_stats(connection)
+        assert stale_movie_stats(connection) == []
+    stats = {row.movie_id: (row.review_count, row.rating_count, row.rating_sum)
+             for row in db.session.query(MovieStats)}
+    assert stats == {rated.id: (2, 2, 14.0), unrated.id: (1, 0, 0.0)}
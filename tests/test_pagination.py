@@ -0,0 +1,67 @@
+"""Keyset pages only link to a previous page when rows precede them."""
+import asyncio
+
+from app import db
+from app.datamanager.async_sqlite_data_manager import AsyncSQLiteDataManager
+from app.models.genre import Genre
+from app.models.movie import Movie
+from app.models.user_movie import UserMovie
+from tests.conftest import add_user, login
+
+
+def seed_library(user_id, count=5, genres=()):
+    movies = [Movie(name=f'movie {i}', director='director', year=2000, rating=5.0, genres=list(genres))
+              for i in range(count)]
+    db.session.add_all(movies)
+    db.session.flush()
+    db.session.add_all(UserMovie(user_id=user_id, movie_id=movie.id) for movie in movies)
+    db.session.commit()
+    return [movie.id for movie in movies]
+
+
+def test_after_below_first_key_has_no_previous_page(data_manager):
+    user_id = add_user(data_manager)
+    movie_ids = seed_library(user_id)
+
+    first = data_manager.get_user_movies_page_readonly(user_id, after=0, per_page=2)
+    assert [movie.id for movie in first.items] == movie_ids[:2]
+    assert first.prev_cursor is None
+    assert first.next_cursor == movie_ids[1]
+
+    second = data_manager.get_user_movies_page_readonly(user_id, after=first.next_cursor, per_page=2)
+    assert second.prev_cursor == movie_ids[2]
+    previous = data_manager.get_user_movies_page_readonly(user_id, before=second.prev_cursor, per_page=2)
+    assert [movie.id for movie in previous.items] == movie_ids[:2]
+
+
+def test_async_after_below_first_key_has_no_previous_page(app, data_manager):
+    user_id = add_user(data_manager)
+    movie_ids = seed_library(user_id)
+
+    async def pages():
+        manager = AsyncSQLiteDataManager(app.config['SQLALCHEMY_DATABASE_URI'])
+        try:
+            return (await manager.get_user_movies_page(user_id, after=0, per_page=2),
+                    await manager.get_user_movies_page(user_id, after=movie_ids[1], per_page=2))
+        finally:
+            await manager.dispose()
+
+    first, second = asyncio.run(pages())
+    assert first.prev_cursor is None
+    assert second.prev_cursor == movie_ids[2]
+
+
+def test_library_page_after_zero_has_no_previous_link(client, data_manager, app):
+    app.config['MOVIES_PER_PAGE'] = 2
+    user_id = add_user(data_manager)
+    genre = Genre(name='Drama', description='drama')
+    movie_ids = seed_library(user_id, genres=[genre])
+    login(client)
+
+    for url in ('/user/movies?after=0', f'/user/movies?after=0&genre={genre.id}'):
+        html = client.get(url).get_data(as_text=True)
+        assert 'before=' not in html, url
+        assert f'after={movie_ids[1]}' in html, url
+
+    html = client.get(f'/user/movies?after={movie_ids[1]}&genre={genre.id}').get_data(as_text=True)
+    assert f'before={movie_ids[2]}' in html
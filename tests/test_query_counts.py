@@ -0,0 +1,47 @@
+"""The library and movie pages issue a fixed number of statements however large the library is."""
+import pytest
+
+from app import db
+from app.models.genre import Genre
+from app.models.movie import Movie
+from app.models.user_movie import UserMovie
+from tests.conftest import add_user, count_statements, login
+
+SMALL_LIBRARY = 20
+
+
+def add_movies(user_id, genres, count):
+    """Add ``count`` movies with every genre to a user's library; return their IDs."""
+    movies = [Movie(name=f'movie {i}', director='director', year=2000, rating=5.0, genres=genres)
+              for i in range(count)]
+    db.session.add_all(movies)
+    db.session.flush()
+    db.session.add_all(UserMovie(user_id=user_id, movie_id=movie.id) for movie in movies)
+    db.session.commit()
+    return [movie.id for movie in movies]
+
+
+def statements_per_request(app, client, url):
+    """Return the number of statements a GET of ``url`` issues once the per-process caches are warm."""
+    assert client.get(url).status_code == 200
+    with count_statements(app) as statements:
+        assert client.get(url).status_code == 200
+    return len(statements)
+
+
+@pytest.mark.parametrize('page', ['/user/movies', '/user/movies/show_movie/{movie_id}',
+                                  '/user/movies/update_movie/{movie_id}'])
+def test_statement_count_does_not_grow_with_library(app, client, data_manager, page):
+    user_id = add_user(data_manager)
+    genres = [Genre(name=f'genre {i}', description='genre') for i in range(3)]
+    db.session.add_all(genres)
+    movie_id = add_movies(user_id, genres, SMALL_LIBRARY)[0]
+    login(client)
+    url = page.format(movie_id=movie_id)
+
+    small = statements_per_request(app, client, url)
+    add_movies(user_id, db.session.query(Genre).all(), 9 * SMALL_LIBRARY)
+    large = statements_per_request(app, client, url)
+
+    assert small > 0
+    assert large == small
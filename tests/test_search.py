@@ -0,0 +1,109 @@
+from sqlalchemy import delete, select, text
+
+from app import db
+from app.models.movie import Movie
+from app.models.review import Review
+from app.models.user_movie import UserMovie
+from app.search import SEARCH_TABLES, build_match_query, drop_search_index, rebuild_search_index
+from tests.conftest import add_user, login
+
+
+def add_library_movie(data_manager, user_id, name, director):
+    movie = data_manager.add_movie(name, director, 2000, 7.0)
+    data_manager.add_user_movie(user_id, movie.id)
+    return movie.id
+
+
+def index_contents():
+    """Return every (term, document count, occurrences) row of every search table."""
+    contents = {}
+    with db.engine.connect() as connection:
+        for table in SEARCH_TABLES:
+            connection.exec_driver_sql(f"CREATE VIRTUAL TABLE temp.{table}_vocab USING fts5vocab(main, {table}, row)")
+            contents[table] = connection.exec_driver_sql(f"SELECT * FROM temp.{table}_vocab").all()
+            connection.exec_driver_sql(f"DROP TABLE temp.{table}_vocab")
+    return contents
+
+
+def search_ids(data_manager, user_id, terms, **kwargs):
+    return [movie.id for movie in data_manager.search_user_movies(user_id, terms, **kwargs).items]
+
+
+def test_build_match_query_quotes_words():
+    assert build_match_query('foo_bar "x" OR') == '"foo" "bar" "x" "OR"*'
+    assert build_match_query(' -*" ') is None
+
+
+def test_search_ranks_within_the_library(data_manager):
+    user_id = add_user(data_manager)
+    other_id = add_user(data_manager, 'other', 'other@example.com')
+    by_director = add_library_movie(data_manager, user_id, 'Dark Road', 'Night Owl')
+    by_title = add_library_movie(data_manager, user_id, 'Night City', 'Ana Lee')
+    by_review = add_library_movie(data_manager, user_id, 'Blue', 'Ben Park')
+    data_manager.add_user_review(by_review, user_id, 'A night to remember', 8.0)
+    reviewed_by_other = add_library_movie(data_manager, user_id, 'Fire', 'Eli Novak')
+    data_manager.add_user_review(reviewed_by_other, other_id, 'Long night', 3.0)
+    add_library_movie(data_manager, other_id, 'Night Fall', 'Ana Lee')
+
+    assert search_ids(data_manager, user_id, 'nig') == [by_title, by_director, by_review]
+    assert search_ids(data_manager, user_id, 'night lee') == [by_title]
+    assert search_ids(data_manager, user_id, 'nig', per_page=2) == [by_title, by_director]
+    results = data_manager.search_user_movies(user_id, 'nig', page=2, per_page=2)
+    assert [movie.id for movie in results.items] == [by_review] and not results.has_next
+    assert search_ids(data_manager, user_id, 'foo_bar AND "') == []
+
+
+def test_index_follows_writes(data_manager):
+    user_id = add_user(data_manager)
+    other_id = add_user(data_manager, 'other', 'other@example.com')
+    renamed = add_library_movie(data_manager, user_id, 'Night City', 'Ana Lee')
+    shared = add_library_movie(data_manager, user_id, 'Blue River', 'Ben Park')
+    data_manager.add_user_movie(other_id, shared)
+    removed = add_library_movie(data_manager, user_id, 'Removed', 'Eli Novak')
+    deleted = add_library_movie(data_manager, other_id, 'Deleted', 'Eli Novak')
+    cascaded = add_library_movie(data_manager, user_id, 'Cascaded', 'Eli Novak')
+    data_manager.add_user_review(shared, user_id, 'river review', 5.0)
+    data_manager.add_user_review(deleted, other_id, 'gone soon', 5.0)
+    data_manager.add_user_review(shared, other_id, 'deleted review', 5.0)
+    deleted_review = db.session.scalar(select(Review.id).where(Review.text == 'deleted review'))
+
+    data_manager.update_movie(renamed, 'Day City', 'Ana Lee', 2000, 7.0)
+    db.session.execute(delete(UserMovie).where(UserMovie.user_id == user_id, UserMovie.movie_id == removed))
+    db.session.commit()
+    data_manager.delete_movie(deleted)
+    # Removed from the library by the foreign key cascade, after the movie row
+    db.session.execute(delete(Movie).where(Movie.id == cascaded))
+    db.session.commit()
+    data_manager.delete_review(deleted_review)
+
+    assert search_ids(data_manager, user_id, 'night') == []
+    assert search_ids(data_manager, user_id, 'day') == [renamed]
+    assert search_ids(data_manager, user_id, 'removed') == []
+    assert search_ids(data_manager, user_id, 'eli') == []
+    assert search_ids(data_manager, user_id, 'river') == [shared]
+    assert search_ids(data_manager, other_id, 'river') == [shared]
+    contents = index_contents()
+    with db.engine.begin() as connection:
+        rebuild_search_index(connection)
+    assert index_contents() == contents
+
+    data_manager.delete_user(other_id)
+    contents = index_contents()
+    with db.engine.begin() as connection:
+        rebuild_search_index(connection)
+    assert index_contents() == contents
+
+
+def test_search_without_index_falls_back_to_like(app, client, data_manager):
+    user_id = add_user(data_manager)
+    by_director = add_library_movie(data_manager, user_id, 'Dark Road', 'Night Owl')
+    by_title = add_library_movie(data_manager, user_id, 'Night City', 'Ana Lee')
+    with db.engine.begin() as connection:
+        drop_search_index(connection)
+        assert not connection.execute(text("SELECT count(*) FROM sqlite_master WHERE name LIKE '%fts%'")).scalar()
+
+    assert search_ids(data_manager, user_id, 'nig') == [by_title, by_director]
+    login(client)
+    response = client.get('/user/movies/search?q=night')
+    assert response.status_code == 200
+    assert b'Night City' in response.data and b'Dark Road' in response.data
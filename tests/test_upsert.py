@@ -0,0 +1,63 @@
+import pytest
+from sqlalchemy import select
+from sqlalchemy.dialects import mysql, postgresql, sqlite
+
+from app import db
+from app.models.movie_genre import MovieGenre
+from app.models.movie_stats import MovieStats, count_added_review
+from app.models.recommendation import queue_recommendation_refresh
+from app.models.review import Review
+from app.models.upsert import upsert
+from app.models.user_movie import UserMovie
+
+
+class RecordingConnection:
+    """Stands in for the connection a mapper event receives, on any dialect."""
+
+    def __init__(self, dialect):
+        self.dialect = dialect
+        self.statements = []
+
+    def execute(self, statement):
+        self.statements.append(str(statement.compile(dialect=self.dialect)))
+
+
+@pytest.mark.parametrize('dialect', [sqlite.dialect(), postgresql.dialect()])
+def test_upsert_supports_on_conflict(dialect):
+    statement = upsert(dialect, MovieStats).values(movie_id=1).on_conflict_do_nothing()
+    assert 'ON CONFLICT DO NOTHING' in str(statement.compile(dialect=dialect))
+
+
+def test_upsert_rejects_other_dialects():
+    with pytest.raises(NotImplementedError):
+        upsert(mysql.dialect(), MovieStats)
+
+
+@pytest.mark.parametrize('dialect', [sqlite.dialect(), postgresql.dialect()])
+def test_count_added_review(dialect):
+    connection = RecordingConnection(dialect)
+    count_added_review(None, connection, Review(movie_id=1, user_id=1, text='good', rating=8.0))
+    [statement] = connection.statements
+    assert 'ON CONFLICT (movie_id) DO UPDATE' in statement
+
+
+@pytest.mark.parametrize('dialect', [sqlite.dialect(), postgresql.dialect()])
+def test_queue_recommendation_refresh(dialect):
+    connection = RecordingConnection(dialect)
+    queue_recommendation_refresh(None, connection, UserMovie(user_id=1, movie_id=2))
+    [statement] = connection.statements
+    assert statement.startswith('INSERT INTO recommendation_queue')
+    assert 'ON CONFLICT DO NOTHING' in statement
+
+
+def test_sync_movie_genres(data_manager):
+    genres = []
+    for name in ('Drama', 'Noir', 'Comedy'):
+        data_manager.add_genre(name=name, description=name)
+        genres.append(data_manager.get_genres_by_name(name=name).id)
+    movie = data_manager.add_movie('Movie', 'Director', 2000, 5.0)
+
+    data_manager.sync_movie_genres(movie.id, genres[:2])
+    data_manager.sync_movie_genres(movie.id, [genres[1], genres[2], 999])
+    rows = db.session.execute(select(MovieGenre.genre_id).where(MovieGenre.movie_id == movie.id)).scalars()
+    assert sorted(rows) == genres[1:]